@@ -8,6 +8,15 @@ namespace AkademiTrack
         [STAThread]
         public static void Main(string[] args)
         {
+            // build-linux.py --matrix times startup up to here: platform init, App and its XAML,
+            // and the main window created but never shown (the matrix runs it under Xvfb)
+            if (args.Length == 1 && args[0] == "--startup-probe")
+            {
+                BuildAvaloniaApp().SetupWithoutStarting();
+                _ = new Views.MainWindow();
+                return;
+            }
+
             // Start Avalonia app
             BuildAvaloniaApp().StartWithClassicDesktopLifetime(args);
         }
@@ -173,14 +173,24 @@ namespace AkademiTrack.Services
                     changelogPath = Path.Combine(AppContext.BaseDirectory, "Changelogs", $"{version}.json");
                 }
                 
-                if (!File.Exists(changelogPath))
+                // Prefer the index compiled at build time; fall back to the individual file
+                var indexPath = Path.Combine(Path.GetDirectoryName(changelogPath)!, "index.json");
+                var json = await ReadChangelogFromIndexAsync(indexPath, version);
+                if (json != null)
                 {
-                    Debug.WriteLine($"[ChangelogService] Changelog file not found: {changelogPath}");
-                    return null;
+                    Console.WriteLine($"[ChangelogService] Successfully read changelog {version} from index: {indexPath}");
                 }
+                else
+                {
+                    if (!File.Exists(changelogPath))
+                    {
+                        Debug.WriteLine($"[ChangelogService] Changelog file not found: {changelogPath}");
+                        return null;
+                    }
 
-                var json = await File.ReadAllTextAsync(changelogPath);
-                Console.WriteLine($"[ChangelogService] Successfully read changelog file: {changelogPath}");
+                    json = await File.ReadAllTextAsync(changelogPath);
+                    Console.WriteLine($"[ChangelogService] Successfully read changelog file: {changelogPath}");
+                }
                 
                 var data = JsonSerializer.Deserialize<ChangelogData>(json, new JsonSerializerOptions
                 {
@@ -289,6 +299,33 @@ namespace AkademiTrack.Services
             }
         }
 
+        private static async Task<string?> ReadChangelogFromIndexAsync(string indexPath, string version)
+        {
+            if (!File.Exists(indexPath))
+            {
+                return null;
+            }
+
+            try
+            {
+                await using var stream = File.OpenRead(indexPath);
+                using var document = await JsonDocument.ParseAsync(stream);
+                if (document.RootElement.TryGetProperty("entries", out var entries) &&
+                    entries.TryGetProperty(version, out var entry))
+                {
+                    return entry.GetRawText();
+                }
+
+                Debug.WriteLine($"[ChangelogService] No entry for {version} in changelog index: {indexPath}");
+            }
+            catch (Exception ex)
+            {
+                Debug.WriteLine($"[ChangelogService] Error reading changelog index: {ex.Message}");
+            }
+
+            return null;
+        }
+
         public static async Task MarkChangelogAsSeenAsync()
         {
             try
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Generate the local update feed for the releases in Releases/
+
+Scans every Releases/v*/ folder, builds delta packages from the last N
+versions to the new one in parallel, refreshes the per-release manifest.json
+files and writes Releases/feed.json. With --verify the feed is served over a
+local static HTTP server and every delta is downloaded and applied to check
+it rebuilds the full package.
+
+    python3 build-feed.py --version 1.4.0 --deltas 3 --verify
+    python3 build-feed.py --apply Releases/v1.3.0/AkademiTrack-1.3.0-linux-full.nupkg \\
+        Releases/v1.4.0/deltas/AkademiTrack-1.4.0-linux-from-1.3.0.delta.zip rebuilt.nupkg
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+from buildtools.feed import DEFAULT_MAX_DELTAS, apply_delta, generate_feed, verify_feed
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Generate the AkademiTrack update feed")
+    parser.add_argument("--version", help="Release to generate deltas for (default: newest in Releases/)")
+    parser.add_argument("--deltas", type=int, default=DEFAULT_MAX_DELTAS,
+                        help=f"Number of previous versions to build deltas from (default: {DEFAULT_MAX_DELTAS})")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(),
+                        help="Number of delta packages to build at the same time")
+    parser.add_argument("--releases-dir", default="./Releases", help="Folder holding the v* release folders")
+    parser.add_argument("--verify", action="store_true",
+                        help="Serve the feed over local HTTP and apply every delta of the newest release")
+    parser.add_argument("--apply", nargs=3, metavar=("BASE", "DELTA", "OUTPUT"),
+                        help="Rebuild a full package from a base package and a delta, then exit")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.apply:
+        base, delta, output = args.apply
+        try:
+            metadata = apply_delta(base, delta, output)
+        except (ValueError, KeyError) as e:
+            print(f"❌ Failed to apply delta: {e}")
+            return False
+        print(f"✅ Rebuilt v{metadata['target_version']} from v{metadata['base_version']}: {output}")
+        return True
+
+    print("📡 AkademiTrack Update Feed Generator")
+    print("=" * 50)
+
+    releases_dir = Path(args.releases_dir)
+    feed = generate_feed(releases_dir, args.version, args.deltas, args.jobs)
+    if feed is None:
+        return False
+
+    for channel, channel_feed in sorted(feed["channels"].items()):
+        latest = channel_feed["releases"][0]
+        print(f"  📦 {channel}: latest v{channel_feed['latest']}, "
+              f"{len(channel_feed['releases'])} release(s), {len(latest['deltas'])} delta(s)")
+
+    if args.verify:
+        print("\n🔍 Verifying feed over HTTP...")
+        if not verify_feed(releases_dir):
+            print("❌ Feed verification failed")
+            return False
+        print("✅ Feed verified")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        if not main():
+            sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Interrupted by user")
@@ -1,13 +1,40 @@
 ﻿#!/usr/bin/env python3
+import argparse
+import ast
+import hashlib
+import io
 import os
 import shutil
-import subprocess
+import sys
 import tarfile
+import time
 import zipfile
 from pathlib import Path
 import re
 import xml.etree.ElementTree as ET
 
+from buildtools.buildcache import open_build_cache, reset_source_digest, source_digest
+from buildtools.buildserver import BUILD_SERVER_MODES, BuildServerSession
+from buildtools.assets import prune_assets
+from buildtools.artifacts import find_artifact, register_new_artifacts, snapshot_artifacts
+from buildtools.archives import (DEFAULT_TAR_CODEC, DEFAULT_TARGET_SECONDS, TAR_CODECS,
+                                 add_deduplicated, available_codecs, open_tar_writer, resolve_codec)
+from buildtools.changelogs import CHANGELOG_DIR, compile_changelogs
+from buildtools.checkpoints import StageCheckpoints
+from buildtools.common import PROJECT_PATH, file_sha256, load_build_script
+from buildtools.icons import ICON_NAME, derive_icons
+from buildtools.preflight import build_checks, run_preflight
+from buildtools.restore import ensure_restored
+from buildtools.variants import DEFAULT_RUNS, VARIANT_PROPERTIES, print_matrix_report, run_variant_matrix
+from buildtools.runner import run_streaming
+from buildtools.scratch import configure_scratch, discard_scratch, scratch_path, scratch_root, tree_size
+from buildtools.sizes import DEFAULT_SIZE_BUDGET, check_size_budget
+from buildtools.verify import expected_entries, verify_archive
+from buildtools.watch import open_watcher
+
+VPK_TIMEOUT = 20 * 60
+INSTALL_MANIFEST_NAME = ".install-manifest"
+
 def get_version_input():
     """Get version number from user or use current version from .csproj"""
     print("\n📦 Version Configuration")
@@ -86,43 +113,31 @@ Type=Application
 Name=AkademiTrack
 Comment=Academic tracking and management application
 Exec={install_dir}/AkademiTrack
-Icon={install_dir}/akademitrack
+Icon={install_dir}/akademitrack.png
 Terminal=false
 Categories=Education;Office;
 StartupWMClass=AkademiTrack
 """
     return desktop_content
 
-def build_linux_release(version):
-    """Build Linux release - creates portable tarball and standalone binary"""
-    
-    print(f"\n🏗️  Building AkademiTrack for Linux (x64)...")
-    print("=" * 50)
-    
-    # Directories
-    publish_dir = Path("./publish-linux")
-    publish_single = Path("./publish-linux-single")
-    release_folder = Path(f"./Releases/v{version}")
-    
-    # Clean directories
-    if publish_dir.exists():
-        print(f"🧹 Cleaning publish directory...")
-        shutil.rmtree(publish_dir)
-    
-    if publish_single.exists():
-        print(f"🧹 Cleaning single-file directory...")
-        shutil.rmtree(publish_single)
-    
-    if release_folder.exists():
-        print(f"🧹 Cleaning release folder...")
-        shutil.rmtree(release_folder)
-    
-    release_folder.mkdir(parents=True, exist_ok=True)
-    
+LINUX_STAGES = ["publish", "publish-single", "tarball", "velopack", "standalone", "install-script"]
+# Functions in this script whose code (or template) each stage depends on, for --watch
+STAGE_FUNCTIONS = {
+    "publish": ["publish_multi_file"],
+    "publish-single": ["publish_single_file"],
+    "tarball": ["create_portable_tarball", "create_desktop_file"],
+    "velopack": ["create_velopack_package"],
+    "standalone": ["add_standalone_binary"],
+    "install-script": ["create_install_script"],
+}
+
+def publish_multi_file(publish_dir, build_session):
+    """Publish the multi-file build used for the tarball and Velopack"""
     # Step 1: Publish for distribution (multi-file)
     print(f"\n📦 Step 1: Publishing for distribution (multi-file)...")
     publish_cmd = [
-        "dotnet", "publish",
+        "dotnet", "publish", PROJECT_PATH,
+        "--no-restore",
         "-c", "Release",
         "--self-contained",
         "-r", "linux-x64",
@@ -131,17 +146,21 @@ def build_linux_release(version):
     ]
     
     print(f"Running: {' '.join(publish_cmd)}")
-    result = subprocess.run(publish_cmd, capture_output=True, text=True)
+    result = build_session.run_publish(publish_cmd, "linux-x64 multi-file")
     if result.returncode != 0:
-        print(f"❌ Publish failed: {result.stderr}")
+        print(f"❌ Publish failed: {result.error_summary()}")
         return False
     
     print("✅ Published for distribution successfully")
-    
+    return True
+
+def publish_single_file(publish_single, build_session):
+    """Publish the standalone single-file binary; returns its path"""
     # Step 2: Publish single file binary (for standalone distribution)
     print(f"\n📦 Step 2: Publishing standalone single-file binary...")
     publish_single_cmd = [
-        "dotnet", "publish",
+        "dotnet", "publish", PROJECT_PATH,
+        "--no-restore",
         "-c", "Release",
         "--self-contained",
         "-r", "linux-x64",
@@ -152,9 +171,9 @@ def build_linux_release(version):
     ]
     
     print(f"Running: {' '.join(publish_single_cmd)}")
-    result = subprocess.run(publish_single_cmd, capture_output=True, text=True)
+    result = build_session.run_publish(publish_single_cmd, "linux-x64 single-file")
     if result.returncode != 0:
-        print(f"❌ Single-file publish failed: {result.stderr}")
+        print(f"❌ Single-file publish failed: {result.error_summary()}")
         return False
     
     print("✅ Published single-file binary successfully")
@@ -174,44 +193,88 @@ def build_linux_release(version):
     if binary_size < 10:
         print(f"⚠️  Warning: Binary seems too small ({binary_size:.1f} MB)")
     
+    return binary_single
+
+def tarball_files(publish_dir, icons=None):
+    """(source, path inside AkademiTrack/) for every file the tarball copies from disk"""
+    tar_files = [(f, str(f.relative_to(publish_dir)))
+                 for f in sorted(publish_dir.rglob('*')) if f.is_file()]
+    
+    # Derived icons: one for the .desktop file plus the hicolor sizes install.sh installs
+    if icons:
+        tar_files.append((icons["png"], f"{ICON_NAME}.png"))
+        tar_files += [(f, f"icons/hicolor/{f.relative_to(icons['hicolor'])}")
+                      for f in sorted(icons["hicolor"].rglob('*.png'))]
+    return tar_files
+
+def create_portable_tarball(publish_dir, release_folder, version, codec=DEFAULT_TAR_CODEC,
+                            codec_target=DEFAULT_TARGET_SECONDS, icons=None, cache=None):
+    """Create the portable tarball from the multi-file build"""
     # Step 3: Create portable tarball from multi-file build
     print(f"\n📦 Step 3: Creating portable tarball...")
-    portable_tar = release_folder / f"AkademiTrack-linux-Portable.tar.gz"
+    desktop_content = create_desktop_file(version, "/opt/akademitrack")
+    tar_files = tarball_files(publish_dir, icons)
+    
+    # Manifest of every installed file, used by install.sh for incremental upgrades
+    manifest = {rel_path: file_sha256(f) for f, rel_path in tar_files}
+    manifest["akademitrack.desktop"] = hashlib.sha256(desktop_content.encode()).hexdigest()
+    manifest_bytes = "".join(f"{digest}  {path}\n" for path, digest in sorted(manifest.items())).encode()
+    
+    # The manifest covers every member, so it keys the archive (before any codec benchmark)
+    cache_key = None
+    if cache:
+        cache_key = cache.key("tarball", codec, codec_target if codec == "auto" else None,
+                              hashlib.sha256(manifest_bytes).hexdigest())
+        cached_tar = cache.fetch_file(cache_key, release_folder, "Portable tarball")
+        if cached_tar:
+            return cached_tar
+    
+    codec = resolve_codec(codec, TAR_CODECS, publish_dir, codec_target)
+    portable_tar = release_folder / f"AkademiTrack-linux-Portable{TAR_CODECS[codec]['extension']}"
     
     try:
-        with tarfile.open(portable_tar, 'w:gz') as tar:
-            file_count = 0
-            for file_path in publish_dir.rglob('*'):
-                if file_path.is_file():
-                    arc_name = f"AkademiTrack/{file_path.relative_to(publish_dir)}"
-                    tar.add(file_path, arcname=arc_name)
-                    file_count += 1
+        with open_tar_writer(portable_tar, codec) as tar:
+            # The manifest goes first so install.sh can read it without scanning the archive
+            manifest_info = tarfile.TarInfo(f"AkademiTrack/{INSTALL_MANIFEST_NAME}")
+            manifest_info.size = len(manifest_bytes)
+            manifest_info.mode = 0o644
+            manifest_info.mtime = int(time.time())
+            tar.addfile(manifest_info, io.BytesIO(manifest_bytes))
             
-            # Add desktop file to tarball
-            desktop_content = create_desktop_file(version, "/opt/akademitrack")
-            import tempfile
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.desktop', delete=False) as f:
-                f.write(desktop_content)
-                desktop_temp = f.name
+            # Identical files are stored once; the copies become hardlink entries
+            add_deduplicated(tar, [(f, f"AkademiTrack/{rel_path}") for f, rel_path in tar_files],
+                             {f"AkademiTrack/{rel_path}": digest for rel_path, digest in manifest.items()})
+            file_count = len(tar_files)
             
-            tar.add(desktop_temp, arcname="AkademiTrack/akademitrack.desktop")
-            os.unlink(desktop_temp)
+            # Add desktop file to tarball (generated in memory, no temp file)
+            desktop_bytes = desktop_content.encode()
+            desktop_info = tarfile.TarInfo("AkademiTrack/akademitrack.desktop")
+            desktop_info.size = len(desktop_bytes)
+            desktop_info.mode = 0o644
+            desktop_info.mtime = manifest_info.mtime
+            tar.addfile(desktop_info, io.BytesIO(desktop_bytes))
             file_count += 1
             
-            print(f"✅ Added {file_count} files to portable tarball")
+            print(f"✅ Added {file_count} files to portable tarball (+ install manifest)")
     except Exception as e:
         print(f"❌ Failed to create portable tarball: {e}")
         return False
     
     portable_size = portable_tar.stat().st_size / 1024 / 1024
-    print(f"✅ Portable tarball created: {portable_tar.name} ({portable_size:.1f} MB)")
-    
+    print(f"✅ Portable tarball created: {portable_tar.name} ({portable_size:.1f} MB, {codec})")
+    if cache_key:
+        cache.store_tree(cache_key, portable_tar, "Portable tarball")
+    return portable_tar
+
+def create_velopack_package(publish_dir, releases_dir, release_folder, version, icon_path=None):
+    """Create the Velopack package; returns the .nupkg path or None"""
     # Step 4: Create Velopack release package
     print(f"\n📦 Step 4: Creating Velopack release package...")
+    release_file = None
     try:
         # Create releases directory
-        releases_dir = Path("./Releases")
-        releases_dir.mkdir(exist_ok=True)
+        releases_dir.mkdir(parents=True, exist_ok=True)
+        before = snapshot_artifacts(releases_dir)
         
         # Use vpk to pack the app
         vpk_cmd = [
@@ -224,19 +287,17 @@ def build_linux_release(version):
             "--mainExe", "AkademiTrack"
         ]
         
-        # Add icon if it exists (look for PNG version for Linux)
-        icon_png = Path("./Assets/AT-1024.png")
-        if icon_png.exists():
-            vpk_cmd.extend(["--icon", str(icon_png)])
+        if icon_path:
+            vpk_cmd.extend(["--icon", str(icon_path)])
         
         print(f"Running: {' '.join(vpk_cmd)}")
-        result = subprocess.run(vpk_cmd, capture_output=True, text=True)
+        result = run_streaming(vpk_cmd, log_name="vpk pack", timeout=VPK_TIMEOUT, echo=True)
         
         if result.returncode == 0:
-            # Find the created release file
-            release_files = list(releases_dir.glob(f"AkademiTrack-{version}-*.nupkg"))
-            if release_files:
-                release_file = release_files[0]
+            # Exactly this version's full package for this RID (the folder holds every platform)
+            register_new_artifacts(releases_dir, before, version, "linux-x64")
+            release_file = find_artifact(releases_dir, version, "linux-x64")
+            if release_file:
                 velopack_size = release_file.stat().st_size / 1024 / 1024
                 print(f"✅ Velopack release created: {release_file.name} ({velopack_size:.1f} MB)")
                 
@@ -249,14 +310,19 @@ def build_linux_release(version):
                     shutil.copy2(releases_file, release_folder / "RELEASES")
                     print(f"✅ RELEASES file copied")
             else:
+                release_file = None
                 print("⚠️  Velopack release file not found")
         else:
-            print(f"⚠️  Velopack packaging failed: {result.stderr}")
+            print(f"⚠️  Velopack packaging failed: {result.error_summary()}")
             print("💡 Make sure 'vpk' tool is installed: dotnet tool install -g vpk")
     except Exception as e:
         print(f"⚠️  Velopack packaging failed: {e}")
         print("💡 Make sure 'vpk' tool is installed: dotnet tool install -g vpk")
     
+    return release_file
+
+def add_standalone_binary(binary_single, release_folder):
+    """Copy the single-file binary into the release folder"""
     # Step 5: Copy the standalone single-file binary to release folder
     print(f"\n📦 Step 5: Adding standalone single-file binary...")
     standalone_binary = release_folder / "AkademiTrack"
@@ -264,16 +330,31 @@ def build_linux_release(version):
     os.chmod(standalone_binary, 0o755)
     standalone_size = standalone_binary.stat().st_size / 1024 / 1024
     print(f"✅ Standalone single-file binary: {standalone_binary.name} ({standalone_size:.1f} MB)")
-    
+    return standalone_binary
+
+def create_install_script(release_folder, version, archive_name):
+    """Write install.sh into the release folder"""
     # Step 6: Create install script
     print(f"\n📦 Step 6: Creating install script...")
     install_script = release_folder / "install.sh"
     install_content = f"""#!/bin/bash
 # AkademiTrack Linux Installation Script
+#
+# Streams the portable tarball straight into the install directory and only
+# writes files whose hash differs from the installed manifest. Each file is
+# moved into place with a rename, and files dropped from the release are
+# removed, so upgrades touch only what actually changed.
+
+set -euo pipefail
 
 INSTALL_DIR="/opt/akademitrack"
 DESKTOP_FILE="/usr/share/applications/akademitrack.desktop"
 BIN_LINK="/usr/local/bin/akademitrack"
+ICON_THEME_DIR="/usr/share/icons/hicolor"
+SCRIPT_DIR="$(cd "$(dirname "${{BASH_SOURCE[0]}}")" && pwd)"
+ARCHIVE="$SCRIPT_DIR/{archive_name}"
+MANIFEST="{INSTALL_MANIFEST_NAME}"
+STAGING="$INSTALL_DIR/.install-staging"
 
 echo "🚀 Installing AkademiTrack v{version}..."
 
@@ -283,20 +364,90 @@ if [ "$EUID" -ne 0 ]; then
     exit 1
 fi
 
-# Create install directory
-echo "📁 Creating installation directory..."
+if [ ! -f "$ARCHIVE" ]; then
+    echo "❌ Archive not found: $ARCHIVE"
+    exit 1
+fi
+
+# Create install directory (staging lives inside it so renames stay on one filesystem)
+echo "📁 Preparing installation directory..."
 mkdir -p "$INSTALL_DIR"
+rm -rf "$STAGING"
+mkdir -p "$STAGING/files"
+trap 'rm -rf "$STAGING"' EXIT
+
+# Read the new manifest (first archive member, so tar stops right after it)
+tar -xOf "$ARCHIVE" --occurrence=1 "AkademiTrack/$MANIFEST" > "$STAGING/new.manifest"
+if [ -f "$INSTALL_DIR/$MANIFEST" ]; then
+    cp "$INSTALL_DIR/$MANIFEST" "$STAGING/old.manifest"
+else
+    : > "$STAGING/old.manifest"
+fi
+LC_ALL=C sort -o "$STAGING/new.manifest" "$STAGING/new.manifest"
+LC_ALL=C sort -o "$STAGING/old.manifest" "$STAGING/old.manifest"
+
+# Files whose hash changed, plus unchanged ones that are missing or modified on disk
+LC_ALL=C comm -23 "$STAGING/new.manifest" "$STAGING/old.manifest" | cut -c67- > "$STAGING/changed.list"
+LC_ALL=C comm -12 "$STAGING/new.manifest" "$STAGING/old.manifest" > "$STAGING/unchanged.manifest"
+(cd "$INSTALL_DIR" && sha256sum --quiet -c "$STAGING/unchanged.manifest" 2>/dev/null || true) \\
+    | sed -n 's/: FAILED.*$//p' >> "$STAGING/changed.list"
+
+# Copies of identical files are hardlinks in the archive; extract every path
+# sharing a changed hash so each link finds its target
+awk 'NR == FNR {{ want[$0]; next }} substr($0, 67) in want {{ print $1 }}' \
+    "$STAGING/changed.list" "$STAGING/new.manifest" | LC_ALL=C sort -u > "$STAGING/changed.hashes"
+awk 'NR == FNR {{ want[$0]; next }} $1 in want {{ print substr($0, 67) }}' \
+    "$STAGING/changed.hashes" "$STAGING/new.manifest" > "$STAGING/extract.list"
 
-# Extract files
-echo "📦 Extracting files..."
-tar -xzf AkademiTrack-linux-Portable.tar.gz -C /opt/
-mv /opt/AkademiTrack/* "$INSTALL_DIR/"
-rmdir /opt/AkademiTrack
+# Files that are no longer part of the release
+cut -c67- "$STAGING/new.manifest" | LC_ALL=C sort > "$STAGING/new.paths"
+cut -c67- "$STAGING/old.manifest" | LC_ALL=C sort > "$STAGING/old.paths"
+LC_ALL=C comm -23 "$STAGING/old.paths" "$STAGING/new.paths" > "$STAGING/removed.list"
+
+CHANGED=$(wc -l < "$STAGING/changed.list")
+REMOVED=$(wc -l < "$STAGING/removed.list")
+TOTAL=$(wc -l < "$STAGING/new.manifest")
+echo "📋 $CHANGED of $TOTAL files changed, $REMOVED to remove"
+
+# Extract only the changed files in one streaming pass over the archive
+if [ "$CHANGED" -gt 0 ]; then
+    echo "📦 Extracting changed files..."
+    sed 's|^|AkademiTrack/|' "$STAGING/extract.list" > "$STAGING/members.list"
+    tar -xf "$ARCHIVE" -C "$STAGING/files" --strip-components=1 \\
+        --verbatim-files-from -T "$STAGING/members.list"
+
+    # Atomic per-file replacement: rename(2) within the same filesystem
+    while IFS= read -r path; do
+        mkdir -p "$(dirname "$INSTALL_DIR/$path")"
+        mv -f "$STAGING/files/$path" "$INSTALL_DIR/$path"
+    done < "$STAGING/extract.list"
+fi
+
+if [ "$REMOVED" -gt 0 ]; then
+    echo "🧹 Removing files dropped from this release..."
+    while IFS= read -r path; do
+        rm -f "$INSTALL_DIR/$path"
+    done < "$STAGING/removed.list"
+    find "$INSTALL_DIR" -mindepth 1 -type d -empty -not -path "$STAGING*" -delete
+fi
+
+# Record what is installed now (last, so an interrupted upgrade is redone next time)
+mv -f "$STAGING/new.manifest" "$INSTALL_DIR/$MANIFEST"
 
 # Set permissions
 echo "🔐 Setting permissions..."
 chmod +x "$INSTALL_DIR/AkademiTrack"
 
+# Install icons into the hicolor theme
+if [ -d "$INSTALL_DIR/icons/hicolor" ]; then
+    echo "🎨 Installing icons..."
+    mkdir -p "$ICON_THEME_DIR"
+    cp -r "$INSTALL_DIR/icons/hicolor/." "$ICON_THEME_DIR/"
+    if command -v gtk-update-icon-cache &> /dev/null; then
+        gtk-update-icon-cache -q -t "$ICON_THEME_DIR" || true
+    fi
+fi
+
 # Create desktop entry
 echo "🖥️  Creating desktop entry..."
 cat > "$DESKTOP_FILE" << 'EOF'
@@ -306,7 +457,7 @@ Type=Application
 Name=AkademiTrack
 Comment=Academic tracking and management application
 Exec=/opt/akademitrack/AkademiTrack
-Icon=/opt/akademitrack/akademitrack
+Icon={ICON_NAME}
 Terminal=false
 Categories=Education;Office;
 StartupWMClass=AkademiTrack
@@ -326,13 +477,123 @@ echo "📋 You can now:"
 echo "  • Run 'akademitrack' from the terminal"
 echo "  • Launch from your application menu"
 echo ""
-echo "💡 To uninstall, run: sudo rm -rf $INSTALL_DIR $DESKTOP_FILE $BIN_LINK"
+echo "💡 To uninstall, run: sudo rm -rf $INSTALL_DIR $DESKTOP_FILE $BIN_LINK $ICON_THEME_DIR/*/apps/{ICON_NAME}.png"
 """
     
     with open(install_script, 'w') as f:
         f.write(install_content)
     os.chmod(install_script, 0o755)
     print(f"✅ Install script created: {install_script.name}")
+    return install_script
+
+def build_linux_release(version, work_dir=Path("."), release_folder=None, releases_dir=None,
+                        build_session=None, checkpoints=None, codec=DEFAULT_TAR_CODEC,
+                        codec_target=DEFAULT_TARGET_SECONDS, icons=None,
+                        size_budget=DEFAULT_SIZE_BUDGET):
+    """Build Linux release - creates portable tarball and standalone binary"""
+    
+    print(f"\n🏗️  Building AkademiTrack for Linux (x64)...")
+    print("=" * 50)
+    
+    # Icons are derived from the master PNG (cached when it has not changed)
+    if icons is None:
+        icons = derive_icons()
+    if not icons:
+        return False
+    
+    # Directories
+    publish_dir = Path(work_dir) / "publish-linux"
+    publish_single = Path(work_dir) / "publish-linux-single"
+    if release_folder is None:
+        release_folder = Path(f"./Releases/v{version}")
+    if releases_dir is None:
+        releases_dir = Path("./Releases")
+    if build_session is None:
+        build_session = BuildServerSession()
+    if checkpoints is None:
+        checkpoints = StageCheckpoints.disabled()
+    
+    # Clean directories (a resumed build keeps what its checkpoints verified)
+    if not checkpoints.resuming:
+        if publish_dir.exists():
+            print(f"🧹 Cleaning publish directory...")
+            shutil.rmtree(publish_dir)
+        
+        if publish_single.exists():
+            print(f"🧹 Cleaning single-file directory...")
+            shutil.rmtree(publish_single)
+        
+        if release_folder.exists():
+            print(f"🧹 Cleaning release folder...")
+            shutil.rmtree(release_folder)
+    
+    release_folder.mkdir(parents=True, exist_ok=True)
+    
+    skip_publish = checkpoints.should_skip("publish")
+    skip_single = checkpoints.should_skip("publish-single")
+    
+    # Restore once for both publishes below
+    if not (skip_publish and skip_single):
+        if not ensure_restored(["linux-x64"]):
+            return False
+    
+    if not skip_publish:
+        if not publish_multi_file(publish_dir, build_session):
+            return False
+        # Pruned inside the stage so a resumed build verifies the pruned tree
+        prune_assets(publish_dir, "linux")
+        checkpoints.complete("publish", [publish_dir])
+    
+    # The single-file output is only copied out again, so it can be staged in RAM
+    if skip_single:
+        # scratch_path may pick another place this run; the checkpoint verified the one it recorded
+        publish_single = Path(checkpoints.extra("publish-single", "path", publish_single))
+    else:
+        publish_single = scratch_path(publish_single, tree_size(publish_dir) if publish_dir.exists() else 0)
+        if publish_single.exists():
+            shutil.rmtree(publish_single)
+    
+    binary_single = publish_single / "AkademiTrack"
+    if not skip_single:
+        if not publish_single_file(publish_single, build_session):
+            return False
+        checkpoints.complete("publish-single", [publish_single], path=publish_single)
+    
+    if checkpoints.should_skip("tarball"):
+        portable_tar = Path(checkpoints.extra("tarball", "path"))
+    else:
+        portable_tar = create_portable_tarball(publish_dir, release_folder, version, codec, codec_target,
+                                               icons, build_session.cache)
+        if not portable_tar:
+            return False
+        # Read back every member (cached tarballs included) before anything ships it
+        expected = expected_entries((f, f"AkademiTrack/{rel_path}")
+                                    for f, rel_path in tarball_files(publish_dir, icons))
+        if not verify_archive(portable_tar, expected,
+                              generated=[f"AkademiTrack/{INSTALL_MANIFEST_NAME}",
+                                         "AkademiTrack/akademitrack.desktop"]):
+            return False
+        checkpoints.complete("tarball", [portable_tar], path=portable_tar)
+    
+    # Size breakdown vs the previous release; cheap, so it also runs on resumed builds
+    if not check_size_budget(publish_dir, release_folder, "linux-x64", version,
+                             [portable_tar, binary_single], size_budget):
+        return False
+    
+    # Velopack failures are not fatal; without a checkpoint --resume retries just this step
+    if not checkpoints.should_skip("velopack"):
+        release_file = create_velopack_package(publish_dir, releases_dir, release_folder, version,
+                                               icons["hicolor"] / "512x512" / "apps" / f"{ICON_NAME}.png")
+        if release_file:
+            checkpoints.complete("velopack", [release_folder / release_file.name])
+    
+    if not checkpoints.should_skip("standalone"):
+        standalone_binary = add_standalone_binary(binary_single, release_folder)
+        checkpoints.complete("standalone", [standalone_binary])
+    
+    if not checkpoints.should_skip("install-script"):
+        install_script = create_install_script(release_folder, version, portable_tar.name)
+        checkpoints.complete("install-script", [install_script])
     
     # Verify the release folder exists and has files
     if not release_folder.exists():
@@ -344,12 +605,153 @@ echo "💡 To uninstall, run: sudo rm -rf $INSTALL_DIR $DESKTOP_FILE $BIN_LINK"
         print(f"❌ Release folder is empty!")
         return False
     
+    # Kept on failure so --resume can reuse it
+    discard_scratch(publish_single)
     return release_folder
 
+def stage_sources(script_text):
+    """Source of the functions behind each stage, to see which stages a script edit affects"""
+    functions = {node.name: ast.get_source_segment(script_text, node)
+                 for node in ast.parse(script_text).body if isinstance(node, ast.FunctionDef)}
+    return {stage: [functions.get(name) for name in names] for stage, names in STAGE_FUNCTIONS.items()}
+
+def affected_stage(changes, script_name, script_state):
+    """First stage a batch of changed paths invalidates (None when nothing relevant changed)"""
+    stages = set()
+    for rel_path in changes:
+        if rel_path != script_name:
+            # Sources, the .csproj, Assets/ and Changelogs/ all feed dotnet publish
+            stages.add("publish")
+            continue
+        try:
+            script_text = Path(script_name).read_text(encoding="utf-8-sig")
+            sources = stage_sources(script_text)
+        except (OSError, SyntaxError) as e:
+            print(f"❌ {script_name}: {e}")
+            continue
+        if script_text == script_state["text"]:
+            continue
+        changed = [stage for stage in LINUX_STAGES if sources[stage] != script_state["sources"][stage]]
+        # Edits outside the stage functions may touch any packaging step, not the publishes
+        stages.add(changed[0] if changed else "tarball")
+        script_state.update(text=script_text, sources=sources, reload=True)
+    return min(stages, key=LINUX_STAGES.index) if stages else None
+
+def watch_linux_release(version, build_session, checkpoints, build_options):
+    """Rebuild whenever the project or this script changes, from the first affected stage"""
+    script_name = Path(__file__).name
+    script_text = Path(__file__).read_text(encoding="utf-8-sig")
+    script_state = {"text": script_text, "sources": stage_sources(script_text), "reload": False}
+    build = sys.modules[__name__]
+    watcher = open_watcher(".", extra_files=[script_name])
+    sources = source_digest() if build_session.cache else None
+    print(f"\n👀 Watching sources, Assets/, {CHANGELOG_DIR.name}/ and {script_name} ({watcher.mode})")
+    print("💡 Press Ctrl+C to stop")
+    try:
+        while True:
+            changes = watcher.wait()
+            stage = affected_stage(changes, script_name, script_state)
+            if stage is None:
+                continue
+            shown = sorted(changes)
+            print(f"\n🔄 {len(changes)} change(s): {', '.join(shown[:5])}{' ...' if len(shown) > 5 else ''}")
+            print("=" * 50)
+            started = time.time()
+            if any(path.startswith(f"{CHANGELOG_DIR.name}/") for path in changes) and not compile_changelogs(version):
+                print("❌ Changelogs are invalid; waiting for the next change")
+                continue
+            if script_state["reload"]:
+                try:
+                    # The edited script, so the rebuild runs its new code
+                    build = load_build_script(Path(__file__).resolve())
+                except Exception as e:
+                    print(f"❌ Could not load {script_name}: {e}; waiting for the next change")
+                    continue
+                script_state["reload"] = False
+            # Cached publishes are keyed on the sources, which this change may have edited
+            reset_source_digest()
+            if build_session.cache and stage == "publish":
+                previous, sources = sources, source_digest()
+                if sources == previous:
+                    print("ℹ️  Project inputs are unchanged; the cached publish stays valid")
+            checkpoints.rewind(stage)
+            release_folder = build.build_linux_release(version, build_session=build_session,
+                                                       checkpoints=checkpoints, **build_options)
+            if release_folder:
+                print(f"\n✅ Rebuilt from '{stage}' in {time.time() - started:.1f}s: {release_folder}/")
+            else:
+                print(f"\n❌ Rebuild from '{stage}' failed after {time.time() - started:.1f}s; "
+                      f"waiting for the next change")
+    except KeyboardInterrupt:
+        print("\n\n👋 Stopped watching")
+    finally:
+        watcher.close()
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="AkademiTrack Linux build & package tool")
+    parser.add_argument("--build-servers", choices=BUILD_SERVER_MODES, default="default",
+                        help="warm: keep MSBuild/compiler servers alive across publishes; "
+                             "cold: disable them (baseline timings)")
+    parser.add_argument("--cache", metavar="URL",
+                        help="Shared build cache server (default: $AKADEMITRACK_BUILD_CACHE); outputs "
+                             "another builder already produced are pulled instead of rebuilt")
+    parser.add_argument("--cache-readonly", action="store_true",
+                        help="Pull from the build cache but never upload to it")
+    # zst-* only when the optional zstandard package is installed, so a missing one fails here
+    parser.add_argument("--codec", choices=list(available_codecs(TAR_CODECS)) + ["auto"], default=DEFAULT_TAR_CODEC,
+                        help="Tarball compression; 'auto' benchmarks the publish output and picks "
+                             "the smallest codec that meets --codec-target (zst-* need pip install zstandard)")
+    parser.add_argument("--codec-target", type=float, default=DEFAULT_TARGET_SECONDS,
+                        help="Time budget in seconds for compressing the tarball in auto mode")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue a failed build from its last verified stage checkpoint")
+    parser.add_argument("--size-budget", type=float, default=DEFAULT_SIZE_BUDGET,
+                        help=f"Allowed size growth in percent vs the previous release "
+                             f"(default: {DEFAULT_SIZE_BUDGET:g})")
+    parser.add_argument("--allow-size-growth", action="store_true",
+                        help="Report size growth without failing the build")
+    parser.add_argument("--ram-scratch", nargs="?", const="auto", metavar="DIR",
+                        help="Stage transient output on a tmpfs (/dev/shm, or DIR); falls back to "
+                             "disk when it does not fit")
+    parser.add_argument("--watch", action="store_true",
+                        help="After building, keep watching the project and this script's templates and "
+                             "rebuild only the stages a change affects")
+    parser.add_argument("--matrix", nargs="?", const=",".join(VARIANT_PROPERTIES), metavar="DIMS",
+                        help=f"Instead of building a release, publish every combination of these settings "
+                             f"({','.join(VARIANT_PROPERTIES)}; default: all) and compare size and startup time")
+    parser.add_argument("--matrix-runs", type=int, default=DEFAULT_RUNS,
+                        help=f"Cold and warm starts timed per variant (default: {DEFAULT_RUNS})")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    if args.watch and args.ram_scratch:
+        # Scratch output is discarded after every build, so each rebuild would publish again
+        print("⚠️  --ram-scratch is ignored with --watch")
+        args.ram_scratch = None
+    configure_scratch(args.ram_scratch)
+
     print("🚀 AkademiTrack Linux Build & Package Tool")
     print("=" * 50)
     
+    # Missing tools fail here in seconds, not after two publishes and a tarball
+    if not run_preflight(build_checks(["linux-x64"], velopack=not args.matrix)):
+        return
+    
+    if args.matrix:
+        dimensions = [d.strip() for d in args.matrix.split(",") if d.strip()]
+        cache = open_build_cache(args.cache, push=not args.cache_readonly)
+        try:
+            with BuildServerSession(args.build_servers, cache) as build_session:
+                rows = run_variant_matrix(dimensions, build_session, runs=args.matrix_runs)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
+        if rows:
+            print_matrix_report(rows)
+        return
+    
     # Get version number
     version = get_version_input()
     print(f"\n📌 Using version: {version}")
@@ -359,8 +761,26 @@ def main():
     if update_proj == 'y':  # Only updates if you type 'y'
         update_csproj_version(version)
     
+    # Validate changelogs up front so a typo fails in seconds, not after publishing
+    if not compile_changelogs(version):
+        print("\n❌ Build failed!")
+        return
+    
     # Build everything
-    release_folder = build_linux_release(version)
+    checkpoints = StageCheckpoints("linux", version, LINUX_STAGES,
+                                   options={"codec": args.codec,
+                                            "codec_target": args.codec_target if args.codec == "auto" else None,
+                                            "scratch": scratch_root()},
+                                   resume=args.resume)
+    cache = open_build_cache(args.cache, push=not args.cache_readonly)
+    build_options = {"codec": args.codec, "codec_target": args.codec_target,
+                     "size_budget": None if args.allow_size_growth else args.size_budget}
+    with BuildServerSession(args.build_servers, cache) as build_session:
+        release_folder = build_linux_release(version, build_session=build_session,
+                                             checkpoints=checkpoints, **build_options)
+        if args.watch:
+            watch_linux_release(version, build_session, checkpoints, build_options)
+            return
     
     if release_folder:
         print("\n" + "=" * 50)
@@ -377,7 +797,7 @@ def main():
         
         print("\n📋 Files created:")
         print(f"  • AkademiTrack - Standalone single-file binary (RUN THIS ONE!)")
-        print(f"  • AkademiTrack-linux-Portable.tar.gz - Portable tarball package")
+        print(f"  • AkademiTrack-linux-Portable.tar.* - Portable tarball package")
         print(f"  • AkademiTrack-{version}-*.nupkg - Velopack release package (for auto-updates)")
         print(f"  • RELEASES - Velopack releases index file")
         print(f"  • install.sh - Installation script (sudo ./install.sh)")
@@ -391,7 +811,7 @@ def main():
         print("\n🔧 Installation options:")
         print("  1. Standalone: Just run ./AkademiTrack")
         print("  2. System-wide: sudo ./install.sh (installs to /opt/akademitrack)")
-        print("  3. Extract tarball: tar -xzf AkademiTrack-linux-Portable.tar.gz")
+        print("  3. Extract tarball: tar -xf AkademiTrack-linux-Portable.tar.*")
     else:
         print("\n❌ Build failed!")
 
@@ -1,13 +1,32 @@
 #!/usr/bin/env python3
+import argparse
+import json
 import os
 import shutil
 import subprocess
+import tempfile
 import zipfile
 from pathlib import Path
 import re
 import xml.etree.ElementTree as ET
 import time
 
+from buildtools.artifacts import find_artifact, register_new_artifacts, snapshot_artifacts
+from buildtools.archives import find_duplicates, patch_zip, print_duplicate_report
+from buildtools.assets import prune_assets
+from buildtools.buildcache import manifest_digest, open_build_cache, tree_manifest
+from buildtools.buildserver import BUILD_SERVER_MODES, BuildServerSession
+from buildtools.bundlezip import ditto_zip
+from buildtools.changelogs import compile_changelogs
+from buildtools.common import file_sha256
+from buildtools.checkpoints import StageCheckpoints
+from buildtools.icons import derive_icons
+from buildtools.preflight import build_checks, mac_checks, run_preflight
+from buildtools.restore import ensure_restored
+from buildtools.runner import run_streaming
+from buildtools.scratch import configure_scratch, scratch_path, tree_size
+from buildtools.sizes import DEFAULT_SIZE_BUDGET, check_size_budget
+
 # ============================================================================
 # CONFIGURATION - Update these values
 # ============================================================================
@@ -24,10 +43,19 @@ APP_SPECIFIC_PASSWORD = "sdf-sdf-sdf-sdf"  # Generate at appleid.apple.com
 # App Details
 APP_NAME = "AkademiTrack"
 BUNDLE_IDENTIFIER = "com.CyberBrothers.akademitrack"
-ICON_PATH = "./Assets/AT-1024.icns"
 ENTITLEMENTS_PATH = Path("./entitlements.plist")
 HELPER_APP_SOURCE = Path("./Assets/Helpers/AkademiTrack.app")
 XCODE_PROJECT_PATH = Path("./AkademiTrack/AkademiTrack.xcodeproj")
+PROJECT_PATH = "./AkademiTrack.csproj"
+
+# Timeouts (seconds) for the long-running external tools
+XCODEBUILD_TIMEOUT = 30 * 60
+NOTARIZE_TIMEOUT = 60 * 60
+VPK_TIMEOUT = 20 * 60
+
+# Bundle zips: "ditto", "python" (buildtools/bundlezip.py, parallel) or "auto" (ditto when installed)
+ZIP_TOOL = "auto"
+ZIP_TOOLS = ["auto", "ditto", "python"]
 
 # ============================================================================
 # WIDGET BUILD FUNCTION
@@ -52,12 +80,13 @@ def build_widget_extension():
         "build"
     ]
     
-    result = run_command(cmd, "Building widget extension", check=False, show_output=True)
+    result = run_command(cmd, "Building widget extension", check=False, show_output=True,
+                         timeout=XCODEBUILD_TIMEOUT)
     
     if not result or result.returncode != 0:
         print("⚠️  Widget build failed - continuing without widget")
         if result:
-            print(f"Error output: {result.stderr}")
+            print(f"Error output: {result.error_summary()}")
         return None
     
     # Find the built widget extension
@@ -115,20 +144,43 @@ def create_launchagent_plist(version):
 # HELPER FUNCTIONS
 # ============================================================================
 
-def run_command(cmd, description="", check=True, show_output=False):
-    """Run a command and handle errors"""
+def run_command(cmd, description="", check=True, show_output=False, timeout=None):
+    """Run a command and handle errors
+
+    Output is streamed to a log file under build-logs/ (and to the console
+    when show_output is set); only the tail is kept in memory.
+    """
     if description:
         print(f"  {description}...")
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    
-    if show_output and result.stdout:
-        print(result.stdout)
+    result = run_streaming(cmd, log_name=description or Path(cmd[0]).name,
+                           timeout=timeout, echo=show_output, prefix="    ")
     
     if check and result.returncode != 0:
-        print(f"❌ Failed: {result.stderr}")
+        print(f"❌ Failed: {result.error_summary()}")
         return None
     return result
 
+def zip_app_bundle(bundle_dir, zip_path, description, sequester_rsrc=False):
+    """Zip an .app like `ditto -c -k --keepParent` with the tool selected by ZIP_TOOL; True on success"""
+    tool = ZIP_TOOL
+    if tool == "auto":
+        tool = "ditto" if shutil.which("ditto") else "python"
+    if tool == "ditto":
+        cmd = ["ditto", "-c", "-k"] + (["--sequesterRsrc"] if sequester_rsrc else []) + \
+              ["--keepParent", str(bundle_dir), str(zip_path)]
+        result = run_command(cmd, f"{description} with ditto", check=False)
+        return bool(result and result.returncode == 0)
+
+    print(f"  {description} with the Python archiver...")
+    try:
+        stats = ditto_zip(bundle_dir, zip_path, sequester_rsrc=sequester_rsrc)
+    except OSError as e:
+        print(f"❌ Archiving failed: {e}")
+        return False
+    print(f"  ✅ {stats['entries']} entries, {stats['bytes_in'] / 1024 / 1024:.1f} MB -> "
+          f"{stats['bytes_out'] / 1024 / 1024:.1f} MB in {stats['seconds']:.1f}s")
+    return True
+
 def get_version_input():
     """Get version number from user or use current version from .csproj"""
     print("\n📦 Version Configuration")
@@ -362,26 +414,45 @@ def sign_pkg(pkg_path, identity):
 # NOTARIZATION FUNCTIONS
 # ============================================================================
 
+def notarize_archive_record(bundle_dir):
+    """Note left next to an .app whose notarization zip was kept for create_portable_zip"""
+    bundle_dir = Path(bundle_dir)
+    return bundle_dir.parent / f"{bundle_dir.stem}-notarize.json"
+
+def take_notarize_archive(bundle_dir):
+    """Claim the kept notarization zip of a stapled .app; returns (zip path, seconds ditto took) or (None, None)"""
+    record = notarize_archive_record(bundle_dir)
+    if not record.exists():
+        return None, None
+    info = json.loads(record.read_text(encoding="utf-8"))
+    record.unlink()
+    archive = Path(info["zip"])
+    return (archive, info["seconds"]) if archive.exists() else (None, None)
+
+def discard_notarize_archive(bundle_dir):
+    """Delete a kept notarization zip nobody turned into the portable zip"""
+    archive, _ = take_notarize_archive(bundle_dir)
+    if archive:
+        archive.unlink()
+
 def notarize_file(file_path, bundle_id):
     """Submit file for notarization and wait for result"""
-    import json
-
     print(f"\n📝 Notarizing {file_path.name}...")
     print("⏳ This may take 5–15 minutes...")
 
     # For .app bundles, we need to zip them first
+    zip_seconds = None
     if file_path.suffix == '.app':
+        discard_notarize_archive(file_path)
         print("  Creating temporary zip for notarization...")
-        zip_path = file_path.parent / f"{file_path.stem}-notarize.zip"
+        zip_path = scratch_path(file_path.parent / f"{file_path.stem}-notarize.zip", tree_size(file_path))
         
-        # Use ditto to preserve code signatures
-        result = run_command(
-            ["ditto", "-c", "-k", "--keepParent", str(file_path), str(zip_path)],
-            "Creating zip with ditto",
-            check=False
-        )
+        # ditto (or its Python equivalent) preserves code signatures
+        zip_started = time.time()
+        zipped = zip_app_bundle(file_path, zip_path, "Creating zip")
+        zip_seconds = time.time() - zip_started
         
-        if not result or result.returncode != 0:
+        if not zipped:
             print("❌ Failed to create zip")
             return False
         
@@ -401,12 +472,18 @@ def notarize_file(file_path, bundle_id):
     ]
 
     print(f"  Submitting to Apple notary service...")
-    result = run_command(cmd, check=False)
-
-    # Clean up temporary zip
-    if file_path.suffix == '.app' and notarize_target.exists() and notarize_target != file_path:
-        notarize_target.unlink()
+    result = run_command(cmd, "Waiting for notarization", check=False, timeout=NOTARIZE_TIMEOUT)
 
+    archive = notarize_target if notarize_target != file_path else None
+    try:
+        return finish_notarization(result, file_path, archive, zip_seconds)
+    finally:
+        # Clean up temporary zip (unless it was kept for the portable zip)
+        if archive and archive.exists() and not notarize_archive_record(file_path).exists():
+            archive.unlink()
+
+def finish_notarization(result, file_path, archive=None, archive_seconds=None):
+    """Check the notarytool response and staple the ticket; archive is the submitted zip of an .app"""
     if not result:
         print("❌ Notarization command failed")
         return False
@@ -432,6 +509,11 @@ def notarize_file(file_path, bundle_id):
                 
                 if staple_result and staple_result.returncode == 0:
                     print("✅ Notarization ticket stapled")
+                    if archive:
+                        # The zip only lacks the ticket, so create_portable_zip patches it in
+                        notarize_archive_record(file_path).write_text(
+                            json.dumps({"zip": str(archive.absolute()), "seconds": archive_seconds}),
+                            encoding="utf-8")
                     
                     # Verify stapling
                     verify_result = run_command(
@@ -472,28 +554,20 @@ def notarize_file(file_path, bundle_id):
 # BUILD FUNCTIONS
 # ============================================================================
 
-def create_avalonia_macos_bundle(version, sign=True, notarize=True):
-    """Create .app bundle for macOS"""
-    PROJECT_PATH = "./AkademiTrack.csproj"
-    BUILD_DIR = "./build"
-    
-    print("\n🏗️  Building AkademiTrack app for macOS Apple Silicon...")
-    print("=" * 50)
-
-    if not os.path.exists(ICON_PATH):
-        print(f"❌ Icon file not found: {ICON_PATH}")
+def publish_macos_app(output_dir, build_session=None):
+    """Run `dotnet publish` for osx-arm64 into output_dir (works on any host)"""
+    if build_session is None:
+        build_session = BuildServerSession()
+    if not ensure_restored(["osx-arm64"]):
         return False
 
-    if os.path.exists(BUILD_DIR):
-        print(f"🧹 Cleaning existing build directory: {BUILD_DIR}")
-        shutil.rmtree(BUILD_DIR)
-
     build_cmd = [
         "dotnet", "publish", PROJECT_PATH,
+        "--no-restore",
         "--configuration", "Release",
         "--runtime", "osx-arm64",
         "--self-contained", "true",
-        "--output", BUILD_DIR,
+        "--output", str(output_dir),
         "-p:PublishTrimmed=false",
         "-p:PublishSingleFile=false",
         "-p:IncludeNativeLibrariesForSelfExtract=true",
@@ -502,13 +576,36 @@ def create_avalonia_macos_bundle(version, sign=True, notarize=True):
     ]
 
     print(f"🔨 Building...")
-    result = subprocess.run(build_cmd, capture_output=True, text=True)
+    result = build_session.run_publish(build_cmd, "osx-arm64")
     if result.returncode != 0:
-        print(f"❌ Build failed: {result.stderr}")
+        print(f"❌ Build failed: {result.error_summary()}")
         return False
     print("✅ Build completed successfully")
+    return True
+
+def unpack_prepublished(prepublished, output_dir):
+    """Copy a publish tree staged by build-release.py (directory or .tar.gz) into output_dir"""
+    prepublished = Path(prepublished)
+    print(f"📥 Using prepublished osx-arm64 output: {prepublished}")
+    if not prepublished.exists():
+        print(f"❌ Prepublished output not found: {prepublished}")
+        return False
 
-    build_path = Path(BUILD_DIR)
+    if prepublished.is_dir():
+        shutil.copytree(prepublished, output_dir, symlinks=True)
+    else:
+        import tarfile
+        Path(output_dir).mkdir(parents=True)
+        with tarfile.open(prepublished) as tar:
+            tar.extractall(output_dir)
+    print("✅ Prepublished output unpacked")
+    return True
+
+MAC_STAGES = ["publish", "bundle", "sign", "notarize", "zip", "pkg", "velopack"]
+WIDGET_ENTITLEMENTS_PATH = Path("./AkademiTrack/AkademiTrackWidgetExtension.entitlements")
+
+def assemble_app_bundle(build_path, version, icon_path):
+    """Assemble the .app bundle from the publish output (unsigned)"""
     executable_path = build_path / APP_NAME
     if not executable_path.exists():
         executables = [f for f in build_path.iterdir() if f.is_file() and os.access(f, os.X_OK)]
@@ -520,6 +617,9 @@ def create_avalonia_macos_bundle(version, sign=True, notarize=True):
 
     print("📦 Creating app bundle...")
     bundle_dir = build_path / f"{APP_NAME}.app"
+    if bundle_dir.exists():
+        # Left over from an interrupted run - always assemble from scratch
+        shutil.rmtree(bundle_dir)
     contents_dir = bundle_dir / "Contents"
     macos_dir = contents_dir / "MacOS"
     resources_dir = contents_dir / "Resources"
@@ -541,7 +641,7 @@ def create_avalonia_macos_bundle(version, sign=True, notarize=True):
     # Copy icon
     icon_filename = "AppIcon.icns"  # Use consistent name
     icon_dest = resources_dir / icon_filename
-    shutil.copy2(ICON_PATH, icon_dest)
+    shutil.copy2(icon_path, icon_dest)
 
     if ENTITLEMENTS_PATH.exists():
         entitlements_dest = resources_dir / "entitlements.plist"
@@ -614,36 +714,10 @@ def create_avalonia_macos_bundle(version, sign=True, notarize=True):
         plugins_dir.mkdir(exist_ok=True)
         
         widget_dest = plugins_dir / "AkademiTrackWidgetExtension.appex"
-        widget_entitlements = Path("./AkademiTrack/AkademiTrackWidgetExtension.entitlements")
         
         try:
             shutil.copytree(widget_path, widget_dest, dirs_exist_ok=True)
             print("✅ Widget extension bundled in PlugIns")
-            
-            if sign:
-                # Sign widget extension WITHOUT deep flag and with correct entitlements
-                print("  🔏 Signing widget extension...")
-                if widget_entitlements.exists():
-                    print(f"    Using widget entitlements: {widget_entitlements}")
-                    # Sign any executables inside widget first
-                    for widget_file in widget_dest.rglob("*"):
-                        if widget_file.is_file() and os.access(widget_file, os.X_OK):
-                            sign_file(widget_file, DEVELOPER_ID_APP, widget_entitlements)
-                    
-                    # Sign the widget extension bundle itself (NO --deep!)
-                    cmd = [
-                        "codesign", "--force", "--sign", DEVELOPER_ID_APP,
-                        "--timestamp", "--options", "runtime",
-                        "--entitlements", str(widget_entitlements),
-                        str(widget_dest)
-                    ]
-                    result = run_command(cmd, "Signing widget extension", check=False)
-                    if result and result.returncode == 0:
-                        print("  ✅ Widget extension signed successfully")
-                    else:
-                        print("  ⚠️ Widget signing failed")
-                else:
-                    print(f"  ⚠️ Widget entitlements not found at: {widget_entitlements}")
         except Exception as e:
             print(f"⚠️ Failed to bundle widget: {e}")
 
@@ -654,23 +728,132 @@ def create_avalonia_macos_bundle(version, sign=True, notarize=True):
         try:
             shutil.copytree(HELPER_APP_SOURCE, helper_dest, dirs_exist_ok=True)
             print("✅ Helper app bundled in Resources")
-            
-            if sign:
-                # Sign helper app first (it's nested)
-                sign_app(helper_dest, DEVELOPER_ID_APP, ENTITLEMENTS_PATH, deep=True)
         except Exception as e:
             print(f"⚠️ Failed to bundle helper: {e}")
 
+    return bundle_dir
+
+def sign_app_bundle(bundle_dir):
+    """Sign the widget extension, the helper app and finally the main app"""
+    widget_dest = bundle_dir / "Contents" / "PlugIns" / "AkademiTrackWidgetExtension.appex"
+    if widget_dest.exists():
+        # Sign widget extension WITHOUT deep flag and with correct entitlements
+        print("  🔏 Signing widget extension...")
+        if WIDGET_ENTITLEMENTS_PATH.exists():
+            print(f"    Using widget entitlements: {WIDGET_ENTITLEMENTS_PATH}")
+            # Sign any executables inside widget first
+            for widget_file in widget_dest.rglob("*"):
+                if widget_file.is_file() and os.access(widget_file, os.X_OK):
+                    sign_file(widget_file, DEVELOPER_ID_APP, WIDGET_ENTITLEMENTS_PATH)
+            
+            # Sign the widget extension bundle itself (NO --deep!)
+            cmd = [
+                "codesign", "--force", "--sign", DEVELOPER_ID_APP,
+                "--timestamp", "--options", "runtime",
+                "--entitlements", str(WIDGET_ENTITLEMENTS_PATH),
+                str(widget_dest)
+            ]
+            result = run_command(cmd, "Signing widget extension", check=False)
+            if result and result.returncode == 0:
+                print("  ✅ Widget extension signed successfully")
+            else:
+                print("  ⚠️ Widget signing failed")
+        else:
+            print(f"  ⚠️ Widget entitlements not found at: {WIDGET_ENTITLEMENTS_PATH}")
+
+    helper_dest = bundle_dir / "Contents" / "Resources" / "AkademiTrack.app"
+    if helper_dest.exists():
+        # Sign helper app first (it's nested)
+        sign_app(helper_dest, DEVELOPER_ID_APP, ENTITLEMENTS_PATH, deep=True)
+
     # Sign the main app
-    if sign:
-        if not sign_app(bundle_dir, DEVELOPER_ID_APP, ENTITLEMENTS_PATH, deep=True):
-            print("❌ Signing failed")
+    if not sign_app(bundle_dir, DEVELOPER_ID_APP, ENTITLEMENTS_PATH, deep=True):
+        print("❌ Signing failed")
+        return False
+    return True
+
+def signed_bundle_key(cache, bundle_dir):
+    """Cache key for the signed form of an unsigned bundle"""
+    entitlements = [file_sha256(p) if p.exists() else None
+                    for p in (ENTITLEMENTS_PATH, WIDGET_ENTITLEMENTS_PATH)]
+    return cache.key("signed-app", manifest_digest(tree_manifest(bundle_dir)), DEVELOPER_ID_APP, entitlements)
+
+def fetch_signed_bundle(cache, key, bundle_dir):
+    """Replace bundle_dir with a signed bundle from the build cache; True on a hit"""
+    with tempfile.TemporaryDirectory(prefix="akademitrack-signed-") as temp:
+        archive = cache.fetch_file(key, temp, "Signed app bundle")
+        if not archive:
             return False
+        shutil.rmtree(bundle_dir)
+        result = run_command(["ditto", "-x", "-k", str(archive), str(bundle_dir.parent)],
+                             "Unpacking signed bundle", check=False)
+        if result and result.returncode == 0 and bundle_dir.exists():
+            return True
+    print("⚠️  Cached signed bundle could not be unpacked, signing locally")
+    return False
+
+def store_signed_bundle(cache, key, bundle_dir):
+    """Upload the signed bundle; ditto keeps the signatures codesign stores in xattrs"""
+    with tempfile.TemporaryDirectory(prefix="akademitrack-signed-") as temp:
+        archive = Path(temp) / f"{bundle_dir.stem}-signed.zip"
+        if zip_app_bundle(bundle_dir, archive, "Archiving signed bundle", sequester_rsrc=True):
+            cache.store_tree(key, archive, "Signed app bundle")
+
+def create_avalonia_macos_bundle(version, sign=True, notarize=True, prepublished=None,
+                                 build_session=None, checkpoints=None, icons=None):
+    """Create .app bundle for macOS"""
+    BUILD_DIR = "./build"
+    if checkpoints is None:
+        checkpoints = StageCheckpoints.disabled()
+    
+    print("\n🏗️  Building AkademiTrack app for macOS Apple Silicon...")
+    print("=" * 50)
+
+    # Icons are derived from the master PNG (cached when it has not changed)
+    if icons is None:
+        icons = derive_icons()
+    if not icons:
+        return False
+
+    build_path = Path(BUILD_DIR)
+    bundle_dir = build_path / f"{APP_NAME}.app"
+
+    if not checkpoints.should_skip("publish"):
+        if os.path.exists(BUILD_DIR):
+            print(f"🧹 Cleaning existing build directory: {BUILD_DIR}")
+            shutil.rmtree(BUILD_DIR)
+
+        if prepublished:
+            if not unpack_prepublished(prepublished, BUILD_DIR):
+                return False
+        elif not publish_macos_app(BUILD_DIR, build_session):
+            return False
+        # Also covers staged publishes built before pruning existed
+        prune_assets(build_path, "osx")
+        checkpoints.complete("publish", list(build_path.iterdir()))
+
+    if not checkpoints.should_skip("bundle"):
+        if not assemble_app_bundle(build_path, version, icons["icns"]):
+            return False
+        checkpoints.complete("bundle", [bundle_dir])
+
+    if sign and not checkpoints.should_skip("sign"):
+        cache = build_session.cache if build_session else None
+        sign_key = signed_bundle_key(cache, bundle_dir) if cache else None
+        if not (sign_key and fetch_signed_bundle(cache, sign_key, bundle_dir)):
+            if not sign_app_bundle(bundle_dir):
+                return False
+            if sign_key:
+                store_signed_bundle(cache, sign_key, bundle_dir)
+        checkpoints.complete("sign")
     
     # Notarize the app
-    if notarize and sign:
-        if not notarize_file(bundle_dir, BUNDLE_IDENTIFIER):
+    if notarize and sign and not checkpoints.should_skip("notarize"):
+        if notarize_file(bundle_dir, BUNDLE_IDENTIFIER):
+            checkpoints.complete("notarize")
+        else:
             print("⚠️  Notarization failed, but app is signed")
+            print("💡 Rerun with --resume to retry notarization without rebuilding")
 
     return bundle_dir
 
@@ -683,15 +866,31 @@ def create_portable_zip(bundle_dir, version, sign=True, notarize=True):
     if zip_path.exists():
         zip_path.unlink()
 
+    # ditto stores every copy; report what identical files cost the zip
+    bundle_files = [(f, f.relative_to(bundle_dir.parent).as_posix()) for f in sorted(bundle_dir.rglob("*"))]
+    print_duplicate_report(bundle_files, find_duplicates(bundle_files), stored_once=False)
+
+    # The notarization zip already holds the signed bundle; only the stapled ticket is missing
+    archive, ditto_seconds = take_notarize_archive(bundle_dir)
+    if archive:
+        started = time.time()
+        shutil.move(archive, zip_path)
+        patched = patch_zip(zip_path, bundle_dir, bundle_dir.parent)
+        if patched:
+            elapsed = time.time() - started
+            print(f"✅ Portable zip created from the notarization archive: {zip_path.name} "
+                  f"({zip_path.stat().st_size / 1024 / 1024:.1f} MB)")
+            print(f"  ♻️  {patched['kept']} entries reused, {patched['added']} added, "
+                  f"{patched['replaced']} replaced, {patched['removed']} removed")
+            print(f"  ⏱️  {elapsed:.1f}s instead of {ditto_seconds:.1f}s for zipping the bundle again "
+                  f"(saved {ditto_seconds - elapsed:.1f}s)")
+            return zip_path
+        print("⚠️  Changed files carry extended attributes, zipping the bundle again")
+        zip_path.unlink()
+
     try:
-        # Use ditto to preserve code signatures
-        result = run_command(
-            ["ditto", "-c", "-k", "--keepParent", str(bundle_dir), str(zip_path)],
-            "Creating zip",
-            check=False
-        )
-        
-        if result and result.returncode == 0:
+        # ditto (or its Python equivalent) preserves code signatures
+        if zip_app_bundle(bundle_dir, zip_path, "Creating zip"):
             print(f"✅ Portable zip created: {zip_path.name} ({zip_path.stat().st_size / 1024 / 1024:.1f} MB)")
             
             if notarize and sign:
@@ -705,7 +904,7 @@ def create_portable_zip(bundle_dir, version, sign=True, notarize=True):
         print(f"❌ Failed to create zip: {e}")
         return None
 
-def create_velopack_release(bundle_dir, version, sign=True):
+def create_velopack_release(bundle_dir, version, icon_path, sign=True):
     """Create Velopack release package"""
     print("\n📦 Creating Velopack release package...")
     print("=" * 50)
@@ -713,14 +912,11 @@ def create_velopack_release(bundle_dir, version, sign=True):
     # Create releases directory
     releases_dir = Path("./Releases")
     releases_dir.mkdir(exist_ok=True)
+    before = snapshot_artifacts(releases_dir)
     
     try:
         # Use absolute path for icon
-        icon_abs_path = Path(ICON_PATH).absolute()
-        
-        # Also try the transparent version as backup
-        icon_transparent = Path("./Assets/AT-Transparrent.icns").absolute()
-        icon_to_use = icon_abs_path if icon_abs_path.exists() else icon_transparent
+        icon_to_use = Path(icon_path).absolute()
         
         # Use vpk to pack the app
         cmd = [
@@ -743,16 +939,16 @@ def create_velopack_release(bundle_dir, version, sign=True):
             ])
         
         print(f"Using icon: {icon_to_use}")
-        print(f"Icon exists: {icon_to_use.exists()}")
-        print(f"Icon size: {icon_to_use.stat().st_size if icon_to_use.exists() else 'N/A'} bytes")
+        print(f"Icon size: {icon_to_use.stat().st_size} bytes")
         
-        result = run_command(cmd, "Creating Velopack release", check=False)
+        result = run_command(cmd, "Creating Velopack release", check=False, show_output=True,
+                             timeout=VPK_TIMEOUT)
         
         if result and result.returncode == 0:
-            # Find the created release file
-            release_files = list(releases_dir.glob(f"AkademiTrack-{version}-*.nupkg"))
-            if release_files:
-                release_file = release_files[0]
+            # Exactly this version's full package for this RID (the folder holds every platform)
+            register_new_artifacts(releases_dir, before, version, "osx-arm64")
+            release_file = find_artifact(releases_dir, version, "osx-arm64")
+            if release_file:
                 print(f"✅ Velopack release created: {release_file.name} ({release_file.stat().st_size / 1024 / 1024:.1f} MB)")
                 return release_file
             else:
@@ -760,10 +956,8 @@ def create_velopack_release(bundle_dir, version, sign=True):
                 return None
         else:
             print("❌ Failed to create Velopack release")
-            if result and result.stderr:
-                print(f"Error: {result.stderr}")
-            if result and result.stdout:
-                print(f"Output: {result.stdout}")
+            if result:
+                print(f"Error: {result.error_summary()}")
             return None
     except Exception as e:
         print(f"❌ Failed to create Velopack release: {e}")
@@ -778,7 +972,7 @@ def create_installer_pkg(bundle_dir, version, sign=True, notarize=True):
     launchagent_plist = create_launchagent_plist(version)
     
     # Create temporary root directory structure
-    temp_root = Path("./pkg_root")
+    temp_root = scratch_path(Path("./pkg_root"), tree_size(bundle_dir))
     if temp_root.exists():
         shutil.rmtree(temp_root)
     
@@ -875,7 +1069,41 @@ def verify_all_signatures(bundle_dir):
 # MAIN FUNCTION
 # ============================================================================
 
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="AkademiTrack macOS build, sign & notarize tool")
+    parser.add_argument("--prepublished", metavar="PATH",
+                        help="osx-arm64 publish output staged by build-release.py "
+                             "(directory or .tar.gz); skips dotnet publish on this host")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue a failed build from its last verified stage checkpoint")
+    parser.add_argument("--size-budget", type=float, default=DEFAULT_SIZE_BUDGET,
+                        help=f"Allowed size growth in percent vs the previous release "
+                             f"(default: {DEFAULT_SIZE_BUDGET:g})")
+    parser.add_argument("--allow-size-growth", action="store_true",
+                        help="Report size growth without failing the build")
+    parser.add_argument("--ram-scratch", nargs="?", const="auto", metavar="DIR",
+                        help="Stage transient output on a tmpfs (/dev/shm, or DIR); falls back to "
+                             "disk when it does not fit")
+    parser.add_argument("--build-servers", choices=BUILD_SERVER_MODES, default="default",
+                        help="warm: keep MSBuild/compiler servers alive across publishes; "
+                             "cold: disable them (baseline timings)")
+    parser.add_argument("--cache", metavar="URL",
+                        help="Shared build cache server (default: $AKADEMITRACK_BUILD_CACHE); outputs "
+                             "another builder already produced are pulled instead of rebuilt")
+    parser.add_argument("--cache-readonly", action="store_true",
+                        help="Pull from the build cache but never upload to it")
+    parser.add_argument("--zip-tool", choices=ZIP_TOOLS, default="auto",
+                        help="Bundle zips: ditto, or the parallel Python archiver that also runs "
+                             "off macOS (default: ditto when installed)")
+    return parser.parse_args()
+
 def main():
+    global ZIP_TOOL
+    args = parse_args()
+    configure_scratch(args.ram_scratch)
+    ZIP_TOOL = args.zip_tool
+
     print("🚀 AkademiTrack Build, Sign & Notarize Tool")
     print("=" * 50)
 
@@ -890,14 +1118,6 @@ def main():
         print("   - APP_SPECIFIC_PASSWORD")
         return
 
-    # List available signing identities
-    print("\n🔑 Available signing identities:")
-    run_command(
-        ["security", "find-identity", "-v", "-p", "codesigning"],
-        check=False,
-        show_output=True
-    )
-
     # Get version number
     version = get_version_input()
     print(f"\n📌 Using version: {version}")
@@ -907,6 +1127,15 @@ def main():
     if update_proj != 'n':
         update_csproj_version(version)
 
+    # Validate changelogs before publishing (a prepublished build already did this)
+    if not args.prepublished and not compile_changelogs(version):
+        print("❌ Changelog validation failed")
+        return
+
+    icons = derive_icons()
+    if not icons:
+        return
+
     # Ask about signing and notarization
     print("\n🔐 Signing & Notarization Options:")
     sign_choice = input("Sign applications? (y/n) [y]: ").strip().lower()
@@ -917,17 +1146,6 @@ def main():
         notarize_choice = input("Notarize applications? (y/n) [y]: ").strip().lower()
         do_notarize = notarize_choice != 'n'
 
-    # Build the app
-    print("\n" + "=" * 50)
-    bundle_dir = create_avalonia_macos_bundle(version, sign=do_sign, notarize=do_notarize)
-    if not bundle_dir:
-        print("❌ App bundle creation failed")
-        return
-
-    # Verify signatures if signed
-    if do_sign:
-        verify_all_signatures(bundle_dir)
-
     # Ask what distributions to create
     print("\n📦 Distribution Options:")
     print("1. Portable ZIP")
@@ -938,27 +1156,80 @@ def main():
     dist_choice = input("\nSelect option (1/2/3/4) [4]: ").strip()
     if not dist_choice:
         dist_choice = "4"
-    
+
+    # Tools, identities and entitlements are checked before anything is built
+    checks = build_checks(["osx-arm64"], velopack=dist_choice in ["3", "4"], dotnet=not args.prepublished)
+    checks += mac_checks(do_sign, do_notarize, DEVELOPER_ID_APP, DEVELOPER_ID_INSTALLER, ENTITLEMENTS_PATH,
+                         pkg=dist_choice in ["2", "4"], zip_tool=ZIP_TOOL, xcode_project=XCODE_PROJECT_PATH)
+    if not run_preflight(checks):
+        return
+
+    # Build the app
+    print("\n" + "=" * 50)
+    checkpoints = StageCheckpoints("mac", version, MAC_STAGES,
+                                   options={"sign": do_sign, "notarize": do_notarize},
+                                   resume=args.resume)
+    cache = open_build_cache(args.cache, push=not args.cache_readonly)
+    with BuildServerSession(args.build_servers, cache) as build_session:
+        bundle_dir = create_avalonia_macos_bundle(version, sign=do_sign, notarize=do_notarize,
+                                                  prepublished=args.prepublished,
+                                                  build_session=build_session,
+                                                  checkpoints=checkpoints, icons=icons)
+    if not bundle_dir:
+        print("❌ App bundle creation failed")
+        return
+
+    # Verify signatures if signed
+    if do_sign:
+        verify_all_signatures(bundle_dir)
+
     created_files = []
     
     # Option 1: ZIP only
     if dist_choice in ["1", "4"]:
-        zip_file = create_portable_zip(bundle_dir, version, sign=do_sign, notarize=do_notarize)
+        if checkpoints.should_skip("zip"):
+            zip_file = Path(checkpoints.extra("zip", "path"))
+        else:
+            zip_file = create_portable_zip(bundle_dir, version, sign=do_sign, notarize=do_notarize)
+            if zip_file:
+                checkpoints.complete("zip", [zip_file], path=zip_file)
         if zip_file:
             created_files.append(("Portable ZIP", zip_file))
     
     # Option 2: PKG with LaunchAgent
     if dist_choice in ["2", "4"]:
-        pkg_file = create_installer_pkg(bundle_dir, version, sign=do_sign, notarize=do_notarize)
+        if checkpoints.should_skip("pkg"):
+            pkg_file = Path(checkpoints.extra("pkg", "path"))
+        else:
+            pkg_file = create_installer_pkg(bundle_dir, version, sign=do_sign, notarize=do_notarize)
+            if pkg_file:
+                checkpoints.complete("pkg", [pkg_file], path=pkg_file)
         if pkg_file:
             created_files.append(("Installer PKG", pkg_file))
     
     # Option 3: Velopack Release
     if dist_choice in ["3", "4"]:
-        velopack_file = create_velopack_release(bundle_dir, version, sign=do_sign)
+        if checkpoints.should_skip("velopack"):
+            velopack_file = Path(checkpoints.extra("velopack", "path"))
+        else:
+            velopack_file = create_velopack_release(bundle_dir, version, icons["icns"], sign=do_sign)
+            if velopack_file:
+                checkpoints.complete("velopack", [velopack_file], path=velopack_file)
         if velopack_file:
             created_files.append(("Velopack Release", velopack_file))
     
+    # Unused when no portable zip was requested
+    discard_notarize_archive(bundle_dir)
+    
+    # Size breakdown of the bundle and what ships, vs the previous release
+    report_folder = Path(f"./Releases/v{version}")
+    report_folder.mkdir(parents=True, exist_ok=True)
+    if not check_size_budget(bundle_dir, report_folder, "osx-arm64", version,
+                             [file_path for _, file_path in created_files],
+                             None if args.allow_size_growth else args.size_budget):
+        print("❌ Build failed: size budget exceeded")
+        return
+    
     # Final summary
     print("\n" + "=" * 50)
     print("🎉 Build completed successfully!")
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""Build the Linux, Windows and macOS releases concurrently from one Linux host
+
+dotnet can cross-publish every runtime identifier, so linux-x64, win-x64 and
+osx-arm64 are published in parallel, each into its own staging directory
+under Releases/. Only when every platform succeeded are the staged folders
+merged into Releases/v{version}, which is swapped in with a rename so a
+failed run never leaves a half-written release behind.
+
+The osx-arm64 publish output is shipped as a tarball in the release folder;
+bundling, signing and notarization still happen on a mac host with:
+
+    python3 build-mac.py --prepublished Releases/v{version}/AkademiTrack-osx-arm64-publish.tar.gz
+"""
+import argparse
+import filecmp
+import os
+import re
+import shutil
+import sys
+import tarfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from buildtools.archives import add_deduplicated
+from buildtools.artifacts import DEFAULT_KEEP_FULL, import_artifacts, prune_artifacts, seed_vpk_dir
+from buildtools.assets import prune_assets
+from buildtools.buildcache import open_build_cache
+from buildtools.buildserver import BUILD_SERVER_MODES, BuildServerSession
+from buildtools.changelogs import compile_changelogs
+from buildtools.chunks import CHUNK_STORE_NAME, chunk_releases, print_chunk_report
+from buildtools.common import load_build_script
+from buildtools.feed import DEFAULT_MAX_DELTAS, generate_feed
+from buildtools.icons import derive_icons
+from buildtools.preflight import build_checks, run_preflight
+from buildtools.restore import ensure_restored
+from buildtools.runner import prefixed_console, set_output_prefix
+from buildtools.scratch import configure_scratch
+
+ALL_RUNTIMES = ["linux-x64", "win-x64", "osx-arm64"]
+MAC_PUBLISH_ARCHIVE = "AkademiTrack-osx-arm64-publish.tar.gz"
+
+
+def stage_macos_publish(build_mac, work_dir, release_folder, build_session):
+    """Publish osx-arm64 and stage it as a tarball for the mac signing host"""
+    publish_dir = work_dir / "publish-osx"
+    if not build_mac.publish_macos_app(publish_dir, build_session):
+        return False
+    prune_assets(publish_dir, "osx")
+
+    release_folder.mkdir(parents=True, exist_ok=True)
+    archive_path = release_folder / MAC_PUBLISH_ARCHIVE
+    with tarfile.open(archive_path, "w:gz") as tar:
+        publish_files = [(f, f.relative_to(publish_dir).as_posix()) for f in sorted(publish_dir.rglob("*"))
+                         if f.is_symlink() or f.is_file()]
+        add_deduplicated(tar, publish_files)
+
+    size = archive_path.stat().st_size / 1024 / 1024
+    print(f"✅ Staged osx-arm64 publish output: {archive_path.name} ({size:.1f} MB)")
+    return release_folder
+
+
+def build_runtime(rid, version, scripts, staging_dir, build_session, icons,
+                  releases_dir=Path("./Releases"), **options):
+    """Build one platform into its own staging directory; returns the staged release folder
+
+    vpk packs into <staging>/<rid>/vpk, seeded from releases_dir so it still
+    finds the previous full package and release list. Extra options (e.g.
+    checkpoints, size_budget) go to the platform's build function.
+    """
+    work_dir = staging_dir / rid
+    release_folder = work_dir / "release"
+    vpk_dir = work_dir / "vpk"
+    work_dir.mkdir(parents=True, exist_ok=True)
+    set_output_prefix(f"[{rid}] ")
+
+    if rid == "linux-x64":
+        seed_vpk_dir(releases_dir, vpk_dir, rid)
+        return scripts["linux"].build_linux_release(version, work_dir, release_folder, vpk_dir,
+                                                    build_session=build_session, icons=icons, **options)
+    if rid == "win-x64":
+        seed_vpk_dir(releases_dir, vpk_dir, rid)
+        return scripts["windows"].build_windows_release(version, work_dir, release_folder, vpk_dir,
+                                                        build_session=build_session, icons=icons, **options)
+    return stage_macos_publish(scripts["mac"], work_dir, release_folder, build_session)
+
+
+def merge_staged_releases(staged_folders, release_folder):
+    """Merge staged platform folders and swap the result into place atomically"""
+    merging = release_folder.with_name(f".{release_folder.name}.merging")
+    previous = release_folder.with_name(f".{release_folder.name}.previous")
+    for leftover in (merging, previous):
+        if leftover.exists():
+            shutil.rmtree(leftover)
+    merging.mkdir(parents=True)
+
+    for rid, folder in staged_folders.items():
+        for item in sorted(folder.iterdir()):
+            dest = merging / item.name
+            if dest.exists():
+                # Platform-neutral files (e.g. RELEASES) may appear twice but must agree
+                if item.is_file() and dest.is_file() and filecmp.cmp(item, dest, shallow=False):
+                    continue
+                shutil.rmtree(merging)
+                raise RuntimeError(f"{rid} produced conflicting file: {item.name}")
+            shutil.move(str(item), str(dest))
+
+    # Two renames on the same filesystem: readers see either the old or the new release
+    if release_folder.exists():
+        os.replace(release_folder, previous)
+    os.replace(merging, release_folder)
+    if previous.exists():
+        shutil.rmtree(previous)
+
+
+def publish_velopack_outputs(staging_dir, releases_dir):
+    """Merge each platform's Velopack output (and its artifact index entries) into the shared Releases folder"""
+    for vpk_dir in sorted(staging_dir.glob("*/vpk")):
+        import_artifacts(vpk_dir, releases_dir)
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Build all AkademiTrack releases in parallel")
+    parser.add_argument("--version", help="Release version (default: version in .csproj)")
+    parser.add_argument("--runtimes", default=",".join(ALL_RUNTIMES),
+                        help=f"Comma-separated runtime identifiers (default: {','.join(ALL_RUNTIMES)})")
+    parser.add_argument("--jobs", type=int, default=len(ALL_RUNTIMES),
+                        help="Number of platforms to build at the same time")
+    parser.add_argument("--build-servers", choices=BUILD_SERVER_MODES, default="default",
+                        help="warm: keep MSBuild/compiler servers alive across publishes; "
+                             "cold: disable them (baseline timings)")
+    parser.add_argument("--cache", metavar="URL",
+                        help="Shared build cache server (default: $AKADEMITRACK_BUILD_CACHE); outputs "
+                             "another builder already produced are pulled instead of rebuilt")
+    parser.add_argument("--cache-readonly", action="store_true",
+                        help="Pull from the build cache but never upload to it")
+    parser.add_argument("--keep-staging", action="store_true",
+                        help="Keep the per-platform staging directories after merging")
+    parser.add_argument("--feed-deltas", type=int, default=DEFAULT_MAX_DELTAS,
+                        help="Previous versions to build update deltas from (0: feed index only)")
+    parser.add_argument("--keep-packages", type=int, default=DEFAULT_KEEP_FULL,
+                        help=f"Full Velopack packages kept per RID in Releases/ (0: keep all; "
+                             f"default: {DEFAULT_KEEP_FULL}); release folders keep their own copies")
+    parser.add_argument("--no-chunks", action="store_true",
+                        help="Skip splitting the release into the content-defined chunk store")
+    parser.add_argument("--ram-scratch", nargs="?", const="auto", metavar="DIR",
+                        help="Stage transient output on a tmpfs (/dev/shm, or DIR); falls back to "
+                             "disk when it does not fit")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    configure_scratch(args.ram_scratch)
+
+    print("🚀 AkademiTrack Multi-Platform Release Tool")
+    print("=" * 50)
+
+    runtimes = [rid.strip() for rid in args.runtimes.split(",") if rid.strip()]
+    unknown = [rid for rid in runtimes if rid not in ALL_RUNTIMES]
+    if unknown:
+        print(f"❌ Unsupported runtime(s): {', '.join(unknown)}")
+        return False
+
+    scripts = {
+        "linux": load_build_script("build-linux.py"),
+        "windows": load_build_script("build-windows.py"),
+        "mac": load_build_script("build-mac.py")
+    }
+
+    version = args.version or scripts["linux"].get_current_version() or "1.0.0"
+    if not re.match(r'^\d+\.\d+\.\d+$', version):
+        print(f"❌ Invalid version format: {version}")
+        return False
+    print(f"\n📌 Using version: {version}")
+    print(f"🎯 Runtimes: {', '.join(runtimes)}")
+
+    # osx-arm64 is only published here; vpk runs on the mac signing host
+    if not run_preflight(build_checks(runtimes, velopack=any(rid != "osx-arm64" for rid in runtimes))):
+        return False
+
+    if not compile_changelogs(version):
+        return False
+    # Derived once here so the parallel builds never render icons concurrently
+    icons = derive_icons()
+    if not icons:
+        return False
+
+    # One restore covering every runtime, so the parallel publishes never restore
+    if not ensure_restored(runtimes):
+        return False
+
+    releases_dir = Path("./Releases")
+    release_folder = releases_dir / f"v{version}"
+    staging_dir = releases_dir / f".staging-v{version}"
+    if staging_dir.exists():
+        print(f"🧹 Cleaning staging directory...")
+        shutil.rmtree(staging_dir)
+    staging_dir.mkdir(parents=True)
+
+    started = time.time()
+    # Each platform's output (including its dotnet/vpk logs) is prefixed with its RID
+    cache = open_build_cache(args.cache, push=not args.cache_readonly)
+    with BuildServerSession(args.build_servers, cache) as build_session, prefixed_console(), \
+            ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = {rid: pool.submit(build_runtime, rid, version, scripts, staging_dir, build_session, icons)
+                   for rid in runtimes}
+        staged = {}
+        failed = []
+        for rid, future in futures.items():
+            try:
+                folder = future.result()
+            except Exception as e:
+                print(f"❌ {rid} build crashed: {e}")
+                folder = None
+            if folder:
+                staged[rid] = Path(folder)
+            else:
+                failed.append(rid)
+
+    if failed:
+        print(f"\n❌ Build failed for: {', '.join(failed)}")
+        print(f"📁 Staging kept for inspection: {staging_dir}/")
+        print(f"📁 Existing release folder left untouched: {release_folder}/")
+        return False
+
+    print(f"\n🔀 Merging {len(staged)} platform(s) into {release_folder}/...")
+    try:
+        merge_staged_releases(staged, release_folder)
+    except RuntimeError as e:
+        print(f"❌ Merge failed: {e}")
+        return False
+    publish_velopack_outputs(staging_dir, releases_dir)
+    if args.keep_packages > 0:
+        prune_artifacts(releases_dir, args.keep_packages)
+
+    # Feed stage: deltas from earlier releases plus Releases/feed.json
+    print()
+    if generate_feed(releases_dir, version, args.feed_deltas) is None:
+        print("⚠️  Update feed not generated; run build-feed.py once the release folder is fixed")
+
+    # Chunk stage: every release split into shared chunks any older client can update from
+    if not args.no_chunks:
+        print()
+        if chunk_releases(releases_dir) is None:
+            print("⚠️  Chunk store not updated; run chunk-store.py index once the release folder is fixed")
+        else:
+            print_chunk_report(releases_dir / CHUNK_STORE_NAME, version)
+
+    if not args.keep_staging:
+        shutil.rmtree(staging_dir)
+
+    print("\n" + "=" * 50)
+    print(f"🎉 All platforms built in {time.time() - started:.0f}s")
+    print(f"\n📁 Release folder: {release_folder}/")
+    for item in sorted(release_folder.iterdir()):
+        if item.is_file():
+            size = item.stat().st_size / 1024 / 1024
+            print(f"  ✅ {item.name} ({size:.1f} MB)")
+
+    if "osx-arm64" in staged:
+        print("\n🍎 Finish the macOS release on a mac host:")
+        print(f"  python3 build-mac.py --prepublished {release_folder}/{MAC_PUBLISH_ARCHIVE}")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        if not main():
+            sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Build interrupted by user")
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        import traceback
+        traceback.print_exc()
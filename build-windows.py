@@ -1,12 +1,32 @@
 ﻿#!/usr/bin/env python3
+import argparse
 import os
 import shutil
 import subprocess
-import zipfile
 from pathlib import Path
 import re
 import xml.etree.ElementTree as ET
 
+from buildtools.buildcache import open_build_cache
+from buildtools.buildserver import BUILD_SERVER_MODES, BuildServerSession
+from buildtools.assets import prune_assets
+from buildtools.artifacts import find_artifact, register_new_artifacts, snapshot_artifacts
+from buildtools.archives import (DEFAULT_TARGET_SECONDS, DEFAULT_ZIP_CODEC, ZIP_CODECS,
+                                 find_duplicates, open_zip_writer, print_duplicate_report,
+                                 resolve_codec)
+from buildtools.changelogs import compile_changelogs
+from buildtools.checkpoints import StageCheckpoints
+from buildtools.common import PROJECT_PATH, file_sha256
+from buildtools.icons import derive_icons
+from buildtools.preflight import build_checks, run_preflight
+from buildtools.restore import ensure_restored
+from buildtools.runner import run_streaming
+from buildtools.scratch import configure_scratch, discard_scratch, scratch_path, scratch_root, tree_size
+from buildtools.sizes import DEFAULT_SIZE_BUDGET, check_size_budget
+from buildtools.verify import expected_entries, verify_archive
+
+VPK_TIMEOUT = 20 * 60
+
 def get_version_input():
     """Get version number from user or use current version from .csproj"""
     print("\n📦 Version Configuration")
@@ -77,98 +97,53 @@ def update_csproj_version(version):
         print(f"❌ Failed to update .csproj: {e}")
         return False
 
-def build_windows_release(version):
-    """Build Windows release - creates exe and portable zip"""
-    
-    print(f"\n🏗️  Building AkademiTrack for Windows (x64)...")
-    print("=" * 50)
-    
-    # Directories
-    publish_dir = Path("./publish-win")
-    publish_single = Path("./publish-win-single")
-    release_folder = Path(f"./Releases/v{version}")
-    
-    # Check for icon file
-    icon_path = Path("./Assets/AT-1024.ico")
-    if not icon_path.exists():
-        print(f"⚠️  Icon file not found: {icon_path}")
-        print("Checking for alternative formats...")
-        png_icon = Path("./Assets/AT-1024.png")
-        if png_icon.exists():
-            print(f"⚠️  Found PNG but .ico format is preferred")
-            print("Please convert AT-1024.png to AT-1024.ico")
-        icon_path = None
-    else:
-        icon_size = icon_path.stat().st_size
-        print(f"✅ Icon file found: {icon_path} ({icon_size} bytes)")
-    
-    # Check for splash image
-    splash_path = None
-    for ext in ['.png', '.jpg', '.jpeg', '.gif']:
-        splash_candidate = Path(f"./Assets/splash{ext}")
-        if splash_candidate.exists():
-            splash_path = splash_candidate
-            splash_size = splash_path.stat().st_size / 1024
-            print(f"✅ Splash image found: {splash_path} ({splash_size:.1f} KB)")
-            break
-    
-    if not splash_path:
-        print(f"⚠️  No splash image found (looked for Assets/splash.png/jpg/gif)")
-        print("💡 Create a splash screen for a more professional installer!")
-    
-    # Clean directories
-    if publish_dir.exists():
-        print(f"🧹 Cleaning publish directory...")
-        shutil.rmtree(publish_dir)
-    
-    if publish_single.exists():
-        print(f"🧹 Cleaning single-file directory...")
-        shutil.rmtree(publish_single)
-    
-    if release_folder.exists():
-        print(f"🧹 Cleaning release folder...")
-        shutil.rmtree(release_folder)
-    
-    release_folder.mkdir(parents=True, exist_ok=True)
-    
+WINDOWS_STAGES = ["publish", "publish-single", "zip", "velopack", "standalone"]
+
+def publish_multi_file(publish_dir, build_session, icon_path):
+    """Publish the multi-file build used for the portable ZIP and Velopack"""
     # Step 1: Publish for distribution (multi-file)
     print(f"\n📦 Step 1: Publishing for distribution (multi-file)...")
     publish_cmd = [
-        "dotnet", "publish",
+        "dotnet", "publish", PROJECT_PATH,
+        "--no-restore",
         "-c", "Release",
         "--self-contained",
         "-r", "win-x64",
         "-o", str(publish_dir),
-        "-p:PublishSingleFile=false"
+        "-p:PublishSingleFile=false",
+        f"-p:ApplicationIcon={icon_path.absolute()}"
     ]
     
     print(f"Running: {' '.join(publish_cmd)}")
-    result = subprocess.run(publish_cmd, capture_output=True, text=True, 
-                           encoding='utf-8', errors='replace')
+    result = build_session.run_publish(publish_cmd, "win-x64 multi-file")
     if result.returncode != 0:
-        print(f"❌ Publish failed: {result.stderr}")
+        print(f"❌ Publish failed: {result.error_summary()}")
         return False
     
     print("✅ Published for distribution successfully")
-    
+    return True
+
+def publish_single_file(publish_single, build_session, icon_path):
+    """Publish the standalone single-file exe; returns its path"""
     # Step 2: Publish single file exe (for standalone distribution)
     print(f"\n📦 Step 2: Publishing standalone single-file exe...")
     publish_single_cmd = [
-        "dotnet", "publish",
+        "dotnet", "publish", PROJECT_PATH,
+        "--no-restore",
         "-c", "Release",
         "--self-contained",
         "-r", "win-x64",
         "-o", str(publish_single),
         "-p:PublishSingleFile=true",
         "-p:IncludeNativeLibrariesForSelfExtract=true",
-        "-p:EnableCompressionInSingleFile=true"
+        "-p:EnableCompressionInSingleFile=true",
+        f"-p:ApplicationIcon={icon_path.absolute()}"
     ]
     
     print(f"Running: {' '.join(publish_single_cmd)}")
-    result = subprocess.run(publish_single_cmd, capture_output=True, text=True,
-                           encoding='utf-8', errors='replace')
+    result = build_session.run_publish(publish_single_cmd, "win-x64 single-file")
     if result.returncode != 0:
-        print(f"❌ Single-file publish failed: {result.stderr}")
+        print(f"❌ Single-file publish failed: {result.error_summary()}")
         return False
     
     print("✅ Published single-file exe successfully")
@@ -185,32 +160,57 @@ def build_windows_release(version):
     if exe_size < 10:
         print(f"⚠️  Warning: Executable seems too small ({exe_size:.1f} MB). This might be a stub, not a full exe.")
     
+    return exe_single
+
+def portable_zip_files(publish_dir):
+    """(source, arcname) for every file in the portable ZIP"""
+    return [(f, f.relative_to(publish_dir).as_posix())
+            for f in sorted(publish_dir.rglob('*')) if f.is_file()]
+
+def create_portable_zip(publish_dir, release_folder, codec=DEFAULT_ZIP_CODEC,
+                        codec_target=DEFAULT_TARGET_SECONDS, cache=None):
+    """Create the portable ZIP from the multi-file build"""
     # Step 3: Create portable ZIP from multi-file build
     print(f"\n📦 Step 3: Creating portable ZIP...")
+    zip_files = portable_zip_files(publish_dir)
+    
+    cache_key = None
+    if cache:
+        cache_key = cache.key("portable-zip", codec, codec_target if codec == "auto" else None,
+                              [(arc_name, file_sha256(f)) for f, arc_name in zip_files])
+        cached_zip = cache.fetch_file(cache_key, release_folder, "Portable ZIP")
+        if cached_zip:
+            return cached_zip
+    
+    codec = resolve_codec(codec, ZIP_CODECS, publish_dir, codec_target)
     portable_zip = release_folder / f"AkademiTrack-win-Portable.zip"
     
     try:
-        with zipfile.ZipFile(portable_zip, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            file_count = 0
-            for file_path in publish_dir.rglob('*'):
-                if file_path.is_file():
-                    arc_name = file_path.relative_to(publish_dir)
-                    zipf.write(file_path, arc_name)
-                    file_count += 1
-            print(f"✅ Added {file_count} files to portable ZIP")
+        with open_zip_writer(portable_zip, codec) as zipf:
+            for file_path, arc_name in zip_files:
+                zipf.write(file_path, arc_name)
+            print(f"✅ Added {len(zip_files)} files to portable ZIP")
+        # ZIP has no hardlinks, so duplicates can only be reported
+        print_duplicate_report(zip_files, find_duplicates(zip_files), stored_once=False)
     except Exception as e:
         print(f"❌ Failed to create portable ZIP: {e}")
         return False
     
     portable_size = portable_zip.stat().st_size / 1024 / 1024
-    print(f"✅ Portable ZIP created: {portable_zip.name} ({portable_size:.1f} MB)")
-    
+    print(f"✅ Portable ZIP created: {portable_zip.name} ({portable_size:.1f} MB, {codec})")
+    if cache_key:
+        cache.store_tree(cache_key, portable_zip, "Portable ZIP")
+    return portable_zip
+
+def create_velopack_package(publish_dir, releases_dir, release_folder, version, icon_path):
+    """Create the Velopack package; returns the .nupkg path or None"""
     # Step 4: Create Velopack release package
     print(f"\n📦 Step 4: Creating Velopack release package...")
+    release_file = None
     try:
         # Create releases directory
-        releases_dir = Path("./Releases")
-        releases_dir.mkdir(exist_ok=True)
+        releases_dir.mkdir(parents=True, exist_ok=True)
+        before = snapshot_artifacts(releases_dir)
         
         # Use vpk to pack the app
         vpk_cmd = [
@@ -228,14 +228,13 @@ def build_windows_release(version):
             vpk_cmd.extend(["--icon", str(icon_path)])
         
         print(f"Running: {' '.join(vpk_cmd)}")
-        result = subprocess.run(vpk_cmd, capture_output=True, text=True,
-                               encoding='utf-8', errors='replace')
+        result = run_streaming(vpk_cmd, log_name="vpk pack", timeout=VPK_TIMEOUT, echo=True)
         
         if result.returncode == 0:
-            # Find the created release file
-            release_files = list(releases_dir.glob(f"AkademiTrack-{version}-*.nupkg"))
-            if release_files:
-                release_file = release_files[0]
+            # Exactly this version's full package for this RID (the folder holds every platform)
+            register_new_artifacts(releases_dir, before, version, "win-x64")
+            release_file = find_artifact(releases_dir, version, "win-x64")
+            if release_file:
                 velopack_size = release_file.stat().st_size / 1024 / 1024
                 print(f"✅ Velopack release created: {release_file.name} ({velopack_size:.1f} MB)")
                 
@@ -248,20 +247,142 @@ def build_windows_release(version):
                     shutil.copy2(releases_file, release_folder / "RELEASES")
                     print(f"✅ RELEASES file copied")
             else:
+                release_file = None
                 print("⚠️  Velopack release file not found")
         else:
-            print(f"⚠️  Velopack packaging failed: {result.stderr}")
+            print(f"⚠️  Velopack packaging failed: {result.error_summary()}")
             print("💡 Make sure 'vpk' tool is installed: dotnet tool install -g vpk")
     except Exception as e:
         print(f"⚠️  Velopack packaging failed: {e}")
         print("💡 Make sure 'vpk' tool is installed: dotnet tool install -g vpk")
     
+    return release_file
+
+def add_standalone_exe(exe_single, release_folder):
+    """Copy the single-file exe into the release folder"""
     # Step 5: Copy the standalone single-file EXE to release folder
     print(f"\n📦 Step 5: Adding standalone single-file EXE...")
     standalone_exe = release_folder / "AkademiTrack.exe"
     shutil.copy2(exe_single, standalone_exe)
     standalone_size = standalone_exe.stat().st_size / 1024 / 1024
     print(f"✅ Standalone single-file EXE: {standalone_exe.name} ({standalone_size:.1f} MB)")
+    return standalone_exe
+
+def build_windows_release(version, work_dir=Path("."), release_folder=None, releases_dir=None,
+                          build_session=None, checkpoints=None, codec=DEFAULT_ZIP_CODEC,
+                          codec_target=DEFAULT_TARGET_SECONDS, icons=None,
+                          size_budget=DEFAULT_SIZE_BUDGET):
+    """Build Windows release - creates exe and portable zip"""
+    
+    print(f"\n🏗️  Building AkademiTrack for Windows (x64)...")
+    print("=" * 50)
+    
+    # Directories
+    publish_dir = Path(work_dir) / "publish-win"
+    publish_single = Path(work_dir) / "publish-win-single"
+    if release_folder is None:
+        release_folder = Path(f"./Releases/v{version}")
+    if releases_dir is None:
+        releases_dir = Path("./Releases")
+    if build_session is None:
+        build_session = BuildServerSession()
+    if checkpoints is None:
+        checkpoints = StageCheckpoints.disabled()
+    
+    # Icons are derived from the master PNG (cached when it has not changed)
+    if icons is None:
+        icons = derive_icons()
+    if not icons:
+        return False
+    icon_path = icons["ico"]
+    print(f"✅ Icon: {icon_path} ({icon_path.stat().st_size} bytes)")
+    
+    # Check for splash image
+    splash_path = None
+    for ext in ['.png', '.jpg', '.jpeg', '.gif']:
+        splash_candidate = Path(f"./Assets/splash{ext}")
+        if splash_candidate.exists():
+            splash_path = splash_candidate
+            splash_size = splash_path.stat().st_size / 1024
+            print(f"✅ Splash image found: {splash_path} ({splash_size:.1f} KB)")
+            break
+    
+    if not splash_path:
+        print(f"⚠️  No splash image found (looked for Assets/splash.png/jpg/gif)")
+        print("💡 Create a splash screen for a more professional installer!")
+    
+    # Clean directories (a resumed build keeps what its checkpoints verified)
+    if not checkpoints.resuming:
+        if publish_dir.exists():
+            print(f"🧹 Cleaning publish directory...")
+            shutil.rmtree(publish_dir)
+        
+        if publish_single.exists():
+            print(f"🧹 Cleaning single-file directory...")
+            shutil.rmtree(publish_single)
+        
+        if release_folder.exists():
+            print(f"🧹 Cleaning release folder...")
+            shutil.rmtree(release_folder)
+    
+    release_folder.mkdir(parents=True, exist_ok=True)
+    
+    skip_publish = checkpoints.should_skip("publish")
+    skip_single = checkpoints.should_skip("publish-single")
+    
+    # Restore once for both publishes below
+    if not (skip_publish and skip_single):
+        if not ensure_restored(["win-x64"]):
+            return False
+    
+    if not skip_publish:
+        if not publish_multi_file(publish_dir, build_session, icon_path):
+            return False
+        # Pruned inside the stage so a resumed build verifies the pruned tree
+        prune_assets(publish_dir, "win")
+        checkpoints.complete("publish", [publish_dir])
+    
+    # The single-file output is only copied out again, so it can be staged in RAM
+    if skip_single:
+        # scratch_path may pick another place this run; the checkpoint verified the one it recorded
+        publish_single = Path(checkpoints.extra("publish-single", "path", publish_single))
+    else:
+        publish_single = scratch_path(publish_single, tree_size(publish_dir) if publish_dir.exists() else 0)
+        if publish_single.exists():
+            shutil.rmtree(publish_single)
+    
+    exe_single = publish_single / "AkademiTrack.exe"
+    if not skip_single:
+        if not publish_single_file(publish_single, build_session, icon_path):
+            return False
+        checkpoints.complete("publish-single", [publish_single], path=publish_single)
+    
+    if checkpoints.should_skip("zip"):
+        portable_zip = Path(checkpoints.extra("zip", "path"))
+    else:
+        portable_zip = create_portable_zip(publish_dir, release_folder, codec, codec_target,
+                                           build_session.cache)
+        if not portable_zip:
+            return False
+        # Read back every member (cached archives included) before anything ships it
+        if not verify_archive(portable_zip, expected_entries(portable_zip_files(publish_dir))):
+            return False
+        checkpoints.complete("zip", [portable_zip], path=portable_zip)
+    
+    # Size breakdown vs the previous release; cheap, so it also runs on resumed builds
+    if not check_size_budget(publish_dir, release_folder, "win-x64", version,
+                             [portable_zip, exe_single], size_budget):
+        return False
+    
+    # Velopack failures are not fatal; without a checkpoint --resume retries just this step
+    if not checkpoints.should_skip("velopack"):
+        release_file = create_velopack_package(publish_dir, releases_dir, release_folder, version, icon_path)
+        if release_file:
+            checkpoints.complete("velopack", [release_folder / release_file.name])
+    
+    if not checkpoints.should_skip("standalone"):
+        standalone_exe = add_standalone_exe(exe_single, release_folder)
+        checkpoints.complete("standalone", [standalone_exe])
     
     # Verify the release folder exists and has files
     if not release_folder.exists():
@@ -273,6 +394,8 @@ def build_windows_release(version):
         print(f"❌ Release folder is empty!")
         return False
     
+    # Kept on failure so --resume can reuse it
+    discard_scratch(publish_single)
     return release_folder
 
 def clear_icon_cache():
@@ -334,7 +457,38 @@ def clear_icon_cache():
         print(f"⚠️  Could not clear icon cache: {e}")
         print("💡 You can manually restart Explorer or reboot to see new icons")
 
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="AkademiTrack Windows build & package tool")
+    parser.add_argument("--build-servers", choices=BUILD_SERVER_MODES, default="default",
+                        help="warm: keep MSBuild/compiler servers alive across publishes; "
+                             "cold: disable them (baseline timings)")
+    parser.add_argument("--cache", metavar="URL",
+                        help="Shared build cache server (default: $AKADEMITRACK_BUILD_CACHE); outputs "
+                             "another builder already produced are pulled instead of rebuilt")
+    parser.add_argument("--cache-readonly", action="store_true",
+                        help="Pull from the build cache but never upload to it")
+    parser.add_argument("--codec", choices=list(ZIP_CODECS) + ["auto"], default=DEFAULT_ZIP_CODEC,
+                        help="Portable ZIP compression; 'auto' benchmarks the publish output and "
+                             "picks the smallest codec that meets --codec-target")
+    parser.add_argument("--codec-target", type=float, default=DEFAULT_TARGET_SECONDS,
+                        help="Time budget in seconds for compressing the ZIP in auto mode")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue a failed build from its last verified stage checkpoint")
+    parser.add_argument("--size-budget", type=float, default=DEFAULT_SIZE_BUDGET,
+                        help=f"Allowed size growth in percent vs the previous release "
+                             f"(default: {DEFAULT_SIZE_BUDGET:g})")
+    parser.add_argument("--allow-size-growth", action="store_true",
+                        help="Report size growth without failing the build")
+    parser.add_argument("--ram-scratch", nargs="?", const="auto", metavar="DIR",
+                        help="Stage transient output on a tmpfs (/dev/shm, or DIR); falls back to "
+                             "disk when it does not fit")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    configure_scratch(args.ram_scratch)
+
     print("🚀 AkademiTrack Windows Build & Package Tool")
     print("=" * 50)
     print("📧 Contact: cyberbrothershq@gmail.com")
@@ -342,6 +496,10 @@ def main():
     print("💻 GitHub: https://github.com/CyberGutta/AkademiTrack")
     print("=" * 50)
     
+    # Missing tools fail here in seconds, not after the publishes
+    if not run_preflight(build_checks(["win-x64"])):
+        return
+    
     # Get version number
     version = get_version_input()
     print(f"\n📌 Using version: {version}")
@@ -351,8 +509,23 @@ def main():
     if update_proj == 'y':
         update_csproj_version(version)
     
+    # Validate changelogs up front so a typo fails in seconds, not after publishing
+    if not compile_changelogs(version):
+        print("\n❌ Build failed!")
+        return
+    
     # Build everything
-    release_folder = build_windows_release(version)
+    checkpoints = StageCheckpoints("windows", version, WINDOWS_STAGES,
+                                   options={"codec": args.codec,
+                                            "codec_target": args.codec_target if args.codec == "auto" else None,
+                                            "scratch": scratch_root()},
+                                   resume=args.resume)
+    cache = open_build_cache(args.cache, push=not args.cache_readonly)
+    with BuildServerSession(args.build_servers, cache) as build_session:
+        release_folder = build_windows_release(version, build_session=build_session,
+                                               checkpoints=checkpoints, codec=args.codec,
+                                               codec_target=args.codec_target,
+                                               size_budget=None if args.allow_size_growth else args.size_budget)
     
     if release_folder:
         print("\n" + "=" * 50)
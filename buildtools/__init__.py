@@ -0,0 +1 @@
+"""Shared helpers for the build-linux.py, build-windows.py and build-mac.py release scripts"""
@@ -0,0 +1,455 @@
+"""Archive codecs for the portable packages
+
+Tar codecs (gzip, xz and, when the optional `zstandard` package is
+installed, zstd) are used for the Linux tarball; zip codecs (store or
+deflate at a chosen level) for the Windows portable ZIP. The "auto" mode
+compresses a sample of the publish tree with every candidate, estimates
+the full build time from the measured speed and picks the smallest output
+that still meets the target time. patch_zip updates an existing zip in
+place (used to turn the macOS notarization archive into the portable zip).
+"""
+import gzip
+import io
+import lzma
+import os
+import random
+import stat
+import struct
+import tarfile
+import time
+import zipfile
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+
+from buildtools.common import file_sha256
+
+try:
+    import zstandard
+except ImportError:  # optional: pip install zstandard
+    zstandard = None
+
+TAR_CODECS = {
+    "gz-6": {"format": "gz", "level": 6, "extension": ".tar.gz"},
+    "gz-9": {"format": "gz", "level": 9, "extension": ".tar.gz"},
+    "xz-6": {"format": "xz", "level": 6, "extension": ".tar.xz"},
+    "xz-9": {"format": "xz", "level": 9, "extension": ".tar.xz"},
+    "zst-3": {"format": "zst", "level": 3, "extension": ".tar.zst"},
+    "zst-19": {"format": "zst", "level": 19, "extension": ".tar.zst"},
+}
+ZIP_CODECS = {
+    "store": {"format": "zip", "level": None, "extension": ".zip"},
+    "deflate-1": {"format": "zip", "level": 1, "extension": ".zip"},
+    "deflate-6": {"format": "zip", "level": 6, "extension": ".zip"},
+    "deflate-9": {"format": "zip", "level": 9, "extension": ".zip"},
+}
+# What the scripts produced before codecs were configurable
+DEFAULT_TAR_CODEC = "gz-9"
+DEFAULT_ZIP_CODEC = "deflate-6"
+
+DEFAULT_SAMPLE_BYTES = 32 * 1024 * 1024
+# Header fields a member rewritten with write_raw_entry needs to come out byte-identical
+ZIPINFO_FIELDS = ["date_time", "compress_type", "flag_bits", "create_system", "create_version", "extract_version",
+                  "reserved", "volume", "internal_attr", "external_attr", "CRC", "compress_size", "file_size"]
+DEFAULT_TARGET_SECONDS = 30
+
+
+def available_codecs(codecs):
+    """Drop codecs whose optional dependency is not installed"""
+    return {name: codec for name, codec in codecs.items()
+            if codec["format"] != "zst" or zstandard is not None}
+
+
+@contextmanager
+def open_tar_writer(path, codec_name):
+    """Open a tarfile for writing with the given tar codec"""
+    codec = TAR_CODECS[codec_name]
+    if codec["format"] == "gz":
+        with tarfile.open(path, "w:gz", compresslevel=codec["level"]) as tar:
+            yield tar
+    elif codec["format"] == "xz":
+        with tarfile.open(path, "w:xz", preset=codec["level"]) as tar:
+            yield tar
+    else:
+        if zstandard is None:
+            raise RuntimeError("zstd needs the 'zstandard' package (pip install zstandard)")
+        compressor = zstandard.ZstdCompressor(level=codec["level"], threads=-1)
+        with open(path, "wb") as raw, compressor.stream_writer(raw) as stream, \
+                tarfile.open(fileobj=stream, mode="w|") as tar:
+            yield tar
+
+
+@contextmanager
+def open_tar_reader(path):
+    """Open a .tar.gz/.tar.xz/.tar.zst for streaming reads"""
+    with open(path, "rb") as raw:
+        magic = raw.read(4)
+        raw.seek(0)
+        if magic == b"\x28\xb5\x2f\xfd":
+            if zstandard is None:
+                raise RuntimeError("zstd needs the 'zstandard' package (pip install zstandard)")
+            with zstandard.ZstdDecompressor().stream_reader(raw) as stream, \
+                    tarfile.open(fileobj=stream, mode="r|") as tar:
+                yield tar
+        else:
+            with tarfile.open(fileobj=raw, mode="r|*") as tar:
+                yield tar
+
+
+def open_zip_writer(path, codec_name):
+    """Open a ZipFile for writing with the given zip codec"""
+    codec = ZIP_CODECS[codec_name]
+    if codec["level"] is None:
+        return zipfile.ZipFile(path, "w", zipfile.ZIP_STORED)
+    return zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=codec["level"])
+
+
+# ============================================================================
+# Duplicate payloads
+# ============================================================================
+
+def find_duplicates(files, digests=None):
+    """Group (path, arcname) pairs by content; returns {arcname: first arcname} for the copies
+
+    digests maps arcname -> sha256 when the caller already hashed the files.
+    """
+    first_by_content = {}
+    duplicates = {}
+    for path, arcname in files:
+        path = Path(path)
+        if path.is_symlink() or not path.is_file():
+            continue
+        size = path.stat().st_size
+        if not size:
+            continue
+        digest = digests.get(arcname) if digests else None
+        key = (size, digest or file_sha256(path))
+        if key in first_by_content:
+            duplicates[arcname] = first_by_content[key]
+        else:
+            first_by_content[key] = arcname
+    return duplicates
+
+
+def print_duplicate_report(files, duplicates, stored_once):
+    """Summarize duplicate payload; stored_once says whether the archive hardlinks it"""
+    if not duplicates:
+        print("  ✅ No duplicate file contents")
+        return 0
+    involved = set(duplicates) | set(duplicates.values())
+    sizes = {arcname: Path(path).stat().st_size for path, arcname in files if arcname in involved}
+    duplicate_bytes = sum(sizes[arcname] for arcname in duplicates)
+    groups = {}
+    for arcname, original in duplicates.items():
+        groups.setdefault(original, []).append(arcname)
+    verb = "stored once (hardlinked)" if stored_once else "stored more than once"
+    print(f"  ♻️  {len(duplicates)} duplicate file(s) {verb}: {duplicate_bytes / 1024 / 1024:.2f} MB")
+    for original, copies in sorted(groups.items(), key=lambda item: -sizes[item[0]] * len(item[1]))[:5]:
+        print(f"    {sizes[original] / 1024:.0f} KB x{len(copies) + 1}  {original} = {', '.join(copies)}")
+    return duplicate_bytes
+
+
+def add_deduplicated(tar, files, digests=None):
+    """Add (path, arcname) pairs to tar, writing identical contents once and hardlinking the rest
+
+    Returns the uncompressed bytes saved.
+    """
+    duplicates = find_duplicates(files, digests)
+    for path, arcname in files:
+        if arcname not in duplicates:
+            tar.add(path, arcname=arcname)
+            continue
+        info = tar.gettarinfo(path, arcname=arcname)
+        info.type = tarfile.LNKTYPE
+        info.linkname = duplicates[arcname]
+        info.size = 0
+        tar.addfile(info)
+    return print_duplicate_report(files, duplicates, stored_once=True)
+
+
+# ============================================================================
+# Patching an existing zip
+# ============================================================================
+
+def _is_metadata_entry(name):
+    """AppleDouble entries ditto writes for extended attributes and resource forks"""
+    return name.startswith("__MACOSX/") or Path(name.rstrip("/")).name.startswith("._")
+
+
+def _metadata_base(name):
+    name = name[len("__MACOSX/"):] if name.startswith("__MACOSX/") else name
+    path = Path(name.rstrip("/"))
+    return (path.parent / path.name[2:]).as_posix() if path.name.startswith("._") else path.as_posix()
+
+
+def _file_crc32(path):
+    crc = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def seek_raw_entry(raw, info):
+    """Position raw (the zip opened as a binary file) at the compressed data of info"""
+    raw.seek(info.header_offset)
+    # The local header's name and extra field can differ in length from the central directory's
+    name_length, extra_length = struct.unpack("<HH", raw.read(30)[26:30])
+    raw.seek(info.header_offset + 30 + name_length + extra_length)
+
+
+def write_raw_entry(zout, info, source):
+    """Append an already compressed member to a ZipFile opened for writing
+
+    info carries the final CRC, sizes and compression method; source is a
+    binary file positioned at the compressed data (info.compress_size bytes).
+    """
+    # Sizes and CRC go into the local header, so no data descriptor is needed
+    info.flag_bits &= ~0x08
+    info.header_offset = zout.fp.tell()
+    zout.fp.write(info.FileHeader())
+    remaining = info.compress_size
+    while remaining:
+        chunk = source.read(min(1024 * 1024, remaining))
+        if not chunk:
+            raise EOFError(f"{info.filename}: compressed data is truncated")
+        zout.fp.write(chunk)
+        remaining -= len(chunk)
+    zout.filelist.append(info)
+    zout.NameToInfo[info.filename] = info
+    # The central directory goes after the last entry
+    zout.start_dir = zout.fp.tell()
+
+
+def zip_member_header(info):
+    """JSON-safe copy of the headers of a zip member"""
+    header = {field: getattr(info, field) for field in ZIPINFO_FIELDS}
+    header["extra"] = info.extra.hex()
+    header["comment"] = info.comment.hex()
+    return header
+
+
+def zipinfo_from_header(name, header):
+    """ZipInfo for write_raw_entry from a zip_member_header() dict"""
+    info = zipfile.ZipInfo(name, tuple(header["date_time"]))
+    for field in ZIPINFO_FIELDS[1:]:
+        setattr(info, field, header[field])
+    info.extra = bytes.fromhex(header["extra"])
+    info.comment = bytes.fromhex(header["comment"])
+    return info
+
+
+def _copy_zip_entries(source, destination, names):
+    """Write the named entries of source into a new zip without recompressing them"""
+    with open(source, "rb") as raw, zipfile.ZipFile(source) as zin, zipfile.ZipFile(destination, "w") as zout:
+        for info in zin.infolist():
+            if info.filename not in names:
+                continue
+            seek_raw_entry(raw, info)
+            write_raw_entry(zout, info, raw)
+
+
+def patch_zip(zip_path, root, arc_parent):
+    """Bring a zip of root (arcnames relative to arc_parent) up to date with the tree on disk
+
+    Only entries that differ are written: new files are appended, and when
+    files changed or disappeared the unchanged entries are copied over
+    still compressed. Returns {"added", "replaced", "removed", "kept"} or
+    None when the zip cannot be patched safely (a changed file carries
+    AppleDouble metadata, which needs the original archiver).
+    """
+    root = Path(root)
+    with zipfile.ZipFile(zip_path) as zf:
+        entries = {info.filename: info for info in zf.infolist()}
+        links = {name: zf.read(name).decode("utf-8", "surrogateescape") for name, info in entries.items()
+                 if stat.S_ISLNK(info.external_attr >> 16)}
+
+    wanted = {}
+    for path in [root, *sorted(root.rglob("*"))]:
+        arcname = path.relative_to(arc_parent).as_posix()
+        if path.is_dir() and not path.is_symlink():
+            arcname += "/"
+        wanted[arcname] = path
+
+    stale = []
+    added = []
+    for arcname, path in wanted.items():
+        info = entries.get(arcname)
+        if info is None:
+            added.append(arcname)
+        elif path.is_symlink():
+            if links.get(arcname) != os.readlink(path):
+                stale.append(arcname)
+        elif path.is_file():
+            if info.file_size != path.stat().st_size or info.CRC != _file_crc32(path):
+                stale.append(arcname)
+    removed = [name for name in entries if name not in wanted and not _is_metadata_entry(name)]
+    gone = {name.rstrip("/") for name in stale + removed}
+    if any(_is_metadata_entry(name) and _metadata_base(name) in gone for name in entries):
+        return None
+
+    drop = set(stale) | set(removed)
+    if drop:
+        temp_path = Path(zip_path).with_name(Path(zip_path).name + ".patching")
+        _copy_zip_entries(zip_path, temp_path, set(entries) - drop)
+        os.replace(temp_path, zip_path)
+
+    with zipfile.ZipFile(zip_path, "a", zipfile.ZIP_DEFLATED) as zf:
+        for arcname in sorted(stale + added):
+            path = wanted[arcname]
+            if path.is_symlink():
+                info = zipfile.ZipInfo(arcname, time.localtime(path.lstat().st_mtime)[:6])
+                info.create_system = 3
+                info.external_attr = (stat.S_IFLNK | 0o755) << 16
+                zf.writestr(info, os.readlink(path))
+            else:
+                zf.write(path, arcname)
+    return {"added": len(added), "replaced": len(stale), "removed": len(removed),
+            "kept": len(entries) - len(drop)}
+
+
+# ============================================================================
+# Benchmarking and auto-selection
+# ============================================================================
+
+def _compress_pair(codec):
+    """Return (compress, decompress) callables for a whole-buffer codec"""
+    fmt, level = codec["format"], codec["level"]
+    if fmt == "gz":
+        return (lambda data: gzip.compress(data, compresslevel=level, mtime=0), gzip.decompress)
+    if fmt == "xz":
+        return (lambda data: lzma.compress(data, preset=level), lzma.decompress)
+    if fmt == "zst":
+        return (lambda data: zstandard.ZstdCompressor(level=level, threads=-1).compress(data),
+                lambda data: zstandard.ZstdDecompressor().decompress(data))
+    raise ValueError(f"Not a whole-buffer codec: {fmt}")
+
+
+def _deflate_raw(data, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _inflate_raw(data):
+    return zlib.decompressobj(-15).decompress(data)
+
+
+def collect_files(source_dir):
+    """All regular files under source_dir with their sizes"""
+    files = []
+    for dirpath, _, filenames in os.walk(source_dir):
+        for name in filenames:
+            path = Path(dirpath) / name
+            if path.is_file() and not path.is_symlink():
+                files.append((path, path.stat().st_size))
+    files.sort()
+    return files
+
+
+def pick_sample(files, sample_bytes):
+    """Pick a deterministic, tree-wide sample of files up to sample_bytes"""
+    if sum(size for _, size in files) <= sample_bytes:
+        return files
+    shuffled = list(files)
+    random.Random(0).shuffle(shuffled)
+    sample, total = [], 0
+    for path, size in shuffled:
+        if total + size > sample_bytes and sample:
+            continue
+        sample.append((path, size))
+        total += size
+    return sample
+
+
+def benchmark_codecs(source_dir, codecs, sample_bytes=DEFAULT_SAMPLE_BYTES):
+    """Compress a sample of source_dir with each codec and measure ratio and speed"""
+    files = collect_files(source_dir)
+    total_bytes = sum(size for _, size in files)
+    sample = pick_sample(files, sample_bytes)
+    contents = [(path, path.read_bytes()) for path, _ in sample]
+    sample_size = sum(len(data) for _, data in contents)
+
+    # Tar codecs compress one stream, so benchmark on a real (uncompressed) tar of the sample
+    tar_buffer = io.BytesIO()
+    with tarfile.open(fileobj=tar_buffer, mode="w") as tar:
+        for path, data in contents:
+            info = tarfile.TarInfo(str(path.relative_to(source_dir)))
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    tar_bytes = tar_buffer.getvalue()
+
+    results = []
+    for name, codec in codecs.items():
+        if codec["format"] == "zip":
+            level = codec["level"]
+            started = time.perf_counter()
+            if level is None:
+                compressed = [data for _, data in contents]
+            else:
+                compressed = [_deflate_raw(data, level) for _, data in contents]
+            compress_time = time.perf_counter() - started
+            started = time.perf_counter()
+            if level is not None:
+                for blob in compressed:
+                    _inflate_raw(blob)
+            decompress_time = time.perf_counter() - started
+            compressed_size = sum(len(blob) for blob in compressed)
+            input_size = sample_size
+        else:
+            compress, decompress = _compress_pair(codec)
+            started = time.perf_counter()
+            blob = compress(tar_bytes)
+            compress_time = time.perf_counter() - started
+            started = time.perf_counter()
+            decompress(blob)
+            decompress_time = time.perf_counter() - started
+            compressed_size = len(blob)
+            input_size = len(tar_bytes)
+
+        megabytes = input_size / 1024 / 1024
+        compress_speed = megabytes / max(compress_time, 1e-6)
+        ratio = input_size / max(compressed_size, 1)
+        results.append({
+            "codec": name,
+            "ratio": ratio,
+            "compress_mbps": compress_speed,
+            "decompress_mbps": megabytes / max(decompress_time, 1e-6),
+            "estimated_seconds": total_bytes / 1024 / 1024 / compress_speed,
+            "estimated_mb": total_bytes / 1024 / 1024 / ratio,
+        })
+    return {"total_bytes": total_bytes, "sample_bytes": sample_size,
+            "sample_files": len(sample), "results": results}
+
+
+def select_codec(benchmark, target_seconds=DEFAULT_TARGET_SECONDS):
+    """Smallest estimated output among codecs meeting the time target (else the fastest)"""
+    results = benchmark["results"]
+    within_target = [r for r in results if r["estimated_seconds"] <= target_seconds]
+    if within_target:
+        return min(within_target, key=lambda r: r["estimated_mb"])["codec"]
+    return min(results, key=lambda r: r["estimated_seconds"])["codec"]
+
+
+def print_codec_report(benchmark, selected=None):
+    """Print ratio and speed per codec for the sampled publish output"""
+    total_mb = benchmark["total_bytes"] / 1024 / 1024
+    sample_mb = benchmark["sample_bytes"] / 1024 / 1024
+    print(f"\n📊 Codec benchmark ({benchmark['sample_files']} files, "
+          f"{sample_mb:.1f} MB sample of {total_mb:.1f} MB)")
+    print(f"  {'codec':<11}{'ratio':>7}{'comp MB/s':>11}{'decomp MB/s':>13}{'est. time':>11}{'est. size':>11}")
+    for r in benchmark["results"]:
+        marker = " ⭐" if r["codec"] == selected else ""
+        print(f"  {r['codec']:<11}{r['ratio']:>7.2f}{r['compress_mbps']:>11.1f}"
+              f"{r['decompress_mbps']:>13.1f}{r['estimated_seconds']:>10.1f}s"
+              f"{r['estimated_mb']:>9.1f} MB{marker}")
+
+
+def resolve_codec(codec_name, codecs, source_dir, target_seconds=DEFAULT_TARGET_SECONDS):
+    """Turn "auto" into a concrete codec by benchmarking source_dir"""
+    if codec_name != "auto":
+        return codec_name
+    benchmark = benchmark_codecs(source_dir, available_codecs(codecs))
+    selected = select_codec(benchmark, target_seconds)
+    print_codec_report(benchmark, selected)
+    print(f"✅ Auto-selected codec: {selected} (target {target_seconds:g}s)")
+    return selected
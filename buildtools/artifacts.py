@@ -0,0 +1,298 @@
+"""Index of the Velopack packages in Releases/ with exact lookups and retention
+
+vpk pack writes every version's packages, the delta from the previous
+version and the channel metadata (RELEASES, releases.<channel>.json, ...)
+into one output folder shared by all platforms. Picking
+`glob("AkademiTrack-<version>-*.nupkg")[0]` afterwards returns whichever
+package sorts first once a second RID (or a delta) exists. Instead, the
+build scripts snapshot the folder before vpk runs and record what appeared
+in Releases/artifacts.json (version, RID, kind, size and SHA-256), then
+look their package up by (version, RID, kind).
+
+Parallel builds pack into staging folders instead. seed_vpk_dir gives each
+one the RID's newest full package and channel metadata from Releases/, so
+vpk still builds a delta and extends the release list, and
+import_artifacts merges the staged release lists back into the shared ones
+rather than replacing them.
+
+prune_artifacts keeps the newest full packages per RID (vpk pack builds
+its delta from the newest one) plus the deltas leading up to them, and
+deletes older packages. The release folders keep their own copies, which
+the update feed builds its deltas from.
+"""
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from buildtools.common import file_sha256
+from buildtools.feed import version_key
+
+try:
+    import fcntl
+except ImportError:  # Windows: builds on one host do not share a Releases/ folder
+    fcntl = None
+
+ARTIFACT_INDEX_NAME = "artifacts.json"
+ARTIFACT_LOCK_NAME = ".artifacts.lock"
+INDEX_FORMAT = 1
+# The current full package plus the one before it
+DEFAULT_KEEP_FULL = 2
+
+PACKAGE_RE = re.compile(r"^AkademiTrack-(?P<version>\d+(?:\.\d+)*)-(?P<channel>[A-Za-z]\w*)-(?P<kind>full|delta)\.nupkg$")
+# Velopack's default channel for each runtime
+CHANNEL_RIDS = {"linux": "linux-x64", "win": "win-x64", "osx": "osx-arm64"}
+
+_index_lock = threading.Lock()
+
+
+def load_artifact_index(releases_dir):
+    """Read Releases/artifacts.json (empty when missing or unreadable)"""
+    try:
+        index = json.loads((Path(releases_dir) / ARTIFACT_INDEX_NAME).read_text(encoding="utf-8"))
+        if index.get("format") == INDEX_FORMAT:
+            return index
+    except (OSError, ValueError):
+        pass
+    return {"format": INDEX_FORMAT, "artifacts": {}}
+
+
+@contextmanager
+def _locked_index(releases_dir):
+    """Read-modify-write the index under a thread and (where available) process lock"""
+    releases_dir = Path(releases_dir)
+    releases_dir.mkdir(parents=True, exist_ok=True)
+    with _index_lock, open(releases_dir / ARTIFACT_LOCK_NAME, "a") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        index = load_artifact_index(releases_dir)
+        yield index
+        index_path = releases_dir / ARTIFACT_INDEX_NAME
+        temp_path = index_path.with_name(index_path.name + ".tmp")
+        temp_path.write_text(json.dumps(index, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        os.replace(temp_path, index_path)
+
+
+def snapshot_artifacts(releases_dir):
+    """{name: (size, mtime_ns)} of the files in the vpk output folder"""
+    releases_dir = Path(releases_dir)
+    if not releases_dir.is_dir():
+        return {}
+    snapshot = {}
+    for item in releases_dir.iterdir():
+        if item.is_file() and item.name not in (ARTIFACT_INDEX_NAME, ARTIFACT_LOCK_NAME):
+            stat = item.stat()
+            snapshot[item.name] = (stat.st_size, stat.st_mtime_ns)
+    return snapshot
+
+
+def classify_artifact(name, version=None, rid=None):
+    """(version, rid, kind) for a vpk output file; package names win over the given values"""
+    match = PACKAGE_RE.match(name)
+    if match:
+        return (match.group("version"), CHANNEL_RIDS.get(match.group("channel"), rid), match.group("kind"))
+    if name.endswith(("-Setup.exe", ".AppImage", ".pkg")):
+        return version, rid, "installer"
+    if name.endswith("-Portable.zip"):
+        return version, rid, "portable"
+    return version, rid, "metadata"
+
+
+def _entry(path, version, rid, kind):
+    return {"version": version, "rid": rid, "kind": kind, "size": path.stat().st_size,
+            "sha256": file_sha256(path), "recorded": time.strftime("%Y-%m-%d %H:%M:%S")}
+
+
+def register_new_artifacts(releases_dir, before, version, rid):
+    """Record every file vpk created or rewrote since `before`; returns their names"""
+    releases_dir = Path(releases_dir)
+    after = snapshot_artifacts(releases_dir)
+    names = sorted(name for name, state in after.items() if before.get(name) != state)
+    with _locked_index(releases_dir) as index:
+        for name in names:
+            index["artifacts"][name] = _entry(releases_dir / name, *classify_artifact(name, version, rid))
+    return names
+
+
+def find_artifact(releases_dir, version, rid, kind="full"):
+    """The indexed artifact for exactly this version, RID and kind, or None"""
+    releases_dir = Path(releases_dir)
+    matches = sorted((entry["recorded"], name)
+                     for name, entry in load_artifact_index(releases_dir)["artifacts"].items()
+                     if (entry["version"], entry["rid"], entry["kind"]) == (version, rid, kind)
+                     and (releases_dir / name).is_file())
+    return releases_dir / matches[-1][1] if matches else None
+
+
+def channel_metadata_names(rid):
+    """Files in which vpk keeps a channel's release history"""
+    channel = next((channel for channel, channel_rid in CHANNEL_RIDS.items() if channel_rid == rid), rid)
+    # The legacy RELEASES file only exists for the Windows channel
+    legacy = "RELEASES" if channel == "win" else f"RELEASES-{channel}"
+    return [f"releases.{channel}.json", f"assets.{channel}.json", legacy]
+
+
+def latest_full_package(releases_dir, rid):
+    """Newest full package of a RID in releases_dir, indexed or not, or None"""
+    releases_dir = Path(releases_dir)
+    packages = []
+    for name in snapshot_artifacts(releases_dir):
+        version, package_rid, kind = classify_artifact(name)
+        if kind == "full" and package_rid == rid and PACKAGE_RE.match(name):
+            packages.append((version_key(version), name))
+    return releases_dir / max(packages)[1] if packages else None
+
+
+def seed_vpk_dir(releases_dir, vpk_dir, rid):
+    """Copy the RID's newest full package and channel metadata into a staging vpk folder
+
+    vpk pack builds its delta from the newest full package in --outputDir and
+    appends to the release list it finds there; an empty staging folder
+    would give neither. Returns the names copied.
+    """
+    releases_dir = Path(releases_dir)
+    vpk_dir = Path(vpk_dir)
+    vpk_dir.mkdir(parents=True, exist_ok=True)
+    seeded = [path for path in [latest_full_package(releases_dir, rid)] +
+              [releases_dir / name for name in channel_metadata_names(rid)] if path and path.is_file()]
+    for path in seeded:
+        shutil.copy2(path, vpk_dir / path.name)
+    return [path.name for path in seeded]
+
+
+def _replace_file(path, write):
+    """Write path through a temp file, so readers never see half a file"""
+    temp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        write(temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+
+
+def merge_channel_metadata(staged, shared):
+    """Merged text of a staged release list and the shared one; None when they cannot be merged
+
+    releases.<channel>.json assets and RELEASES lines are keyed by package
+    file name: entries only the shared copy has are kept, the staged copy
+    wins for the rest.
+    """
+    staged_text = Path(staged).read_text(encoding="utf-8-sig")
+    shared_text = Path(shared).read_text(encoding="utf-8-sig")
+    name = Path(staged).name
+    if name.startswith("releases.") and name.endswith(".json"):
+        try:
+            staged_data, shared_data = json.loads(staged_text), json.loads(shared_text)
+            assets = {asset["FileName"]: asset for asset in shared_data["Assets"]}
+            assets.update((asset["FileName"], asset) for asset in staged_data["Assets"])
+        except (ValueError, KeyError, TypeError):
+            return None
+        staged_data["Assets"] = list(assets.values())
+        return json.dumps(staged_data, indent=2) + "\n"
+    if name == "RELEASES" or name.startswith("RELEASES-"):
+        # "<sha1> <file name> <size>" per package
+        lines = {}
+        for line in shared_text.splitlines() + staged_text.splitlines():
+            parts = line.split()
+            if len(parts) >= 2:
+                lines[parts[1]] = line.strip()
+        return "\n".join(lines.values()) + "\n"
+    return None
+
+
+def import_artifacts(source_dir, releases_dir):
+    """Copy what vpk wrote into a staging folder to releases_dir, carrying its index entries over
+
+    Files seeded by seed_vpk_dir are left out, and the channel release
+    lists are merged into the shared ones.
+    """
+    source_dir = Path(source_dir)
+    releases_dir = Path(releases_dir)
+    staged = load_artifact_index(source_dir)["artifacts"]
+    copied = []
+    with _locked_index(releases_dir) as index:
+        for name, entry in sorted(staged.items()):
+            item = source_dir / name
+            target = releases_dir / name
+            if not item.is_file():
+                continue
+            merged = merge_channel_metadata(item, target) if target.is_file() else None
+            if merged is not None:
+                _replace_file(target, lambda path: path.write_text(merged, encoding="utf-8"))
+                entry = _entry(target, entry["version"], entry["rid"], entry["kind"])
+            else:
+                _replace_file(target, lambda path: shutil.copy2(item, path))
+            copied.append(name)
+            index["artifacts"][name] = entry
+    return copied
+
+
+def _adopt_untracked(index, releases_dir):
+    """Index packages that were written before the index existed; forget deleted files"""
+    for name in list(index["artifacts"]):
+        if not (releases_dir / name).is_file():
+            del index["artifacts"][name]
+    for name in snapshot_artifacts(releases_dir):
+        if name not in index["artifacts"] and PACKAGE_RE.match(name):
+            index["artifacts"][name] = _entry(releases_dir / name, *classify_artifact(name))
+
+
+def plan_retention(index, keep_full=DEFAULT_KEEP_FULL):
+    """Names of the packages a retention pass deletes
+
+    Per RID the newest keep_full versions with a full package are kept,
+    together with every delta from the oldest of them onward. Installers,
+    portable archives and channel metadata are never deleted.
+    """
+    keep_full = max(1, keep_full)
+    full_versions = {}
+    for entry in index["artifacts"].values():
+        if entry["kind"] == "full":
+            full_versions.setdefault(entry["rid"], set()).add(entry["version"])
+    # Oldest version still kept for each RID
+    cutoffs = {rid: sorted(versions, key=version_key)[-keep_full:][0]
+               for rid, versions in full_versions.items()}
+    doomed = []
+    for name, entry in index["artifacts"].items():
+        cutoff = cutoffs.get(entry["rid"])
+        if entry["kind"] in ("full", "delta") and cutoff and version_key(entry["version"]) < version_key(cutoff):
+            doomed.append(name)
+    return sorted(doomed)
+
+
+def prune_artifacts(releases_dir, keep_full=DEFAULT_KEEP_FULL, dry_run=False):
+    """Apply the retention policy to releases_dir; returns the names removed (or to remove)"""
+    releases_dir = Path(releases_dir)
+    with _locked_index(releases_dir) as index:
+        _adopt_untracked(index, releases_dir)
+        doomed = plan_retention(index, keep_full)
+        freed = sum(index["artifacts"][name]["size"] for name in doomed)
+        for name in doomed:
+            print(f"  🧹 {'Would remove' if dry_run else 'Removing'} {name}")
+            if not dry_run:
+                (releases_dir / name).unlink()
+                del index["artifacts"][name]
+    kept = sum(1 for name, entry in index["artifacts"].items()
+               if entry["kind"] in ("full", "delta") and name not in doomed)
+    verb = "Would free" if dry_run else "Freed"
+    print(f"🧹 Package retention (newest {max(1, keep_full)} full per RID): {len(doomed)} package(s) "
+          f"{'to remove' if dry_run else 'removed'}, {verb.lower()} {freed / 1024 / 1024:.1f} MB, "
+          f"{kept} kept")
+    return doomed
+
+
+def verify_artifacts(releases_dir):
+    """Re-hash every indexed file; returns the names whose size or hash changed"""
+    releases_dir = Path(releases_dir)
+    changed = []
+    for name, entry in load_artifact_index(releases_dir)["artifacts"].items():
+        path = releases_dir / name
+        if not path.is_file() or path.stat().st_size != entry["size"] or file_sha256(path) != entry["sha256"]:
+            changed.append(name)
+    return changed
+
@@ -0,0 +1,129 @@
+"""Strip unreferenced and foreign-platform assets from a publish tree
+
+Every Assets/ file that .csproj copies to the output lands in every
+platform's publish. This stage keeps only files whose name (or enclosing
+bundle, such as AkademiTrack.app) appears in a string literal of the
+AXAML/C# sources or the changelogs, then applies per-platform rules that
+drop helpers for other operating systems even if the code mentions them.
+The Avalonia resources embedded in the assembly are not affected.
+"""
+import fnmatch
+import json
+import re
+from pathlib import Path
+
+SOURCE_PATTERNS = ("*.cs", "*.axaml")
+# Build output and tooling folders never hold app sources
+SKIP_DIRS = {"bin", "obj", "build", "Releases", "build-logs", "buildtools", "node_modules"}
+
+# Paths relative to Assets/ that never ship on a platform, referenced or not
+PLATFORM_EXCLUDES = {
+    "linux": ["Helpers/WinHelloAuth.exe", "Helpers/AkademiAuth", "Helpers/AkademiTrack.app/*", "*.icns"],
+    "win": ["Helpers/AkademiAuth", "Helpers/AkademiTrack.app/*", "*.icns"],
+    "osx": ["Helpers/WinHelloAuth.exe"],
+}
+
+STRING_LITERAL = re.compile(r'"((?:[^"\\\n]|\\.)*)"')
+# Unquoted path pieces too, e.g. src='file:///.../AT-1024.png' inside verbatim XML strings
+PATH_TOKEN = re.compile(r"[^\s\"'/\\<>=]+")
+
+
+def _source_files(project_dir):
+    for pattern in SOURCE_PATTERNS:
+        for path in Path(project_dir).rglob(pattern):
+            relative = path.relative_to(project_dir).parts
+            if any(part in SKIP_DIRS or part.startswith((".", "publish")) for part in relative[:-1]):
+                continue
+            yield path
+
+
+def _json_strings(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _json_strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _json_strings(item)
+
+
+def collect_references(project_dir=Path(".")):
+    """Every path component that appears in the sources or changelogs"""
+    project_dir = Path(project_dir)
+    strings = []
+    tokens = set()
+    for path in _source_files(project_dir):
+        text = path.read_text(encoding="utf-8", errors="replace")
+        strings += STRING_LITERAL.findall(text)
+        tokens.update(PATH_TOKEN.findall(text))
+    for path in (project_dir / "Changelogs").glob("*.json"):
+        try:
+            strings += _json_strings(json.loads(path.read_text(encoding="utf-8")))
+        except ValueError:
+            continue
+
+    for value in strings:
+        tokens.update(part for part in re.split(r"[\\/]+", value) if part)
+    return tokens
+
+
+def _is_referenced(rel_path, tokens):
+    parts = rel_path.split("/")
+    if parts[-1] in tokens:
+        return True
+    # Files inside a referenced bundle directory (AkademiTrack.app/...) come with it
+    return any(Path(part).suffix and part in tokens for part in parts[:-1])
+
+
+def _asset_roots(publish_dir):
+    roots = []
+    for path in sorted(Path(publish_dir).rglob("Assets")):
+        if path.is_dir() and not any(parent in roots for parent in path.parents):
+            roots.append(path)
+    return roots
+
+
+def prune_assets(publish_dir, platform, project_dir=Path("."), references=None):
+    """Remove unreferenced and foreign-platform files from every Assets/ in publish_dir
+
+    Returns (files removed, bytes removed).
+    """
+    print(f"\n✂️  Pruning unused assets ({platform})...")
+    if references is None:
+        references = collect_references(project_dir)
+    excludes = PLATFORM_EXCLUDES.get(platform, [])
+
+    removed = {"platform": [], "unreferenced": []}
+    removed_bytes = 0
+    for root in _asset_roots(publish_dir):
+        for path in sorted(root.rglob("*")):
+            if not path.is_file() and not path.is_symlink():
+                continue
+            rel_path = path.relative_to(root).as_posix()
+            if any(fnmatch.fnmatch(rel_path, pattern) for pattern in excludes):
+                reason = "platform"
+            elif not _is_referenced(rel_path, references):
+                reason = "unreferenced"
+            else:
+                continue
+            removed_bytes += path.lstat().st_size
+            removed[reason].append(rel_path)
+            path.unlink()
+
+        # Drop directories the pruning emptied (deepest first)
+        for directory in sorted((d for d in root.rglob("*") if d.is_dir()), key=lambda d: -len(d.parts)):
+            if not any(directory.iterdir()):
+                directory.rmdir()
+
+    count = len(removed["platform"]) + len(removed["unreferenced"])
+    if not count:
+        print("✅ All assets are referenced")
+        return 0, 0
+    for reason, label in (("platform", "other platforms"), ("unreferenced", "not referenced")):
+        if removed[reason]:
+            names = sorted(set(removed[reason]))
+            shown = ", ".join(names[:6]) + (f" (+{len(names) - 6} more)" if len(names) > 6 else "")
+            print(f"  🗑️  {len(removed[reason])} for {label}: {shown}")
+    print(f"✅ Pruned {count} asset file(s), {removed_bytes / 1024 / 1024:.2f} MB")
+    return count, removed_bytes
@@ -0,0 +1,299 @@
+"""Shared build cache client
+
+Build outputs are stored in a remote content-addressed store (see
+cacheserver.py): every file goes to /cas/<sha256> once, and an entry under
+/ac/<key> lists the files, modes and symlinks an output consists of. Keys
+hash everything the output depends on (the project sources, the .NET SDK
+version, the publish command or signing identity), so a second builder
+working on the same version pulls the publish trees, signed bundles and
+archives instead of producing them again. Downloads are verified against
+their hash, and any cache failure is treated as a miss: the cache can only
+make a build faster, never break it.
+"""
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from buildtools.common import file_sha256
+
+CACHE_ENV = "AKADEMITRACK_BUILD_CACHE"
+# Bump when the entry layout or key derivation changes
+CACHE_KEY_VERSION = 1
+TRANSFER_JOBS = 8
+REQUEST_TIMEOUT = 60
+CHUNK_SIZE = 1024 * 1024
+
+# Build output and tooling that never feeds into `dotnet publish`
+SOURCE_SKIP_DIRS = {"bin", "obj", "build", "Releases", "build-logs", "buildtools", "node_modules",
+                    "__pycache__", "pkg_root"}
+SOURCE_SKIP_SUFFIXES = {".py", ".pyc", ".log"}
+# Publish arguments that only say where the output goes
+OUTPUT_FLAGS = {"-o", "--output"}
+
+_source_digest = None
+_sdk_version = None
+_memo_lock = threading.Lock()
+
+
+def source_digest(project_dir=Path(".")):
+    """Hash of every project input file (paths and contents), computed once until reset_source_digest()"""
+    global _source_digest
+    with _memo_lock:
+        if _source_digest is None:
+            project_dir = Path(project_dir)
+            digest = hashlib.sha256()
+            for dirpath, dirnames, filenames in os.walk(project_dir):
+                dirnames[:] = sorted(d for d in dirnames if d not in SOURCE_SKIP_DIRS
+                                     and not d.startswith((".", "publish")))
+                for name in sorted(filenames):
+                    path = Path(dirpath) / name
+                    if path.suffix in SOURCE_SKIP_SUFFIXES or not path.is_file():
+                        continue
+                    digest.update(f"{path.relative_to(project_dir).as_posix()}\0{file_sha256(path)}\n".encode())
+            _source_digest = digest.hexdigest()
+        return _source_digest
+
+
+def reset_source_digest():
+    """Forget the memoized source digest, so the next key sees edited sources (--watch)"""
+    global _source_digest
+    with _memo_lock:
+        _source_digest = None
+
+
+def sdk_version():
+    """`dotnet --version`, computed once per process ("unknown" without an SDK)"""
+    global _sdk_version
+    with _memo_lock:
+        if _sdk_version is None:
+            try:
+                result = subprocess.run(["dotnet", "--version"], capture_output=True, text=True)
+                _sdk_version = result.stdout.strip() or "unknown"
+            except OSError:
+                _sdk_version = "unknown"
+        return _sdk_version
+
+
+def tree_manifest(root):
+    """Describe a directory (or a single file) as {files: {rel: {sha256, size, mode}}, links: {rel: target}}"""
+    root = Path(root)
+    files = {}
+    links = {}
+    paths = [root] if root.is_file() else sorted(root.rglob("*"))
+    for path in paths:
+        rel_path = path.name if path == root else path.relative_to(root).as_posix()
+        if path.is_symlink():
+            links[rel_path] = os.readlink(path)
+        elif path.is_file():
+            files[rel_path] = {"sha256": file_sha256(path), "size": path.stat().st_size,
+                               "mode": path.stat().st_mode & 0o777}
+    return {"files": files, "links": links}
+
+
+def manifest_digest(manifest):
+    """Stable hash of a tree manifest, for keys that depend on a whole tree"""
+    return hashlib.sha256(json.dumps(manifest, sort_keys=True).encode()).hexdigest()
+
+
+class BuildCache:
+    """Client for a cache server; all operations degrade to misses on errors"""
+
+    def __init__(self, url, push=True):
+        self.url = url.rstrip("/")
+        self.push = push
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "pulled": 0, "pushed": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._warned = False
+
+    def key(self, kind, *parts):
+        """Cache key for an output of the given kind and everything it depends on"""
+        payload = json.dumps([CACHE_KEY_VERSION, kind, *parts], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def publish_key(self, cmd):
+        """Key for a `dotnet publish` command, independent of its output directory"""
+        args = []
+        skip_next = False
+        # Absolute paths into the work tree (e.g. the derived icon) differ between builders
+        work_tree = str(Path.cwd().absolute())
+        for part in (str(part).replace(work_tree, ".") for part in cmd):
+            if skip_next:
+                skip_next = False
+                continue
+            if part in OUTPUT_FLAGS:
+                skip_next = True
+                continue
+            args.append(part)
+        return self.key("publish", args, source_digest(), sdk_version())
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def _error(self, what, error):
+        self._count("errors")
+        with self._lock:
+            first = not self._warned
+            self._warned = True
+        if first:
+            print(f"⚠️  Build cache {what} failed ({error}); building locally")
+
+    def _open(self, method, path, data=None, headers=None):
+        request = urllib.request.Request(f"{self.url}{path}", data=data, method=method, headers=headers or {})
+        return urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT)
+
+    def _get_entry(self, key):
+        try:
+            with self._open("GET", f"/ac/{key}") as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            if e.code != 404:
+                self._error("lookup", e)
+        except (OSError, ValueError) as e:
+            self._error("lookup", e)
+        return None
+
+    def _download(self, digest, destination):
+        """Fetch one blob into destination, verifying its hash"""
+        hasher = hashlib.sha256()
+        size = 0
+        with self._open("GET", f"/cas/{digest}") as response, open(destination, "wb") as f:
+            for chunk in iter(lambda: response.read(CHUNK_SIZE), b""):
+                hasher.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+        if hasher.hexdigest() != digest:
+            raise ValueError(f"blob {digest[:12]} failed its integrity check")
+        self._count("pulled", size)
+
+    def _upload(self, path, digest):
+        size = path.stat().st_size
+        with open(path, "rb") as f:
+            with self._open("PUT", f"/cas/{digest}", data=f,
+                            headers={"Content-Length": str(size),
+                                     "Content-Type": "application/octet-stream"}):
+                pass
+        self._count("pushed", size)
+
+    def _missing(self, digests):
+        body = json.dumps(sorted(digests)).encode()
+        with self._open("POST", "/cas/missing", data=body,
+                        headers={"Content-Type": "application/json"}) as response:
+            return set(json.loads(response.read()))
+
+    def fetch_tree(self, key, destination, label, entry=None):
+        """Restore a cached output to destination (replacing it); True on a hit"""
+        if entry is None:
+            entry = self._get_entry(key)
+        if entry is None:
+            self._count("misses")
+            return False
+
+        started = time.time()
+        destination = Path(destination)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f".{destination.name}.cache-", dir=destination.parent))
+        by_digest = {}
+        for rel_path, info in entry["files"].items():
+            by_digest.setdefault(info["sha256"], []).append(rel_path)
+        try:
+            def pull(digest):
+                first, *copies = by_digest[digest]
+                target = staging / first
+                target.parent.mkdir(parents=True, exist_ok=True)
+                self._download(digest, target)
+                for rel_path in copies:
+                    (staging / rel_path).parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(target, staging / rel_path)
+
+            with ThreadPoolExecutor(max_workers=TRANSFER_JOBS) as pool:
+                list(pool.map(pull, by_digest))
+            for rel_path, info in entry["files"].items():
+                os.chmod(staging / rel_path, info["mode"])
+            for rel_path, target in entry["links"].items():
+                (staging / rel_path).parent.mkdir(parents=True, exist_ok=True)
+                os.symlink(target, staging / rel_path)
+        except (OSError, ValueError) as e:
+            shutil.rmtree(staging, ignore_errors=True)
+            self._error("download", e)
+            self._count("misses")
+            return False
+
+        if destination.is_dir() and not destination.is_symlink():
+            shutil.rmtree(destination)
+        elif destination.exists() or destination.is_symlink():
+            destination.unlink()
+        if entry.get("single"):
+            os.replace(staging / entry["single"], destination)
+            shutil.rmtree(staging)
+        else:
+            os.replace(staging, destination)
+        self._count("hits")
+        size = sum(info["size"] for info in entry["files"].values())
+        print(f"♻️  {label}: restored from build cache ({len(entry['files'])} files, "
+              f"{size / 1024 / 1024:.1f} MB in {time.time() - started:.1f}s)")
+        return True
+
+    def fetch_file(self, key, folder, label):
+        """Restore a cached single-file output into folder under its stored name; returns the path or None"""
+        entry = self._get_entry(key)
+        if entry is None or not entry.get("single"):
+            self._count("misses")
+            return None
+        destination = Path(folder) / entry["single"]
+        return destination if self.fetch_tree(key, destination, label, entry) else None
+
+    def store_tree(self, key, source, label, extra=None):
+        """Upload an output (directory or single file) under key; returns True if stored"""
+        if not self.push:
+            return False
+        source = Path(source)
+        entry = tree_manifest(source)
+        if source.is_file():
+            entry["single"] = source.name
+        entry.update(extra or {})
+        paths = {}
+        for rel_path, info in entry["files"].items():
+            paths.setdefault(info["sha256"], source if source.is_file() else source / rel_path)
+        try:
+            missing = self._missing(paths)
+            with ThreadPoolExecutor(max_workers=TRANSFER_JOBS) as pool:
+                list(pool.map(lambda digest: self._upload(paths[digest], digest), missing))
+            # The entry goes last so nobody sees it before its blobs exist
+            with self._open("PUT", f"/ac/{key}", data=json.dumps(entry).encode(),
+                            headers={"Content-Type": "application/json"}):
+                pass
+        except (OSError, ValueError) as e:
+            self._error("upload", e)
+            return False
+        self._count("stored")
+        uploaded = sum(paths[digest].stat().st_size for digest in missing)
+        print(f"📤 {label}: stored in build cache ({len(missing)} of {len(paths)} blobs uploaded, "
+              f"{uploaded / 1024 / 1024:.1f} MB)")
+        return True
+
+    def print_summary(self):
+        """One line of hit/miss and transfer statistics"""
+        stats = self.stats
+        print(f"\n♻️  Build cache {self.url}: {stats['hits']} hit(s), {stats['misses']} miss(es), "
+              f"{stats['stored']} stored, {stats['pulled'] / 1024 / 1024:.1f} MB pulled, "
+              f"{stats['pushed'] / 1024 / 1024:.1f} MB pushed"
+              + (f", {stats['errors']} error(s)" if stats["errors"] else ""))
+
+
+def open_build_cache(url=None, push=True):
+    """BuildCache for url (or $AKADEMITRACK_BUILD_CACHE), or None when no cache is configured"""
+    url = url or os.environ.get(CACHE_ENV)
+    if not url:
+        return None
+    print(f"♻️  Using build cache at {url}" + ("" if push else " (read-only)"))
+    return BuildCache(url, push)
@@ -0,0 +1,144 @@
+"""Build server reuse across the `dotnet publish` calls of a release session
+
+Modes:
+  default - leave MSBuild node reuse and the compiler server at SDK defaults
+  warm    - keep MSBuild nodes, the MSBuild server and the Roslyn compiler
+            server alive for the whole session and shut them down at the end
+  cold    - disable all build servers so every publish starts from scratch
+            (the baseline to compare warm timings against)
+
+Every publish is timed and the session prints a cold vs warm summary.
+With a shared build cache attached, a publish whose inputs were already
+built (here or on another builder) is restored from the cache instead.
+"""
+import os
+import subprocess
+import threading
+import time
+
+from .runner import CommandResult, run_streaming
+
+BUILD_SERVER_MODES = ["default", "warm", "cold"]
+PUBLISH_TIMEOUT = 45 * 60
+
+
+def shutdown_build_servers():
+    """Stop MSBuild nodes, the compiler server and the Razor server"""
+    try:
+        result = subprocess.run(["dotnet", "build-server", "shutdown"],
+                                capture_output=True, text=True)
+    except FileNotFoundError:
+        return False
+    return result.returncode == 0
+
+
+class BuildServerSession:
+    """Runs publishes with the selected build server mode and records their timings"""
+
+    def __init__(self, mode="default", cache=None):
+        if mode not in BUILD_SERVER_MODES:
+            raise ValueError(f"Unknown build server mode: {mode}")
+        self.mode = mode
+        self.cache = cache
+        self.timings = []
+        self._lock = threading.Lock()
+        self._finished_publishes = 0
+
+    def __enter__(self):
+        if self.mode != "default":
+            # Start from a known state so the first publish really is cold
+            shutdown_build_servers()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.mode == "warm":
+            print("\n🛑 Shutting down build servers...")
+            if shutdown_build_servers():
+                print("✅ Build servers stopped")
+            else:
+                print("⚠️  Could not stop build servers (dotnet build-server shutdown failed)")
+        self.print_summary()
+        if self.cache:
+            self.cache.print_summary()
+        return False
+
+    def publish_args(self):
+        """Extra MSBuild arguments for the current mode"""
+        if self.mode == "warm":
+            return ["-nodeReuse:true", "-p:UseSharedCompilation=true"]
+        if self.mode == "cold":
+            return ["-nodeReuse:false", "-p:UseSharedCompilation=false"]
+        return []
+
+    def publish_env(self):
+        """Environment for a publish in the current mode"""
+        env = os.environ.copy()
+        if self.mode == "warm":
+            env["DOTNET_CLI_USE_MSBUILD_SERVER"] = "1"
+        elif self.mode == "cold":
+            env["DOTNET_CLI_USE_MSBUILD_SERVER"] = "0"
+            env["MSBUILDDISABLENODEREUSE"] = "1"
+        return env
+
+    def run_publish(self, cmd, label):
+        """Run a `dotnet publish` command (or restore its output from the cache) and time it"""
+        output_dir = None
+        if self.cache:
+            flags = [str(part) for part in cmd]
+            output_flag = next((flag for flag in ("-o", "--output") if flag in flags), None)
+            if output_flag:
+                output_dir = flags[flags.index(output_flag) + 1]
+                key = self.cache.publish_key(cmd)
+                started = time.time()
+                if self.cache.fetch_tree(key, output_dir, label):
+                    result = CommandResult(cmd, None, 0)
+                    result.returncode = 0
+                    result.duration = time.time() - started
+                    with self._lock:
+                        self.timings.append({"label": label, "kind": "cached",
+                                             "duration": result.duration, "ok": True})
+                    return result
+
+        # Publishes started side by side (build-release.py) all find the servers cold;
+        # only one that starts after another publish has finished can reuse them
+        with self._lock:
+            if self.mode == "warm":
+                kind = "warm" if self._finished_publishes else "cold"
+            else:
+                kind = self.mode
+
+        result = run_streaming(cmd + self.publish_args(), log_name=f"publish {label}",
+                               timeout=PUBLISH_TIMEOUT, echo=True, prefix=None,
+                               env=self.publish_env())
+        duration = result.duration
+
+        with self._lock:
+            self.timings.append({"label": label, "kind": kind,
+                                 "duration": duration, "ok": result.returncode == 0})
+            self._finished_publishes += 1
+        print(f"⏱️  {label}: {duration:.1f}s ({kind})")
+        if output_dir and result.returncode == 0:
+            self.cache.store_tree(key, output_dir, label)
+        return result
+
+    def print_summary(self):
+        """Print per-publish durations and the cold vs warm averages"""
+        if not self.timings:
+            return
+        print(f"\n⏱️  Publish timings (build servers: {self.mode})")
+        print("=" * 50)
+        for timing in self.timings:
+            status = "✅" if timing["ok"] else "❌"
+            print(f"  {status} {timing['kind']:<8} {timing['duration']:>7.1f}s  {timing['label']}")
+
+        averages = {}
+        for kind in ("cold", "warm"):
+            durations = [t["duration"] for t in self.timings if t["kind"] == kind and t["ok"]]
+            if durations:
+                averages[kind] = sum(durations) / len(durations)
+        if "cold" in averages and "warm" in averages:
+            speedup = averages["cold"] / averages["warm"] if averages["warm"] else 0
+            print(f"  Average cold {averages['cold']:.1f}s / warm {averages['warm']:.1f}s "
+                  f"({speedup:.1f}x faster when warm)")
+        total = sum(t["duration"] for t in self.timings)
+        print(f"  Total publish time: {total:.1f}s")
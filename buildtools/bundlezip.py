@@ -0,0 +1,502 @@
+"""Pure-Python equivalent of `ditto -c -k --keepParent` for .app bundles
+
+The archive matches what ditto writes when extracted:
+
+- directory entries come before their contents;
+- symlinks (Frameworks/*/Versions/Current and friends) are stored as links;
+- Unix modes are kept, so executable bits survive;
+- extended attributes go into AppleDouble `._name` entries next to the
+  file, or under `__MACOSX/` with sequester_rsrc like `--sequesterRsrc`.
+
+Code signature files (_CodeSignature/*, the stapled CodeResources) are
+stored uncompressed, so they are byte-identical inside the archive too.
+Members are deflated on a thread pool (zlib releases the GIL) and written
+in order as they finish, so zipping no longer needs the mac or one core.
+
+describe_archive/describe_tree reduce an archive or a folder to paths,
+types, modes, content hashes and xattrs. compare_descriptions then checks
+our output against a reference made by ditto, ignoring timestamps and
+entry order.
+"""
+import ctypes
+import ctypes.util
+import hashlib
+import io
+import os
+import stat
+import struct
+import sys
+import tempfile
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from buildtools.archives import write_raw_entry
+
+DEFAULT_LEVEL = 6
+CHUNK_SIZE = 1024 * 1024
+# Compressed members above this size are spooled to disk instead of memory
+SPOOL_LIMIT = 32 * 1024 * 1024
+SIGNATURE_DIR = "_CodeSignature"
+SIGNATURE_FILES = {"CodeResources"}
+
+APPLEDOUBLE_MAGIC = 0x00051607
+APPLEDOUBLE_VERSION = 0x00020000
+APPLEDOUBLE_FILLER = b"Mac OS X        "
+ENTRY_RESOURCE_FORK = 2
+ENTRY_FINDER_INFO = 9
+FINDER_INFO_SIZE = 32
+# AppleDouble header + two entries + Finder Info + 2 bytes of padding, then the ATTR header
+ATTR_HEADER_OFFSET = 26 + 2 * 12 + FINDER_INFO_SIZE + 2
+ATTR_ENTRIES_OFFSET = ATTR_HEADER_OFFSET + 36
+FINDER_INFO_XATTR = "com.apple.FinderInfo"
+RESOURCE_FORK_XATTR = "com.apple.ResourceFork"
+# What copyfile writes as the resource fork of a file that has none
+BLANK_RESOURCE_FORK = (struct.pack(">IIII", 0x100, 0x100, 0, 0x1E)
+                       + b"This resource fork intentionally left blank   ".ljust(240, b"\0")
+                       + struct.pack(">IIII", 0x100, 0x100, 0, 0x1E) + bytes(8) + struct.pack(">HHh", 0x1C, 0x1E, -1))
+# Linux keeps foreign attributes in the user namespace
+LINUX_XATTR_PREFIX = "user."
+
+
+# ============================================================================
+# Extended attributes
+# ============================================================================
+
+_libc = None
+
+
+def _mac_libc():
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        _libc.listxattr.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_size_t, ctypes.c_int]
+        _libc.listxattr.restype = ctypes.c_ssize_t
+        _libc.getxattr.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_void_p, ctypes.c_size_t,
+                                   ctypes.c_uint32, ctypes.c_int]
+        _libc.getxattr.restype = ctypes.c_ssize_t
+    return _libc
+
+
+def _mac_xattrs(path):
+    libc = _mac_libc()
+    raw_path = os.fsencode(path)
+    size = libc.listxattr(raw_path, None, 0, 1)  # XATTR_NOFOLLOW
+    if size <= 0:
+        return {}
+    names = ctypes.create_string_buffer(size)
+    size = libc.listxattr(raw_path, names, size, 1)
+    xattrs = {}
+    for name in names.raw[:max(size, 0)].split(b"\0"):
+        if not name:
+            continue
+        length = libc.getxattr(raw_path, name, None, 0, 0, 1)
+        if length < 0:
+            continue
+        value = ctypes.create_string_buffer(max(length, 1))
+        length = libc.getxattr(raw_path, name, value, length, 0, 1)
+        if length >= 0:
+            xattrs[name.decode("utf-8", "surrogateescape")] = value.raw[:length]
+    return xattrs
+
+
+def read_xattrs(path):
+    """Extended attributes of path as {name: bytes} (empty where unsupported)"""
+    try:
+        if sys.platform == "darwin":
+            return _mac_xattrs(path)
+        if not hasattr(os, "listxattr"):
+            return {}
+        return {name[len(LINUX_XATTR_PREFIX):]: os.getxattr(path, name, follow_symlinks=False)
+                for name in os.listxattr(path, follow_symlinks=False) if name.startswith(LINUX_XATTR_PREFIX)}
+    except OSError:
+        return {}
+
+
+def encode_appledouble(xattrs):
+    """AppleDouble file (as copyfile/ditto write it) holding xattrs"""
+    xattrs = dict(xattrs)
+    finder_info = xattrs.pop(FINDER_INFO_XATTR, b"").ljust(FINDER_INFO_SIZE, b"\0")[:FINDER_INFO_SIZE]
+    resource_fork = xattrs.pop(RESOURCE_FORK_XATTR, None) or BLANK_RESOURCE_FORK
+
+    names = sorted(xattrs)
+    entries = b""
+    data = b""
+    data_start = ATTR_ENTRIES_OFFSET + sum((11 + len(name.encode()) + 1 + 3) & ~3 for name in names)
+    for name in names:
+        raw_name = name.encode() + b"\0"
+        entry = struct.pack(">IIHB", data_start + len(data), len(xattrs[name]), 0, len(raw_name)) + raw_name
+        entries += entry.ljust((len(entry) + 3) & ~3, b"\0")
+        data += xattrs[name]
+    total_size = data_start + len(data)
+
+    header = struct.pack(">II16sH", APPLEDOUBLE_MAGIC, APPLEDOUBLE_VERSION, APPLEDOUBLE_FILLER, 2)
+    header += struct.pack(">III", ENTRY_FINDER_INFO, 50, total_size - 50)
+    header += struct.pack(">III", ENTRY_RESOURCE_FORK, total_size, len(resource_fork))
+    header += finder_info + b"\0\0"
+    header += struct.pack(">4sIIII12xHH", b"ATTR", 0, total_size, data_start, len(data), 0, len(names))
+    return header + entries + data + resource_fork
+
+
+def decode_appledouble(data):
+    """xattrs stored in an AppleDouble file, including Finder Info and a non-blank resource fork"""
+    magic, version, _, count = struct.unpack(">II16sH", data[:26])
+    if magic != APPLEDOUBLE_MAGIC:
+        raise ValueError("not an AppleDouble file")
+    xattrs = {}
+    for index in range(count):
+        entry_id, offset, length = struct.unpack(">III", data[26 + index * 12:38 + index * 12])
+        if entry_id == ENTRY_RESOURCE_FORK and length and data[offset:offset + length] != BLANK_RESOURCE_FORK:
+            xattrs[RESOURCE_FORK_XATTR] = data[offset:offset + length]
+        elif entry_id == ENTRY_FINDER_INFO:
+            finder_info = data[offset:offset + FINDER_INFO_SIZE]
+            if finder_info.strip(b"\0"):
+                xattrs[FINDER_INFO_XATTR] = finder_info
+            attr_header = offset + FINDER_INFO_SIZE + 2
+            if length <= FINDER_INFO_SIZE or data[attr_header:attr_header + 4] != b"ATTR":
+                continue
+            num_attrs = struct.unpack(">H", data[attr_header + 34:attr_header + 36])[0]
+            position = attr_header + 36
+            for _ in range(num_attrs):
+                value_offset, value_length, _, name_length = struct.unpack(">IIHB", data[position:position + 11])
+                name = data[position + 11:position + 11 + name_length].rstrip(b"\0").decode("utf-8", "replace")
+                xattrs[name] = data[value_offset:value_offset + value_length]
+                position += (11 + name_length + 3) & ~3
+    return xattrs
+
+
+def appledouble_name(arcname, sequester_rsrc=False):
+    """Archive name of the AppleDouble entry for arcname"""
+    parent, _, name = arcname.rstrip("/").rpartition("/")
+    double = f"{parent}/._{name}" if parent else f"._{name}"
+    return f"__MACOSX/{double}" if sequester_rsrc else double
+
+
+# ============================================================================
+# Writing
+# ============================================================================
+
+def _walk(root):
+    """root and everything below it, each directory before its (sorted) contents"""
+    yield root
+    if root.is_dir() and not root.is_symlink():
+        for child in sorted(root.iterdir(), key=lambda p: p.name):
+            yield from _walk(child)
+
+
+def _zip_info(arcname, mode, mtime, compress_type):
+    info = zipfile.ZipInfo(arcname, time.localtime(max(mtime, 315532800))[:6])  # zip dates start in 1980
+    info.create_system = 3
+    info.create_version = 21
+    info.extract_version = 20
+    info.compress_type = compress_type
+    info.external_attr = (mode & 0xFFFF) << 16
+    if stat.S_ISDIR(mode):
+        info.external_attr |= 0x10  # MS-DOS directory flag
+    return info
+
+
+def _is_signature(arcname):
+    parts = arcname.split("/")
+    return SIGNATURE_DIR in parts[:-1] or parts[-1] in SIGNATURE_FILES
+
+
+def _compress(source, compress_type, level):
+    """(crc, size, spooled member data) for a file path or bytes"""
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_LIMIT)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15) if compress_type == zipfile.ZIP_DEFLATED else None
+    crc = 0
+    size = 0
+    with (open(source, "rb") if isinstance(source, Path) else io.BytesIO(source)) as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            out.write(compressor.compress(chunk) if compressor else chunk)
+    if compressor:
+        out.write(compressor.flush())
+    out.seek(0)
+    return crc, size, out
+
+
+def _members(source, base, include_root, sequester_rsrc, stats):
+    """(ZipInfo, file path or bytes) in archive order; directories have no data"""
+    for path in _walk(source):
+        if path == source and not include_root:
+            continue
+        st = path.lstat()
+        arcname = path.relative_to(base).as_posix()
+        if stat.S_ISLNK(st.st_mode):
+            # The link itself, never what it points to; ditto does not keep xattrs of links
+            stats["links"] += 1
+            yield _zip_info(arcname, st.st_mode, st.st_mtime, zipfile.ZIP_STORED), os.fsencode(os.readlink(path))
+            continue
+        if stat.S_ISDIR(st.st_mode):
+            yield _zip_info(arcname + "/", st.st_mode, st.st_mtime, zipfile.ZIP_STORED), None
+        elif stat.S_ISREG(st.st_mode):
+            compress_type = zipfile.ZIP_STORED if _is_signature(arcname) else zipfile.ZIP_DEFLATED
+            stats["files"] += 1
+            yield _zip_info(arcname, st.st_mode, st.st_mtime, compress_type), path
+        else:
+            continue
+        xattrs = read_xattrs(path)
+        if xattrs:
+            stats["xattr_entries"] += 1
+            info = _zip_info(appledouble_name(arcname, sequester_rsrc), stat.S_IFREG | 0o644, st.st_mtime,
+                             zipfile.ZIP_DEFLATED)
+            yield info, encode_appledouble(xattrs)
+
+
+def ditto_zip(source, destination, keep_parent=True, sequester_rsrc=False, jobs=None, level=DEFAULT_LEVEL):
+    """Zip source like `ditto -c -k [--keepParent] [--sequesterRsrc]`; returns statistics"""
+    source = Path(source)
+    base = source.parent if keep_parent else source
+    jobs = jobs or os.cpu_count() or 1
+    started = time.time()
+    stats = {"entries": 0, "files": 0, "links": 0, "xattr_entries": 0, "bytes_in": 0}
+
+    def write(zout, info, future):
+        if future is None:
+            info.CRC = info.file_size = info.compress_size = 0
+            write_raw_entry(zout, info, io.BytesIO())
+        else:
+            info.CRC, info.file_size, data = future.result()
+            with data:
+                info.compress_size = data.seek(0, os.SEEK_END)
+                data.seek(0)
+                write_raw_entry(zout, info, data)
+        stats["entries"] += 1
+        stats["bytes_in"] += info.file_size
+
+    temp_path = Path(destination).with_name(Path(destination).name + ".partial")
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as pool, zipfile.ZipFile(temp_path, "w") as zout:
+            pending = deque()
+            # A bounded window keeps memory flat while every core compresses
+            for info, data in _members(source, base, keep_parent, sequester_rsrc, stats):
+                future = None if data is None else pool.submit(_compress, data, info.compress_type, level)
+                pending.append((info, future))
+                if len(pending) >= jobs * 4:
+                    write(zout, *pending.popleft())
+            while pending:
+                write(zout, *pending.popleft())
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    os.replace(temp_path, destination)
+    stats["bytes_out"] = Path(destination).stat().st_size
+    stats["seconds"] = time.time() - started
+    return stats
+
+
+# ============================================================================
+# Describing and comparing
+# ============================================================================
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def describe_archive(zip_path):
+    """{path: {"type", "mode", "sha256" | "target", "xattrs"}} for a zip, AppleDouble entries folded in"""
+    entries = {}
+    doubles = {}
+    with zipfile.ZipFile(zip_path) as zf:
+        for info in zf.infolist():
+            name = info.filename
+            path = name.rstrip("/")
+            if name.startswith("__MACOSX/") or Path(path).name.startswith("._"):
+                inner = path[len("__MACOSX/"):] if name.startswith("__MACOSX/") else path
+                parent, _, double = inner.rpartition("/")
+                base = f"{parent}/{double[2:]}" if parent else double[2:]
+                if info.is_dir():
+                    continue
+                doubles[base] = decode_appledouble(zf.read(info))
+                continue
+            mode = info.external_attr >> 16
+            if info.is_dir() or stat.S_ISDIR(mode):
+                entry = {"type": "dir"}
+            elif stat.S_ISLNK(mode):
+                entry = {"type": "link", "target": zf.read(info).decode("utf-8", "surrogateescape")}
+            else:
+                entry = {"type": "file", "sha256": _digest(zf.read(info))}
+            entry["mode"] = stat.S_IMODE(mode) if mode else None
+            entry["xattrs"] = {}
+            entries[path] = entry
+    for base, xattrs in doubles.items():
+        if base in entries:
+            entries[base]["xattrs"] = {name: _digest(value) for name, value in xattrs.items()}
+        else:
+            entries[base] = {"type": "orphan-appledouble", "mode": None, "xattrs": {}}
+    return entries
+
+
+def describe_tree(source, keep_parent=True):
+    """The same description for a folder on disk, as ditto would archive it"""
+    source = Path(source)
+    base = source.parent if keep_parent else source
+    entries = {}
+    for path in _walk(source):
+        if path == source and not keep_parent:
+            continue
+        st = path.lstat()
+        if stat.S_ISDIR(st.st_mode):
+            entry = {"type": "dir"}
+        elif stat.S_ISLNK(st.st_mode):
+            entry = {"type": "link", "target": os.readlink(path)}
+        elif stat.S_ISREG(st.st_mode):
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+            entry = {"type": "file", "sha256": digest.hexdigest()}
+        else:
+            continue
+        entry["mode"] = stat.S_IMODE(st.st_mode)
+        entry["xattrs"] = {} if entry["type"] == "link" else \
+            {name: _digest(value) for name, value in read_xattrs(path).items()}
+        entries[path.relative_to(base).as_posix()] = entry
+    return entries
+
+
+def describe(path, keep_parent=True):
+    """describe_archive for a .zip, describe_tree for a folder"""
+    return describe_tree(path, keep_parent) if Path(path).is_dir() else describe_archive(path)
+
+
+def compare_descriptions(reference, candidate):
+    """Differences between two descriptions as readable lines (empty when equivalent)"""
+    differences = []
+    for path in sorted(set(reference) | set(candidate)):
+        ref = reference.get(path)
+        ours = candidate.get(path)
+        if ref is None:
+            differences.append(f"extra: {path} ({ours['type']})")
+            continue
+        if ours is None:
+            differences.append(f"missing: {path} ({ref['type']})")
+            continue
+        if ref["type"] != ours["type"]:
+            differences.append(f"type: {path} is a {ours['type']}, expected a {ref['type']}")
+            continue
+        if ref["type"] == "file" and ref["sha256"] != ours["sha256"]:
+            differences.append(f"content: {path}")
+        if ref["type"] == "link" and ref["target"] != ours["target"]:
+            differences.append(f"link: {path} -> {ours['target']}, expected {ref['target']}")
+        # Link modes differ between filesystems and mean nothing on extraction
+        if ref["type"] != "link" and None not in (ref["mode"], ours["mode"]) and ref["mode"] != ours["mode"]:
+            differences.append(f"mode: {path} is {ours['mode']:o}, expected {ref['mode']:o}")
+        for name in sorted(set(ref["xattrs"]) | set(ours["xattrs"])):
+            if ref["xattrs"].get(name) != ours["xattrs"].get(name):
+                state = "missing" if name not in ours["xattrs"] else \
+                    "unexpected" if name not in ref["xattrs"] else "different"
+                differences.append(f"xattr: {path} {name} {state}")
+    return differences
+
+
+def print_comparison(differences, reference, candidate):
+    """Report of compare_descriptions; returns True when the two match"""
+    if not differences:
+        print(f"✅ {candidate} matches {reference}")
+        return True
+    print(f"❌ {len(differences)} difference(s) between {candidate} and {reference}:")
+    for line in differences[:40]:
+        print(f"  {line}")
+    if len(differences) > 40:
+        print(f"  ... and {len(differences) - 40} more")
+    return False
+
+
+# ============================================================================
+# Self-test
+# ============================================================================
+
+def _make_sample_bundle(root):
+    """A small .app with a versioned framework, executables, signatures and xattrs"""
+    app = root / "Sample.app"
+    contents = app / "Contents"
+    framework = contents / "Frameworks" / "Sample.framework"
+    (framework / "Versions" / "A" / "Resources").mkdir(parents=True)
+    (contents / "MacOS").mkdir(parents=True)
+    (contents / "_CodeSignature").mkdir()
+    for index in range(48):
+        data = hashlib.sha256(str(index).encode()).digest() * (2048 + index * 97)
+        (contents / "MacOS" / f"lib{index}.dylib").write_bytes(data + bytes(len(data)))
+    executable = contents / "MacOS" / "Sample"
+    executable.write_bytes(b"\xcf\xfa\xed\xfe" + os.urandom(200000))
+    executable.chmod(0o755)
+    (contents / "Info.plist").write_text("<plist><dict/></plist>\n")
+    (contents / "_CodeSignature" / "CodeResources").write_bytes(os.urandom(4096))
+    (contents / "CodeResources").write_bytes(os.urandom(2048))
+    (framework / "Versions" / "A" / "Sample").write_bytes(os.urandom(65536))
+    (framework / "Versions" / "A" / "Resources" / "Info.plist").write_text("<plist/>\n")
+    os.symlink("A", framework / "Versions" / "Current")
+    os.symlink("Versions/Current/Sample", framework / "Sample")
+    os.symlink("Versions/Current/Resources", framework / "Resources")
+    xattrs_set = False
+    try:
+        os.setxattr(executable, LINUX_XATTR_PREFIX + "com.apple.cs.CodeSignature", os.urandom(900))
+        os.setxattr(contents / "Info.plist", LINUX_XATTR_PREFIX + "com.apple.quarantine", b"0083;00000000;Test;")
+        xattrs_set = True
+    except (AttributeError, OSError):
+        pass
+    return app, xattrs_set
+
+
+def run_selftest(jobs=None):
+    """Archive a synthetic bundle and check it against the tree, unzip and (on macOS) ditto"""
+    import shutil
+    import subprocess
+
+    print("🧪 Bundle archiver self-test")
+    ok = True
+
+    def check(passed, message):
+        nonlocal ok
+        ok = ok and passed
+        print(f"  {'✅' if passed else '❌'} {message}")
+
+    with tempfile.TemporaryDirectory(prefix="akademitrack-bundlezip-", dir=".") as temp:
+        root = Path(temp)
+        app, xattrs_set = _make_sample_bundle(root)
+        expected = describe_tree(app)
+
+        serial = ditto_zip(app, root / "serial.zip", jobs=1)
+        stats = ditto_zip(app, root / "parallel.zip", jobs=jobs)
+        check((root / "serial.zip").read_bytes() == (root / "parallel.zip").read_bytes(),
+              f"Parallel output identical to serial ({serial['seconds']:.2f}s on 1 thread, "
+              f"{stats['seconds']:.2f}s on {jobs or os.cpu_count()})")
+
+        for sequester in (False, True):
+            archive = root / f"sample-{sequester}.zip"
+            ditto_zip(app, archive, sequester_rsrc=sequester, jobs=jobs)
+            differences = compare_descriptions(expected, describe_archive(archive))
+            check(not differences, f"Archive matches the bundle ({'__MACOSX' if sequester else 'inline ._'} "
+                                   f"xattrs): {len(expected)} entries" + "".join(f"\n      {d}" for d in differences[:5]))
+        if not xattrs_set:
+            print("  ⚠️  This filesystem has no user xattrs, extended attributes were not exercised")
+
+        with zipfile.ZipFile(root / "sample-False.zip") as zf:
+            stored = [info.filename for info in zf.infolist()
+                      if _is_signature(info.filename) and info.compress_type != zipfile.ZIP_STORED]
+            check(zf.testzip() is None and not stored, "CRCs valid, signature files stored byte-exact")
+
+        if shutil.which("unzip"):
+            extracted = root / "unzip"
+            result = subprocess.run(["unzip", "-q", str(root / "sample-False.zip"), "-x", "*/._*", "-d",
+                                     str(extracted)], capture_output=True, text=True)
+            differences = compare_descriptions(
+                {path: dict(entry, xattrs={}) for path, entry in expected.items()},
+                {path: dict(entry, xattrs={}) for path, entry in describe_tree(extracted / app.name).items()})
+            check(result.returncode == 0 and not differences,
+                  "unzip restores symlinks, modes and contents" + "".join(f"\n      {d}" for d in differences[:5]))
+
+        if shutil.which("ditto"):
+            reference = root / "ditto.zip"
+            subprocess.run(["ditto", "-c", "-k", "--keepParent", str(app), str(reference)], check=True)
+            print_comparison(compare_descriptions(describe_archive(reference),
+                                                  describe_archive(root / "sample-False.zip")),
+                             "ditto", "Python archive") or check(False, "Matches ditto")
+    return ok
@@ -0,0 +1,312 @@
+"""Reference build cache server and its self-test
+
+A threaded HTTP store for buildcache.py:
+
+    GET/HEAD/PUT /cas/<sha256>   content-addressed blobs; a PUT whose body does
+                                 not hash to the name is rejected
+    POST /cas/missing            JSON list of digests -> the ones not stored
+    GET/HEAD/PUT /ac/<key>       JSON entries describing an output
+    GET /stats                   counters and store size
+
+Uploads are streamed into a temporary file and renamed into place, so
+readers never see partial blobs and concurrent PUTs of the same blob are
+harmless. The store is kept under a size limit by evicting the least
+recently used blobs and entries (order restored from file mtimes on
+startup, refreshed on every read).
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024 * 1024
+MAX_ENTRY_BYTES = 16 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+OBJECT_PATH = re.compile(r"^/(cas|ac)/([0-9a-f]{64})$")
+
+
+class CacheStore:
+    """Blob and entry files on disk with LRU eviction above max_bytes"""
+
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.temp_dir = self.root / "tmp"
+        self.lru = OrderedDict()
+        self.total = 0
+        self.stats = {"get_hits": 0, "get_misses": 0, "puts": 0, "rejected": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if self.temp_dir.exists():
+            shutil.rmtree(self.temp_dir)
+        self.temp_dir.mkdir(parents=True)
+        found = []
+        for kind in ("cas", "ac"):
+            for path in (self.root / kind).rglob("*"):
+                if path.is_file():
+                    stat = path.stat()
+                    found.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(found):
+            self.lru[path] = size
+            self.total += size
+        self._evict()
+
+    def path_for(self, kind, name):
+        # Blobs are fanned out by prefix so no directory grows too large
+        return self.root / kind / name[:2] / name if kind == "cas" else self.root / kind / name
+
+    def open(self, kind, name):
+        """Open a stored object for reading and mark it recently used; (file, size) or None"""
+        path = self.path_for(kind, name)
+        with self._lock:
+            if path not in self.lru:
+                self.stats["get_misses"] += 1
+                return None
+            self.lru.move_to_end(path)
+            self.stats["get_hits"] += 1
+            # An open file stays readable even if it is evicted mid-response
+            f = open(path, "rb")
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return f, os.fstat(f.fileno()).st_size
+
+    def contains(self, kind, name):
+        with self._lock:
+            return self.path_for(kind, name) in self.lru
+
+    def new_temp(self):
+        return tempfile.NamedTemporaryFile(dir=self.temp_dir, delete=False)
+
+    def commit(self, kind, name, temp_path):
+        """Move a completed upload into place and evict down to the size limit"""
+        path = self.path_for(kind, name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        size = Path(temp_path).stat().st_size
+        with self._lock:
+            os.replace(temp_path, path)
+            self.total += size - self.lru.pop(path, 0)
+            self.lru[path] = size
+            self.stats["puts"] += 1
+            self._evict()
+
+    def _evict(self):
+        while self.total > self.max_bytes and self.lru:
+            path, size = self.lru.popitem(last=False)
+            self.total -= size
+            self.stats["evicted"] += 1
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def reject(self):
+        with self._lock:
+            self.stats["rejected"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, objects=len(self.lru), bytes=self.total, max_bytes=self.max_bytes)
+
+
+class CacheRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end for a CacheStore (set as the server's `store` attribute)"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body=b"", content_type="application/octet-stream"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _json(self, status, value):
+        self._reply(status, json.dumps(value).encode(), "application/json")
+
+    def _drain(self):
+        # Keep the connection usable after rejecting a request body
+        remaining = int(self.headers.get("Content-Length") or 0)
+        while remaining > 0:
+            chunk = self.rfile.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+
+    def do_GET(self):
+        store = self.server.store
+        if self.path == "/stats":
+            self._json(200, store.snapshot())
+            return
+        match = OBJECT_PATH.match(self.path)
+        if not match:
+            self._reply(404)
+            return
+        opened = store.open(*match.groups())
+        if opened is None:
+            self._reply(404)
+            return
+        f, size = opened
+        with f:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json" if match.group(1) == "ac"
+                             else "application/octet-stream")
+            self.send_header("Content-Length", str(size))
+            self.end_headers()
+            if self.command != "HEAD":
+                shutil.copyfileobj(f, self.wfile, CHUNK_SIZE)
+
+    do_HEAD = do_GET
+
+    def do_PUT(self):
+        store = self.server.store
+        match = OBJECT_PATH.match(self.path)
+        length = self.headers.get("Content-Length")
+        if not match or length is None:
+            self._drain()
+            self._reply(404 if not match else 411)
+            return
+        kind, name = match.groups()
+        length = int(length)
+        if kind == "ac" and length > MAX_ENTRY_BYTES:
+            self._drain()
+            self._reply(413)
+            return
+
+        hasher = hashlib.sha256()
+        with store.new_temp() as temp:
+            remaining = length
+            while remaining > 0:
+                chunk = self.rfile.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                temp.write(chunk)
+                remaining -= len(chunk)
+        problem = None
+        if remaining:
+            problem = "truncated upload"
+        elif kind == "cas" and hasher.hexdigest() != name:
+            problem = f"content hashes to {hasher.hexdigest()}"
+        elif kind == "ac":
+            try:
+                json.loads(Path(temp.name).read_bytes())
+            except ValueError:
+                problem = "entry is not valid JSON"
+        if problem:
+            os.unlink(temp.name)
+            store.reject()
+            self._reply(400, problem.encode(), "text/plain")
+            return
+        store.commit(kind, name, temp.name)
+        self._reply(201)
+
+    def do_POST(self):
+        store = self.server.store
+        if self.path != "/cas/missing":
+            self._drain()
+            self._reply(404)
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            digests = json.loads(self.rfile.read(length))
+        except ValueError:
+            self._reply(400, b"expected a JSON list", "text/plain")
+            return
+        self._json(200, [d for d in digests if not OBJECT_PATH.match(f"/cas/{d}") or not store.contains("cas", d)])
+
+
+class CacheHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 resets connections when a whole build farm uploads at once
+    request_queue_size = 256
+
+
+def start_cache_server(root, host="127.0.0.1", port=0, max_bytes=DEFAULT_MAX_BYTES):
+    """Start a cache server in a background thread; returns (server, url)"""
+    server = CacheHTTPServer((host, port), CacheRequestHandler)
+    server.store = CacheStore(root, max_bytes)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def run_selftest(workers=16, blobs=200, max_blob_kb=512):
+    """Concurrent PUT/GET, integrity rejection and LRU eviction against a throwaway server"""
+    print(f"🧪 Cache server self-test ({workers} workers, {blobs} blobs)")
+    ok = True
+    with tempfile.TemporaryDirectory(prefix="akademitrack-cache-") as root:
+        limit = blobs * max_blob_kb * 1024 // 4
+        server, url = start_cache_server(root, max_bytes=limit)
+        rng = random.Random(1)
+        payloads = [rng.randbytes(rng.randint(1, max_blob_kb * 1024)) for _ in range(blobs)]
+
+        def request(method, path, data=None):
+            req = urllib.request.Request(f"{url}{path}", data=data, method=method)
+            try:
+                with urllib.request.urlopen(req, timeout=30) as response:
+                    return response.status, response.read()
+            except urllib.error.HTTPError as e:
+                return e.code, e.read()
+
+        def roundtrip(payload):
+            digest = hashlib.sha256(payload).hexdigest()
+            status, _ = request("PUT", f"/cas/{digest}", payload)
+            if status != 201:
+                return f"PUT {digest[:12]} -> {status}"
+            status, body = request("GET", f"/cas/{digest}")
+            # A 404 is fine: another worker's upload may have evicted it already
+            if status == 200 and hashlib.sha256(body).hexdigest() != digest:
+                return f"GET {digest[:12]} returned corrupt data"
+            if status not in (200, 404):
+                return f"GET {digest[:12]} -> {status}"
+            return None
+
+        started = time.time()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # Every blob twice, so identical concurrent uploads are exercised too
+            failures = [error for error in pool.map(roundtrip, payloads + payloads) if error]
+        elapsed = time.time() - started
+        moved = 4 * sum(map(len, payloads))  # each payload uploaded and downloaded twice
+        for error in failures[:5]:
+            print(f"  ❌ {error}")
+        ok = ok and not failures
+        print(f"  {'✅' if not failures else '❌'} {2 * blobs} concurrent PUT+GET round trips in {elapsed:.2f}s "
+              f"({moved / 1024 / 1024 / elapsed:.0f} MB/s)")
+
+        status, _ = request("PUT", f"/cas/{'0' * 64}", b"not the right content")
+        rejected = status == 400
+        ok = ok and rejected
+        print(f"  {'✅' if rejected else '❌'} Upload with a wrong hash rejected ({status})")
+
+        stats = json.loads(request("GET", "/stats")[1])
+        within = stats["bytes"] <= limit and stats["evicted"] > 0
+        ok = ok and within
+        print(f"  {'✅' if within else '❌'} LRU kept the store at {stats['bytes'] / 1024 / 1024:.1f} MB "
+              f"of {limit / 1024 / 1024:.1f} MB ({stats['evicted']} evicted)")
+
+        newest = payloads[-1]
+        status, body = request("GET", f"/cas/{hashlib.sha256(newest).hexdigest()}")
+        recent = status == 200 and body == newest
+        ok = ok and recent
+        print(f"  {'✅' if recent else '❌'} Most recently used blob still served")
+        server.shutdown()
+        server.server_close()
+    return ok
@@ -0,0 +1,170 @@
+"""Validate Changelogs/*.json and compile them into one bundled index
+
+Runs before any publish so a broken changelog stops the release in seconds.
+EXAMPLE* files are skipped (the .csproj already keeps them out of the
+output), referenced images must exist under the project, and the result is
+written as a minified Changelogs/index.json, newest version first, which
+ChangelogService reads instead of the individual files.
+"""
+import datetime
+import json
+import os
+import re
+from pathlib import Path
+
+CHANGELOG_DIR = Path("./Changelogs")
+CHANGELOG_INDEX_NAME = "index.json"
+INDEX_FORMAT = 1
+
+VERSION_PATTERN = re.compile(r"^\d+\.\d+\.\d+$")
+DATE_PATTERN = re.compile(r"^(\d{4})-(\d{1,2})-(\d{1,2})$")
+ENTRY_FIELDS = {
+    "version": (str, True),
+    "title": (str, True),
+    "releaseDate": (str, True),
+    "headerImage": (str, False),
+    "description": (str, False),
+    "changes": (list, True),
+}
+CATEGORY_FIELDS = {
+    "category": (str, True),
+    "icon": (str, False),
+    "image": (str, False),
+    "items": (list, True),
+}
+
+
+def _check_fields(value, fields, where, errors):
+    """Type/required/unknown-key checks for one JSON object"""
+    if not isinstance(value, dict):
+        errors.append(f"{where}: expected an object")
+        return False
+    for key in value:
+        if key not in fields:
+            errors.append(f"{where}: unknown field '{key}'")
+    for key, (expected, required) in fields.items():
+        if key not in value:
+            if required:
+                errors.append(f"{where}: missing required field '{key}'")
+        elif not isinstance(value[key], expected):
+            errors.append(f"{where}: '{key}' must be a {expected.__name__}")
+        elif expected is str and not value[key].strip():
+            errors.append(f"{where}: '{key}' is empty")
+    return True
+
+
+def resolve_image(reference, project_dir):
+    """Map an image reference like /Assets/x.png to its bundle path, or None if missing"""
+    relative = reference.lstrip("/")
+    if (project_dir / relative).is_file():
+        return relative
+    if (project_dir / CHANGELOG_DIR.name / relative).is_file():
+        return f"{CHANGELOG_DIR.name}/{relative}"
+    return None
+
+
+def validate_changelog(path, data, project_dir):
+    """Return (normalized entry, errors) for one changelog file"""
+    errors = []
+    if not _check_fields(data, ENTRY_FIELDS, path.name, errors):
+        return None, errors
+
+    version = data.get("version")
+    if isinstance(version, str):
+        if not VERSION_PATTERN.match(version):
+            errors.append(f"{path.name}: version '{version}' is not X.Y.Z")
+        elif path.stem != version:
+            errors.append(f"{path.name}: file name does not match version {version}")
+
+    entry = dict(data)
+    release_date = data.get("releaseDate")
+    if isinstance(release_date, str):
+        # Older entries use unpadded days (2026-02-8); the index gets the padded form
+        match = DATE_PATTERN.match(release_date)
+        try:
+            entry["releaseDate"] = datetime.date(*map(int, match.groups())).isoformat()
+        except (AttributeError, ValueError):
+            errors.append(f"{path.name}: releaseDate '{release_date}' is not YYYY-MM-DD")
+    if isinstance(data.get("headerImage"), str):
+        resolved = resolve_image(data["headerImage"], project_dir)
+        if resolved is None:
+            errors.append(f"{path.name}: headerImage not found: {data['headerImage']}")
+        entry["headerImage"] = "/" + resolved if resolved else None
+
+    changes = data.get("changes")
+    if isinstance(changes, list):
+        if not changes:
+            errors.append(f"{path.name}: 'changes' is empty")
+        entry["changes"] = []
+        for i, category in enumerate(changes):
+            where = f"{path.name}: changes[{i}]"
+            if not _check_fields(category, CATEGORY_FIELDS, where, errors):
+                continue
+            category = dict(category)
+            items = category.get("items")
+            if isinstance(items, list):
+                if not items:
+                    errors.append(f"{where}: 'items' is empty")
+                if not all(isinstance(item, str) and item.strip() for item in items):
+                    errors.append(f"{where}: every item must be a non-empty string")
+            if isinstance(category.get("image"), str):
+                resolved = resolve_image(category["image"], project_dir)
+                if resolved is None:
+                    errors.append(f"{where}: image not found: {category['image']}")
+                category["image"] = "/" + resolved if resolved else None
+            entry["changes"].append(category)
+    return entry, errors
+
+
+def compile_changelogs(version=None, changelog_dir=CHANGELOG_DIR):
+    """Validate every changelog and write the index; returns False on any error"""
+    print("\n📝 Compiling changelogs...")
+    changelog_dir = Path(changelog_dir)
+    project_dir = changelog_dir.parent
+    if not changelog_dir.is_dir():
+        print(f"⚠️  No {changelog_dir}/ folder, skipping")
+        return True
+
+    entries = {}
+    errors = []
+    skipped = 0
+    for path in sorted(changelog_dir.glob("*.json")):
+        if path.name == CHANGELOG_INDEX_NAME:
+            continue
+        if path.name.startswith("EXAMPLE"):
+            skipped += 1
+            continue
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except ValueError as e:
+            errors.append(f"{path.name}: invalid JSON ({e})")
+            continue
+        entry, file_errors = validate_changelog(path, data, project_dir)
+        errors += file_errors
+        if entry and not file_errors:
+            if entry["version"] in entries:
+                errors.append(f"{path.name}: duplicate changelog for {entry['version']}")
+            entries[entry["version"]] = {key: value for key, value in entry.items() if value is not None}
+
+    if errors:
+        print(f"❌ Changelog validation failed ({len(errors)} problem(s)):")
+        for error in errors:
+            print(f"  • {error}")
+        return False
+
+    versions = sorted(entries, key=lambda v: tuple(int(part) for part in v.split(".")), reverse=True)
+    index = {"format": INDEX_FORMAT, "versions": versions, "entries": {v: entries[v] for v in versions}}
+    content = json.dumps(index, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    index_path = changelog_dir / CHANGELOG_INDEX_NAME
+    # Leave an identical index untouched so PreserveNewest does not recopy it
+    if not index_path.exists() or index_path.read_bytes() != content:
+        temp_path = index_path.with_name(index_path.name + ".tmp")
+        temp_path.write_bytes(content)
+        os.replace(temp_path, index_path)
+
+    print(f"✅ {len(versions)} changelog(s) compiled into {index_path} "
+          f"({len(content) / 1024:.1f} KB, {skipped} example(s) skipped)")
+    if version and version not in entries:
+        print(f"⚠️  No changelog for v{version}; users will not see release notes for it")
+    return True
@@ -0,0 +1,163 @@
+"""Stage checkpoints so a failed release build can resume where it stopped
+
+After each completed stage a marker is written to
+.buildcache/checkpoints/<pipeline>-v<version>/<stage>.json with the hashes
+of every output produced so far. Hashes are cumulative, so stages that
+modify earlier outputs in place (signing, stapling) are handled. With
+--resume, the newest marker whose recorded outputs still match the disk
+becomes the resume point, and every stage up to it is skipped.
+"""
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+from .common import CACHE_DIR, file_sha256
+
+CHECKPOINT_DIR = CACHE_DIR / "checkpoints"
+
+
+class StageCheckpoints:
+    """Checkpoint markers for one pipeline (e.g. "mac") and version"""
+
+    def __init__(self, pipeline, version, stages, options=None, resume=False, enabled=True):
+        self.stages = list(stages)
+        self.enabled = enabled
+        self.directory = CHECKPOINT_DIR / f"{pipeline}-v{version}"
+        self.options = options or {}
+        self.markers = {}
+        self.tracked = []
+        self.resume_point = None
+        self._hash_cache = {}
+
+        if not enabled:
+            return
+        if resume:
+            self._load_resume_point()
+        elif self.directory.exists():
+            shutil.rmtree(self.directory)
+
+    @classmethod
+    def disabled(cls):
+        """Checkpoints that never skip and never write markers"""
+        return cls("disabled", "0", [], enabled=False)
+
+    @property
+    def resuming(self):
+        return self.resume_point is not None
+
+    def _marker_path(self, stage):
+        return self.directory / f"{stage}.json"
+
+    def _hash_path(self, path):
+        """Hash one file, reusing the result while size and mtime are unchanged"""
+        stat = os.lstat(path)
+        key = (str(path), stat.st_size, stat.st_mtime_ns)
+        if key not in self._hash_cache:
+            if os.path.islink(path):
+                self._hash_cache[key] = "link:" + os.readlink(path)
+            else:
+                self._hash_cache[key] = file_sha256(path)
+        return self._hash_cache[key]
+
+    def hash_outputs(self, paths):
+        """Map every file under the given paths to its hash"""
+        hashes = {}
+        for root in paths:
+            root = Path(root)
+            if root.is_symlink() or root.is_file():
+                hashes[str(root)] = self._hash_path(root)
+            elif root.is_dir():
+                for dirpath, dirnames, filenames in os.walk(root):
+                    for name in sorted(filenames + [d for d in dirnames
+                                                    if os.path.islink(os.path.join(dirpath, d))]):
+                        path = os.path.join(dirpath, name)
+                        hashes[path] = self._hash_path(path)
+        return hashes
+
+    def _load_resume_point(self):
+        """Find the newest stage whose recorded outputs still match what is on disk"""
+        if not self.directory.exists():
+            print("ℹ️  No checkpoints found - starting from the beginning")
+            return
+
+        for stage in self.stages:
+            try:
+                with open(self._marker_path(stage)) as f:
+                    self.markers[stage] = json.load(f)
+            except (OSError, ValueError):
+                continue
+
+        for stage in reversed(self.stages):
+            marker = self.markers.get(stage)
+            if not marker:
+                continue
+            if marker.get("options") != self.options:
+                print(f"⚠️  Checkpoint '{stage}' was made with different options - ignoring it")
+                continue
+            try:
+                current = self.hash_outputs(marker["tracked"])
+            except OSError:
+                current = None
+            if current == marker["outputs"]:
+                self.resume_point = stage
+                self.tracked = list(marker["tracked"])
+                print(f"♻️  Resuming after stage '{stage}' (outputs verified, "
+                      f"{len(current)} files)")
+                return
+            print(f"⚠️  Checkpoint '{stage}' no longer matches its outputs")
+
+        print("ℹ️  No valid checkpoint - starting from the beginning")
+
+    def rewind(self, stage):
+        """Forget this stage and every later one, then resume after the newest stage still valid"""
+        for later in self.stages[self.stages.index(stage):]:
+            if self._marker_path(later).exists():
+                self._marker_path(later).unlink()
+        self.markers = {}
+        self.tracked = []
+        self.resume_point = None
+        # Hashes are cached by size and mtime, so re-verifying unchanged outputs is cheap
+        self._load_resume_point()
+
+    def should_skip(self, stage):
+        """True when resuming and this stage already completed before the resume point"""
+        if not self.enabled or self.resume_point is None or stage not in self.markers:
+            return False
+        if self.stages.index(stage) > self.stages.index(self.resume_point):
+            return False
+        print(f"⏭️  Skipping '{stage}' (checkpoint from {self.markers[stage]['completed_at']})")
+        return True
+
+    def extra(self, stage, key, default=None):
+        """Return a value saved with a stage's marker (e.g. the path it produced)"""
+        return self.markers.get(stage, {}).get("extra", {}).get(key, default)
+
+    def complete(self, stage, outputs=(), **extra):
+        """Record a finished stage together with the hashes of all outputs so far"""
+        if not self.enabled:
+            return
+        for path in outputs:
+            if str(path) not in self.tracked:
+                self.tracked.append(str(path))
+
+        marker = {
+            "stage": stage,
+            "options": self.options,
+            "tracked": self.tracked,
+            "outputs": self.hash_outputs(self.tracked),
+            "extra": {key: str(value) if isinstance(value, Path) else value
+                      for key, value in extra.items()},
+            "completed_at": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self._marker_path(stage), "w") as f:
+            json.dump(marker, f, indent=2)
+        self.markers[stage] = marker
+
+        # Markers of later stages describe a state that no longer exists
+        for later in self.stages[self.stages.index(stage) + 1:]:
+            self.markers.pop(later, None)
+            if self._marker_path(later).exists():
+                self._marker_path(later).unlink()
@@ -0,0 +1,525 @@
+"""Content-defined chunk store for release distribution
+
+Every file of every Releases/v*/ folder is split at content-defined
+boundaries: a gear rolling hash over the last 64 bytes, with chunks of
+16 KiB to 256 KiB (about 80 KiB on average). An insertion early in a file
+therefore only changes the chunks around it, not every block after it.
+Chunks are stored once under Releases/chunks/objects/ by SHA-256, and each
+release gets an index (Releases/chunks/releases/<version>.json) listing
+the chunks of each of its files.
+
+Chunking compressed data only dedupes where the compressor restarts:
+a change early in a compressed stream alters every byte after it. Zip
+archives (.zip, .nupkg) compress each member on its own, so they are
+chunked member by member over the compressed data and rebuilt from their
+recorded headers with write_raw_entry; unchanged members then dedupe
+whatever moved around them. Single-stream archives (.tar.gz, .tar.zst,
+...) are stored as they are but do not dedupe, so the report leaves them
+out of the dedupe ratio and lists them as whole downloads.
+
+A client holding any earlier release, or a partial download, rebuilds a
+release from the chunks it already has and fetches only the rest. It
+fetches from the store folder or over HTTP, and unlike the pairwise deltas
+it works from whichever version the client is on. Chunking is pure Python
+(a few MB/s per core), so files are spread over a process pool, and a file
+whose hash is already indexed is never chunked again.
+"""
+import hashlib
+import io
+import json
+import mmap
+import os
+import random
+import time
+import urllib.request
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from buildtools.archives import seek_raw_entry, write_raw_entry, zip_member_header, zipinfo_from_header
+from buildtools.common import file_sha256
+from buildtools.feed import scan_releases, version_key
+
+CHUNK_STORE_NAME = "chunks"
+OBJECTS_DIR_NAME = "objects"
+INDEX_DIR_NAME = "releases"
+# Bump when the boundaries or layouts change (gear table, sizes, mask): old indexes then get rebuilt
+INDEX_FORMAT = 2
+ZIP_SUFFIXES = (".zip", ".nupkg")
+# One compressed stream each: chunked and stored, but they do not dedupe
+STREAM_SUFFIXES = (".gz", ".tgz", ".xz", ".zst", ".bz2")
+LAYOUT_KEYS = ("layout", "chunks", "members", "comment")
+
+MIN_CHUNK = 16 * 1024
+MAX_CHUNK = 256 * 1024
+# Top 16 bits of the 64-bit gear hash: one boundary per ~64 KiB after the minimum
+BOUNDARY_MASK = 0xFFFF << 48
+_gear_random = random.Random(0x41545243)
+GEAR = [_gear_random.getrandbits(64) for _ in range(256)]
+HASH_MASK = (1 << 64) - 1
+
+
+def chunk_boundaries(data):
+    """Yield the end offset of every chunk of data (bytes or mmap)"""
+    size = len(data)
+    start = 0
+    gear = GEAR
+    while start < size:
+        end = min(start + MAX_CHUNK, size)
+        position = start + MIN_CHUNK
+        if position < end:
+            h = 0
+            for byte in data[position:end]:
+                h = ((h << 1) + gear[byte]) & HASH_MASK
+                position += 1
+                if not h & BOUNDARY_MASK:
+                    end = position
+                    break
+        yield end
+        start = end
+
+
+def object_path(objects_dir, digest):
+    return Path(objects_dir) / digest[:2] / digest
+
+
+def _write_object(objects_dir, digest, data):
+    """Store one chunk unless it is already there; returns True when written"""
+    path = object_path(objects_dir, digest)
+    if path.exists():
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f".{digest}.{os.getpid()}.tmp")
+    temp_path.write_bytes(data)
+    os.replace(temp_path, path)
+    return True
+
+
+def _chunk_data(data, objects_dir, result):
+    """Chunk data (bytes or mmap), storing new chunks; returns [[digest, size], ...]"""
+    chunks = []
+    start = 0
+    for end in chunk_boundaries(data):
+        chunk = data[start:end]
+        digest = hashlib.sha256(chunk).hexdigest()
+        chunks.append([digest, end - start])
+        if objects_dir is not None and _write_object(objects_dir, digest, chunk):
+            result["new_chunks"] += 1
+            result["new_bytes"] += end - start
+        start = end
+    return chunks
+
+
+class _HashingWriter:
+    """Write-only file object that hashes what is written"""
+
+    def __init__(self):
+        self.digest = hashlib.sha256()
+        self.position = 0
+
+    def write(self, data):
+        self.digest.update(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+
+class _ChunkReader:
+    """File object reading through an iterator of chunks, for write_raw_entry"""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buffer = bytearray()
+
+    def read(self, size):
+        while len(self.buffer) < size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.buffer += chunk
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+
+def _write_zip(fp, members, comment, open_member):
+    """Write a zip from recorded member headers, taking each member's compressed data from open_member"""
+    with zipfile.ZipFile(fp, "w") as out:
+        for member in members:
+            write_raw_entry(out, zipinfo_from_header(member["name"], member["header"]), open_member(member))
+        out.comment = comment
+
+
+def _zip_layout(f, data, sha256):
+    """(members, comment) of a zip that can be rebuilt byte-identically from its headers, else None"""
+    try:
+        with zipfile.ZipFile(f) as archive:
+            infos = archive.infolist()
+            comment = archive.comment
+    except (zipfile.BadZipFile, EOFError, OSError, ValueError):
+        return None
+    members = []
+    for info in infos:
+        seek_raw_entry(f, info)
+        members.append({"name": info.filename, "header": zip_member_header(info), "offset": f.tell()})
+    # Data descriptors, gaps or unusual headers would not come back the same
+    check = _HashingWriter()
+    _write_zip(check, members, comment,
+               lambda member: io.BytesIO(data[member["offset"]:member["offset"] + member["header"]["compress_size"]]))
+    return (members, comment) if check.digest.hexdigest() == sha256 else None
+
+
+def file_segments(entry):
+    """(offset, chunks) runs of a file: the whole file, or the compressed data of each zip member"""
+    if entry["layout"] == "zip":
+        return [(member["offset"], member["chunks"]) for member in entry["members"]]
+    return [(0, entry["chunks"])]
+
+
+def chunk_file(path, objects_dir=None):
+    """Split one file into chunks, storing new ones in objects_dir (runs in a worker process)"""
+    started = time.time()
+    path = Path(path)
+    layout = "stream" if path.name.lower().endswith(STREAM_SUFFIXES) else "plain"
+    result = {"sha256": None, "size": 0, "layout": layout, "chunks": [], "new_chunks": 0, "new_bytes": 0}
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            result["sha256"] = hashlib.sha256().hexdigest()
+            return result
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            result["sha256"] = hashlib.sha256(data).hexdigest()
+            zip_layout = _zip_layout(f, data, result["sha256"]) if path.suffix.lower() in ZIP_SUFFIXES else None
+            if zip_layout:
+                members, comment = zip_layout
+                for member in members:
+                    start = member["offset"]
+                    member["chunks"] = _chunk_data(data[start:start + member["header"]["compress_size"]],
+                                                   objects_dir, result)
+                del result["chunks"]
+                result.update(layout="zip", members=members, comment=comment.hex())
+            else:
+                result["chunks"] = _chunk_data(data, objects_dir, result)
+    result["size"] = size
+    result["seconds"] = time.time() - started
+    return result
+
+
+def index_path(store_dir, version):
+    return Path(store_dir) / INDEX_DIR_NAME / f"{version}.json"
+
+
+def load_index(store_dir, version):
+    """A release's chunk index, or None when it is missing or from an older format"""
+    try:
+        index = json.loads(index_path(store_dir, version).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return index if index.get("format") == INDEX_FORMAT else None
+
+
+def load_all_indexes(store_dir):
+    """{version: index} for every indexed release, oldest first"""
+    indexes = {}
+    for path in (Path(store_dir) / INDEX_DIR_NAME).glob("*.json"):
+        index = load_index(store_dir, path.stem)
+        if index:
+            indexes[path.stem] = index
+    return dict(sorted(indexes.items(), key=lambda item: version_key(item[0])))
+
+
+def chunk_releases(releases_dir, versions=None, jobs=None):
+    """Chunk every release folder (or just `versions`) into the store; returns {version: index}
+
+    Files whose size and mtime match the existing index are kept as they
+    are, and files whose hash is already indexed anywhere reuse that chunk
+    list, so only new artifacts are chunked.
+    """
+    releases_dir = Path(releases_dir)
+    store_dir = releases_dir / CHUNK_STORE_NAME
+    objects_dir = store_dir / OBJECTS_DIR_NAME
+    releases = scan_releases(releases_dir)
+    if versions:
+        missing = [v for v in versions if v not in releases]
+        if missing:
+            print(f"❌ Release folder(s) not found: {', '.join(f'v{v}' for v in missing)}")
+            return None
+        releases = {v: releases[v] for v in versions}
+    if not releases:
+        print(f"❌ No release folders found in {releases_dir}/")
+        return None
+
+    existing = load_all_indexes(store_dir)
+    known = {entry["sha256"]: {key: entry[key] for key in LAYOUT_KEYS if key in entry}
+             for index in existing.values() for entry in index["files"].values()}
+    started = time.time()
+    print(f"🧩 Chunking {len(releases)} release(s) into {store_dir}/...")
+    indexes = {}
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        for version, folder in releases.items():
+            previous = existing.get(version, {"files": {}})["files"]
+            files = {}
+            pending = {}
+            for path in sorted(folder.rglob("*")):
+                if not path.is_file():
+                    continue
+                rel_path = path.relative_to(folder).as_posix()
+                stat = path.stat()
+                entry = previous.get(rel_path)
+                if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                    files[rel_path] = entry
+                    continue
+                digest = file_sha256(path)
+                if digest in known:
+                    files[rel_path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                                       "sha256": digest, **known[digest]}
+                    continue
+                pending[rel_path] = (stat, pool.submit(chunk_file, path, objects_dir))
+
+            new_chunks = new_bytes = chunked_bytes = 0
+            for rel_path, (stat, future) in pending.items():
+                result = future.result()
+                layout = {key: result[key] for key in LAYOUT_KEYS if key in result}
+                files[rel_path] = {"size": result["size"], "mtime_ns": stat.st_mtime_ns,
+                                   "sha256": result["sha256"], **layout}
+                known[result["sha256"]] = layout
+                new_chunks += result["new_chunks"]
+                new_bytes += result["new_bytes"]
+                chunked_bytes += result["size"]
+
+            index = {"format": INDEX_FORMAT, "version": version,
+                     "files": dict(sorted(files.items()))}
+            path = index_path(store_dir, version)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_name(path.name + ".tmp")
+            temp_path.write_text(json.dumps(index, indent=1) + "\n", encoding="utf-8")
+            os.replace(temp_path, path)
+            indexes[version] = index
+            if pending:
+                print(f"  ✅ v{version}: {len(files)} file(s), {len(pending)} chunked "
+                      f"({chunked_bytes / 1024 / 1024:.1f} MB), {new_chunks} new chunk(s) "
+                      f"({new_bytes / 1024 / 1024:.1f} MB)")
+            else:
+                print(f"  ♻️  v{version}: {len(files)} file(s), index up to date")
+    print(f"✅ Chunk store updated in {time.time() - started:.1f}s")
+    return indexes
+
+
+def _chunk_sizes(index):
+    """{digest: size} of every distinct chunk in a release, leaving out single compressed streams"""
+    return {digest: size for entry in index["files"].values() if entry["layout"] != "stream"
+            for _, chunks in file_segments(entry) for digest, size in chunks}
+
+
+def _entry_chunks(entry):
+    return [chunk for _, chunks in file_segments(entry) for chunk in chunks]
+
+
+def print_chunk_report(store_dir, version=None):
+    """Dedupe ratio across all indexed releases and what each older version has to fetch"""
+    indexes = load_all_indexes(store_dir)
+    if not indexes:
+        print(f"❌ No release indexes in {store_dir}/")
+        return None
+    version = version or list(indexes)[-1]
+    if version not in indexes:
+        print(f"❌ v{version} is not in the chunk store")
+        return None
+
+    # Single compressed streams do not dedupe, so they would only water the ratio down
+    logical = sum(size for index in indexes.values() for entry in index["files"].values()
+                  if entry["layout"] != "stream" for _, size in _entry_chunks(entry))
+    streams = sum(entry["size"] for index in indexes.values() for entry in index["files"].values()
+                  if entry["layout"] == "stream")
+    unique = {}
+    for index in indexes.values():
+        unique.update(_chunk_sizes(index))
+    unique_bytes = sum(unique.values())
+    print(f"\n📊 Chunk store: {len(indexes)} release(s), {logical / 1024 / 1024:.1f} MB of chunked data in "
+          f"{unique_bytes / 1024 / 1024:.1f} MB of unique chunks ({len(unique)} chunks, "
+          f"dedupe {logical / unique_bytes if unique_bytes else 1:.2f}x)")
+    if streams:
+        print(f"  ({streams / 1024 / 1024:.1f} MB of compressed tarballs left out: "
+              f"they do not dedupe and are fetched whole)")
+
+    target = indexes[version]
+    target_chunks = _chunk_sizes(target)
+    target_bytes = sum(target_chunks.values())
+    print(f"  Updating to v{version} ({target_bytes / 1024 / 1024:.1f} MB in {len(target_chunks)} chunks):")
+    report = {"version": version, "releases": len(indexes), "logical_bytes": logical,
+              "unique_bytes": unique_bytes, "stream_bytes": streams, "fetch": {}}
+    older = [v for v in indexes if version_key(v) < version_key(version)]
+    for base in reversed(older):
+        have = _chunk_sizes(indexes[base])
+        fetch = sum(size for digest, size in target_chunks.items() if digest not in have)
+        report["fetch"][base] = fetch
+        share = fetch / target_bytes * 100 if target_bytes else 0
+        print(f"    from v{base:<10} fetch {fetch / 1024 / 1024:>8.1f} MB ({share:.0f}%)")
+    if older:
+        # A client only downloads its own platform's files, so show them one by one for the last release
+        have = _chunk_sizes(indexes[older[-1]])
+        print(f"  Per file from v{older[-1]}:")
+        for rel_path, entry in target["files"].items():
+            if entry["layout"] == "stream":
+                print(f"    {rel_path:<48} {entry['size'] / 1024 / 1024:>8.1f} MB, fetched whole")
+                continue
+            fetch = sum(size for digest, size in dict(_entry_chunks(entry)).items() if digest not in have)
+            print(f"    {rel_path:<48} {fetch / 1024 / 1024:>8.1f} of {entry['size'] / 1024 / 1024:.1f} MB")
+    else:
+        print("    (no earlier release indexed)")
+    return report
+
+
+class ChunkSource:
+    """Read indexes and chunks from a store folder or an HTTP URL serving one"""
+
+    def __init__(self, location):
+        self.location = str(location).rstrip("/")
+        self.remote = self.location.startswith(("http://", "https://"))
+
+    def _read(self, rel_path):
+        if self.remote:
+            with urllib.request.urlopen(f"{self.location}/{rel_path}", timeout=60) as response:
+                return response.read()
+        return (Path(self.location) / rel_path).read_bytes()
+
+    def index(self, version):
+        index = json.loads(self._read(f"{INDEX_DIR_NAME}/{version}.json"))
+        if index.get("format") != INDEX_FORMAT:
+            raise ValueError(f"v{version} index has format {index.get('format')}, expected {INDEX_FORMAT}")
+        return index
+
+    def chunk(self, digest):
+        data = self._read(f"{OBJECTS_DIR_NAME}/{digest[:2]}/{digest}")
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"chunk {digest[:12]} failed its integrity check")
+        return data
+
+
+def _local_chunks(have_dirs, known, jobs):
+    """{digest: (path, offset, size)} for every chunk of the files already on disk
+
+    Files whose hash appears in `known` ({sha256: index entry}, from the
+    indexes the client fetched) are not chunked again.
+    """
+    local = {}
+    pending = []
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        for folder in have_dirs:
+            for path in sorted(Path(folder).rglob("*")):
+                if not path.is_file() or path.name.endswith(".tmp"):
+                    continue
+                entry = known.get(file_sha256(path))
+                if entry is None:
+                    pending.append((path, pool.submit(chunk_file, path)))
+                else:
+                    pending.append((path, entry))
+        for path, entry in pending:
+            if not isinstance(entry, dict):
+                entry = entry.result()
+            for offset, chunks in file_segments(entry):
+                for digest, size in chunks:
+                    local.setdefault(digest, (path, offset, size))
+                    offset += size
+    return local
+
+
+def _read_local(location, digest):
+    path, offset, size = location
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read(size)
+    except OSError:
+        return None
+    return data if hashlib.sha256(data).hexdigest() == digest else None
+
+
+def _destination(output_dir, rel_path):
+    """Resolved path of an index entry under output_dir; ValueError when it would land outside"""
+    root = Path(output_dir).resolve()
+    destination = (root / rel_path).resolve()
+    if destination == root or not destination.is_relative_to(root):
+        raise ValueError(f"index entry {rel_path!r} points outside {output_dir}")
+    return destination
+
+
+def rebuild_release(source, version, output_dir, have_dirs=(), have_versions=(), jobs=None):
+    """Rebuild a release into output_dir from local chunks plus whatever the source has to supply
+
+    have_dirs are folders with files the client already has (an installed
+    or downloaded older release); naming their versions in have_versions
+    lets files be recognized by hash instead of chunked again. Returns
+    {"reused": bytes, "fetched": bytes, "files": n}. Every chunk and every
+    rebuilt file is checked against its SHA-256; a mismatch raises
+    ValueError, as does an index path that would land outside output_dir
+    (the index may come from a remote server, so its hashes prove nothing
+    about where files go).
+    """
+    source = source if isinstance(source, ChunkSource) else ChunkSource(source)
+    output_dir = Path(output_dir)
+    index = source.index(version)
+    # Checked for every entry before anything is written
+    destinations = {rel_path: _destination(output_dir, rel_path) for rel_path in index["files"]}
+    known = {}
+    for other in [version, *have_versions]:
+        other_index = index if other == version else source.index(other)
+        known.update((entry["sha256"], entry) for entry in other_index["files"].values())
+    # Files from an interrupted run count as local too
+    have_dirs = [Path(d) for d in have_dirs if Path(d).is_dir()]
+    if output_dir.is_dir():
+        have_dirs.append(output_dir)
+    print(f"🔎 Scanning {len(have_dirs)} local folder(s) for reusable chunks...")
+    local = _local_chunks(have_dirs, known, jobs)
+
+    # Chunks that occur more than once are kept in memory after their first fetch
+    counts = {}
+    for entry in index["files"].values():
+        for digest, _ in _entry_chunks(entry):
+            counts[digest] = counts.get(digest, 0) + 1
+    fetched_once = {}
+    stats = {"reused": 0, "fetched": 0, "files": 0}
+
+    def read_chunks(chunks, tally):
+        for digest, size in chunks:
+            data = fetched_once.get(digest)
+            if data is None and digest in local:
+                data = _read_local(local[digest], digest)
+                if data is not None:
+                    tally["reused"] += size
+            if data is None:
+                data = source.chunk(digest)
+                tally["fetched"] += size
+                if counts[digest] > 1:
+                    fetched_once[digest] = data
+            yield data
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for rel_path, entry in index["files"].items():
+        destination = destinations[rel_path]
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = destination.with_name(destination.name + ".tmp")
+        tally = {"reused": 0, "fetched": 0}
+        with open(temp_path, "wb") as out:
+            if entry["layout"] == "zip":
+                _write_zip(out, entry["members"], bytes.fromhex(entry["comment"]),
+                           lambda member: _ChunkReader(read_chunks(member["chunks"], tally)))
+            else:
+                for data in read_chunks(entry["chunks"], tally):
+                    out.write(data)
+        if file_sha256(temp_path) != entry["sha256"]:
+            temp_path.unlink()
+            raise ValueError(f"{rel_path} does not match its index after rebuilding")
+        os.replace(temp_path, destination)
+        stats["files"] += 1
+        stats["reused"] += tally["reused"]
+        stats["fetched"] += tally["fetched"]
+        print(f"  ✅ {rel_path}: {tally['reused'] / 1024 / 1024:.1f} MB reused, "
+              f"{tally['fetched'] / 1024 / 1024:.1f} MB fetched")
+    return stats
+
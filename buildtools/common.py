@@ -0,0 +1,27 @@
+"""Paths and small helpers shared by the build scripts"""
+import hashlib
+import importlib.util
+from pathlib import Path
+
+PROJECT_PATH = "./AkademiTrack.csproj"
+
+# Everything the build scripts remember between runs lives here
+CACHE_DIR = Path("./.buildcache")
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_build_script(filename):
+    """Import one of the hyphenated build-*.py scripts as a module"""
+    module_name = Path(filename).stem.replace("-", "_")
+    spec = importlib.util.spec_from_file_location(module_name, filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
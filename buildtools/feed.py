@@ -0,0 +1,380 @@
+"""Local update feed with file-level delta packages
+
+Every Releases/v*/ folder gets a manifest.json (size and SHA-256 of each
+file) and Releases/feed.json indexes the full packages and deltas of all
+versions per channel. A delta is a zip with a delta.json describing the
+target package member by member plus only the members whose compressed
+bytes differ from the base version, so a client on an older version
+downloads just the changed files and rebuilds the full package with
+apply_delta(). Members are copied still compressed, with the target's
+headers, so the rebuilt package is byte-identical to the full package and
+matches the SHA-256 in feed.json.
+"""
+import copy
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import urllib.request
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from buildtools.archives import seek_raw_entry, write_raw_entry, zip_member_header, zipinfo_from_header
+from buildtools.common import file_sha256
+
+FEED_INDEX_NAME = "feed.json"
+RELEASE_MANIFEST_NAME = "manifest.json"
+DELTA_DIR_NAME = "deltas"
+DELTA_METADATA_NAME = "delta.json"
+DELTA_FORMAT = 2
+DEFAULT_MAX_DELTAS = 3
+
+FULL_PACKAGE_RE = re.compile(r"^AkademiTrack-(?P<version>\d+(?:\.\d+)*)(?:-(?P<channel>[A-Za-z]\w*))?-full\.nupkg$")
+DELTA_PACKAGE_RE = re.compile(r"^AkademiTrack-(?P<version>\d+(?:\.\d+)*)-(?P<channel>\w+)-from-(?P<base>\d+(?:\.\d+)*)\.delta\.zip$")
+
+
+def version_key(version):
+    """Sort key for dotted version strings"""
+    return tuple(int(part) for part in version.split("."))
+
+
+def scan_releases(releases_dir):
+    """Map version -> release folder for every Releases/v* folder"""
+    releases = {}
+    for folder in Path(releases_dir).glob("v*"):
+        version = folder.name[1:]
+        if folder.is_dir() and re.fullmatch(r"\d+(?:\.\d+)*", version):
+            releases[version] = folder
+    return dict(sorted(releases.items(), key=lambda item: version_key(item[0])))
+
+
+def find_full_packages(release_folder):
+    """Map channel -> full .nupkg in a release folder"""
+    packages = {}
+    for item in Path(release_folder).glob("AkademiTrack-*-full.nupkg"):
+        match = FULL_PACKAGE_RE.match(item.name)
+        if match:
+            packages[match.group("channel") or "default"] = item
+    return packages
+
+
+def delta_package_name(version, channel, base_version):
+    """File name of the delta from base_version to version"""
+    return f"AkademiTrack-{version}-{channel}-from-{base_version}.delta.zip"
+
+
+def write_release_manifest(release_folder, version):
+    """Write manifest.json with the size and hash of every file in a release"""
+    release_folder = Path(release_folder)
+    files = {}
+    for item in sorted(release_folder.rglob("*")):
+        if item.is_file() and item.name != RELEASE_MANIFEST_NAME:
+            files[item.relative_to(release_folder).as_posix()] = {
+                "size": item.stat().st_size,
+                "sha256": file_sha256(item),
+            }
+    manifest = {"version": version, "files": files}
+    manifest_path = release_folder / RELEASE_MANIFEST_NAME
+    manifest_path.write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+    return manifest
+
+
+def load_release_manifest(release_folder, version):
+    """Read manifest.json, writing it first if missing or stale"""
+    manifest_path = Path(release_folder) / RELEASE_MANIFEST_NAME
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        listed = set(manifest.get("files", {}))
+        on_disk = {item.relative_to(release_folder).as_posix()
+                   for item in Path(release_folder).rglob("*")
+                   if item.is_file() and item.name != RELEASE_MANIFEST_NAME}
+        if listed == on_disk and all(
+                (Path(release_folder) / name).stat().st_size == entry["size"]
+                for name, entry in manifest["files"].items()):
+            return manifest
+    return write_release_manifest(release_folder, version)
+
+
+def _raw_hashes(path, archive):
+    """Map member name -> (sha256 of its compressed bytes, CRC, compressed size, method)"""
+    hashes = {}
+    with open(path, "rb") as raw:
+        for info in archive.infolist():
+            seek_raw_entry(raw, info)
+            digest = hashlib.sha256()
+            remaining = info.compress_size
+            while remaining:
+                chunk = raw.read(min(1024 * 1024, remaining))
+                if not chunk:
+                    raise EOFError(f"{info.filename}: compressed data is truncated")
+                digest.update(chunk)
+                remaining -= len(chunk)
+            hashes[info.filename] = (digest.hexdigest(), info.CRC, info.compress_size, info.compress_type)
+    return hashes
+
+
+def create_delta(base_package, target_package, output_path, base_version, target_version):
+    """Write a file-level delta from base_package to target_package (runs in a worker process)
+
+    The delta is applied once before it is kept; a target package whose
+    layout cannot be reproduced exactly gets no delta ("skipped" is set).
+    """
+    started = time.time()
+    output_path = Path(output_path)
+    temp_path = output_path.with_name(output_path.name + ".tmp")
+    with zipfile.ZipFile(base_package) as base, zipfile.ZipFile(target_package) as target:
+        base_hashes = _raw_hashes(base_package, base)
+        target_hashes = _raw_hashes(target_package, target)
+
+        members = []
+        changed = []
+        for info in target.infolist():
+            from_base = base_hashes.get(info.filename) == target_hashes[info.filename]
+            members.append({"name": info.filename, "size": info.file_size,
+                            "source": "base" if from_base else "delta", "header": zip_member_header(info)})
+            if not from_base:
+                changed.append(info)
+
+        metadata = {
+            "format": DELTA_FORMAT,
+            "base_version": base_version,
+            "target_version": target_version,
+            "base_sha256": file_sha256(base_package),
+            "target_sha256": file_sha256(target_package),
+            "comment": target.comment.hex(),
+            "members": members,
+        }
+        with zipfile.ZipFile(temp_path, "w", zipfile.ZIP_DEFLATED, compresslevel=9) as delta, \
+                open(target_package, "rb") as raw:
+            delta.writestr(DELTA_METADATA_NAME, json.dumps(metadata, indent=2))
+            # Shipped still compressed, exactly as the target package stores them
+            for info in changed:
+                shipped = copy.copy(info)
+                shipped.filename = shipped.orig_filename = f"files/{info.filename}"
+                seek_raw_entry(raw, info)
+                write_raw_entry(delta, shipped, raw)
+
+    result = {
+        "path": str(output_path),
+        "base_version": base_version,
+        "members": len(members),
+        "changed": len(changed),
+        "size": temp_path.stat().st_size,
+        "full_size": Path(target_package).stat().st_size,
+    }
+    with tempfile.TemporaryDirectory(prefix="akademitrack-delta-") as temp:
+        try:
+            apply_delta(base_package, temp_path, Path(temp) / "rebuilt.nupkg")
+        except (ValueError, KeyError, zipfile.BadZipFile) as e:
+            temp_path.unlink()
+            result["skipped"] = str(e)
+        else:
+            os.replace(temp_path, output_path)
+    result["seconds"] = time.time() - started
+    return result
+
+
+def apply_delta(base_package, delta_path, output_path):
+    """Rebuild the target full package from a base package and a delta
+
+    Members are copied still compressed from the base package or the delta
+    with the target's headers. The result is checked against the target's
+    SHA-256, so a wrong base or a corrupted download raises ValueError
+    instead of producing a broken package.
+    """
+    output_path = Path(output_path)
+    temp_path = output_path.with_name(output_path.name + ".tmp")
+    with zipfile.ZipFile(delta_path) as delta, open(delta_path, "rb") as delta_raw:
+        metadata = json.loads(delta.read(DELTA_METADATA_NAME))
+        if metadata.get("format") != DELTA_FORMAT:
+            raise ValueError(f"Unsupported delta format {metadata.get('format')} (expected {DELTA_FORMAT})")
+        if file_sha256(base_package) != metadata["base_sha256"]:
+            raise ValueError(f"{base_package} is not the base of this delta "
+                             f"(expected v{metadata['base_version']})")
+
+        try:
+            with zipfile.ZipFile(base_package) as base, open(base_package, "rb") as base_raw, \
+                    zipfile.ZipFile(temp_path, "w") as out:
+                for member in metadata["members"]:
+                    info = zipinfo_from_header(member["name"], member["header"])
+                    if member["source"] == "base":
+                        raw, source_info = base_raw, base.getinfo(member["name"])
+                    else:
+                        raw, source_info = delta_raw, delta.getinfo(f"files/{member['name']}")
+                    if (source_info.CRC, source_info.compress_size, source_info.compress_type) != \
+                            (info.CRC, info.compress_size, info.compress_type):
+                        raise ValueError(f"{member['name']} in the {member['source']} does not match the delta")
+                    seek_raw_entry(raw, source_info)
+                    write_raw_entry(out, info, raw)
+                out.comment = bytes.fromhex(metadata["comment"])
+            if file_sha256(temp_path) != metadata["target_sha256"]:
+                raise ValueError(f"Rebuilt package does not match v{metadata['target_version']}")
+        except Exception:
+            if temp_path.exists():
+                temp_path.unlink()
+            raise
+    os.replace(temp_path, output_path)
+    return metadata
+
+
+def plan_deltas(releases, version, max_deltas):
+    """List (channel, base version, base package, target package) for the new version"""
+    older = [v for v in releases if version_key(v) < version_key(version)][-max_deltas:] if max_deltas else []
+    target_packages = find_full_packages(releases[version])
+    jobs = []
+    for channel, target_package in sorted(target_packages.items()):
+        for base_version in reversed(older):
+            base_package = find_full_packages(releases[base_version]).get(channel)
+            if base_package:
+                jobs.append((channel, base_version, base_package, target_package))
+    return jobs
+
+
+def generate_deltas(releases, version, max_deltas=DEFAULT_MAX_DELTAS, jobs=None):
+    """Build deltas from the last max_deltas versions to version in a process pool"""
+    planned = plan_deltas(releases, version, max_deltas)
+    if not planned:
+        print("💡 No earlier releases with matching packages, skipping deltas")
+        return []
+
+    delta_dir = releases[version] / DELTA_DIR_NAME
+    if delta_dir.exists():
+        shutil.rmtree(delta_dir)
+    delta_dir.mkdir(parents=True)
+
+    print(f"🧩 Building {len(planned)} delta package(s) in parallel...")
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        futures = [
+            (channel, pool.submit(create_delta, base_package, target_package,
+                                  delta_dir / delta_package_name(version, channel, base_version),
+                                  base_version, version))
+            for channel, base_version, base_package, target_package in planned
+        ]
+        for channel, future in futures:
+            result = future.result()
+            result["channel"] = channel
+            if "skipped" in result:
+                print(f"  ⚠️  {channel} v{result['base_version']} → v{version}: no delta, "
+                      f"the package could not be rebuilt exactly ({result['skipped']})")
+                continue
+            results.append(result)
+            ratio = result["size"] / result["full_size"] * 100 if result["full_size"] else 0
+            print(f"  ✅ {channel} v{result['base_version']} → v{version}: "
+                  f"{result['changed']}/{result['members']} files changed, "
+                  f"{result['size'] / 1024:.1f} KB ({ratio:.1f}% of full) in {result['seconds']:.1f}s")
+    return results
+
+
+def build_feed_index(releases_dir, releases):
+    """Write Releases/feed.json from the release manifests on disk"""
+    releases_dir = Path(releases_dir)
+    channels = {}
+    for version, folder in reversed(list(releases.items())):
+        manifest = load_release_manifest(folder, version)
+        prefix = folder.relative_to(releases_dir).as_posix()
+        for channel, package in find_full_packages(folder).items():
+            release = {
+                "version": version,
+                "full": {"path": f"{prefix}/{package.name}", **manifest["files"][package.name]},
+                "deltas": [],
+            }
+            for name, entry in manifest["files"].items():
+                match = DELTA_PACKAGE_RE.match(Path(name).name)
+                if match and match.group("channel") == channel:
+                    release["deltas"].append({"from": match.group("base"), "path": f"{prefix}/{name}", **entry})
+            release["deltas"].sort(key=lambda delta: version_key(delta["from"]), reverse=True)
+            channel_feed = channels.setdefault(channel, {"latest": version, "releases": []})
+            channel_feed["releases"].append(release)
+
+    feed = {"generated": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "channels": channels}
+    feed_path = releases_dir / FEED_INDEX_NAME
+    temp_path = feed_path.with_name(feed_path.name + ".tmp")
+    temp_path.write_text(json.dumps(feed, indent=2) + "\n", encoding="utf-8")
+    os.replace(temp_path, feed_path)
+    return feed
+
+
+def generate_feed(releases_dir, version=None, max_deltas=DEFAULT_MAX_DELTAS, jobs=None):
+    """Feed stage: deltas for the new version, fresh manifests and the feed index"""
+    releases_dir = Path(releases_dir)
+    releases = scan_releases(releases_dir)
+    if not releases:
+        print(f"❌ No release folders found in {releases_dir}/")
+        return None
+    version = version or list(releases)[-1]
+    if version not in releases:
+        print(f"❌ Release folder not found: {releases_dir}/v{version}")
+        return None
+
+    print(f"📡 Generating update feed for v{version} ({len(releases)} release(s) on disk)...")
+    generate_deltas(releases, version, max_deltas, jobs)
+    write_release_manifest(releases[version], version)
+    feed = build_feed_index(releases_dir, releases)
+    print(f"✅ Feed index written: {releases_dir / FEED_INDEX_NAME}")
+    return feed
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def verify_feed(releases_dir):
+    """Serve Releases/ over local HTTP and rebuild every latest package from its deltas"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_QuietHandler, directory=str(releases_dir)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"🌐 Serving {releases_dir}/ at {base_url}")
+
+    def download(path, destination):
+        with urllib.request.urlopen(f"{base_url}/{path}") as response, open(destination, "wb") as f:
+            shutil.copyfileobj(response, f)
+        return Path(destination).stat().st_size
+
+    ok = True
+    try:
+        with urllib.request.urlopen(f"{base_url}/{FEED_INDEX_NAME}") as response:
+            feed = json.load(response)
+        with tempfile.TemporaryDirectory(prefix="akademitrack-feed-") as temp:
+            temp = Path(temp)
+            for channel, channel_feed in sorted(feed["channels"].items()):
+                releases = {release["version"]: release for release in channel_feed["releases"]}
+                latest = releases[channel_feed["latest"]]
+                for delta in latest["deltas"]:
+                    base = releases.get(delta["from"])
+                    if not base:
+                        print(f"  ❌ {channel}: base v{delta['from']} missing from feed")
+                        ok = False
+                        continue
+                    base_path = temp / f"base-{channel}-{delta['from']}.nupkg"
+                    delta_path = temp / f"delta-{channel}-{delta['from']}.zip"
+                    download(base["full"]["path"], base_path)
+                    downloaded = download(delta["path"], delta_path)
+                    rebuilt_path = temp / "rebuilt.nupkg"
+                    try:
+                        apply_delta(base_path, delta_path, rebuilt_path)
+                    except (ValueError, KeyError, zipfile.BadZipFile) as e:
+                        print(f"  ❌ {channel} v{delta['from']} → v{latest['version']}: {e}")
+                        ok = False
+                        continue
+                    # What a client would install must be the package the feed advertises
+                    if file_sha256(rebuilt_path) != latest["full"]["sha256"]:
+                        print(f"  ❌ {channel} v{delta['from']}: rebuilt package does not match the full "
+                              f"package in the feed")
+                        ok = False
+                        continue
+                    print(f"  ✅ {channel} v{delta['from']} → v{latest['version']}: "
+                          f"downloaded {downloaded / 1024:.1f} KB instead of "
+                          f"{latest['full']['size'] / 1024:.1f} KB")
+    finally:
+        server.shutdown()
+        server.server_close()
+    return ok
@@ -0,0 +1,245 @@
+"""Derive every platform icon from one master PNG
+
+Renders the sizes each platform needs in parallel and packs them into a
+multi-resolution .ico (Windows), an .icns (macOS) and a hicolor PNG tree
+(Linux .desktop entry). ICO and ICNS both embed PNG payloads, so only
+resizing is needed: Pillow is used when installed, otherwise a small
+pure-Python PNG reader/box-filter handles 8-bit RGB/RGBA masters. Outputs
+are cached under .buildcache/icons/ by the master's hash, so a build with
+an unchanged master does no work.
+"""
+import json
+import operator
+import os
+import shutil
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
+from pathlib import Path
+
+from buildtools.common import CACHE_DIR, file_sha256
+
+try:
+    from PIL import Image
+except ImportError:  # optional: pip install Pillow
+    Image = None
+
+MASTER_ICON = Path("./Assets/AT-1024.png")
+ICON_CACHE_DIR = CACHE_DIR / "icons"
+# Bump when the rendered output changes so old cache entries are not reused
+ICON_PIPELINE_VERSION = 1
+
+ICO_SIZES = [16, 24, 32, 48, 64, 128, 256]
+LINUX_SIZES = [16, 24, 32, 48, 64, 128, 256, 512]
+# OSType -> pixel size; the @2x types reuse the bigger renders
+ICNS_TYPES = [
+    (b"icp4", 16), (b"icp5", 32), (b"icp6", 64), (b"ic07", 128), (b"ic08", 256),
+    (b"ic09", 512), (b"ic10", 1024), (b"ic11", 32), (b"ic12", 64), (b"ic13", 256), (b"ic14", 512),
+]
+ICON_NAME = "akademitrack"
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def read_png_rgba(path):
+    """Decode an 8-bit, non-interlaced RGB/RGBA PNG into (width, height, RGBA bytes)"""
+    data = Path(path).read_bytes()
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError(f"{path} is not a PNG file")
+    offset = len(PNG_SIGNATURE)
+    idat = []
+    while offset < len(data):
+        length, chunk_type = struct.unpack(">I4s", data[offset:offset + 8])
+        body = data[offset + 8:offset + 8 + length]
+        if chunk_type == b"IHDR":
+            width, height, bit_depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", body)
+        elif chunk_type == b"IDAT":
+            idat.append(body)
+        elif chunk_type == b"IEND":
+            break
+        offset += 12 + length
+    if bit_depth != 8 or color_type not in (2, 6) or interlace:
+        raise ValueError(f"{path}: only 8-bit non-interlaced RGB/RGBA is supported without Pillow "
+                         "(pip install Pillow)")
+
+    channels = 4 if color_type == 6 else 3
+    stride = width * channels
+    raw = zlib.decompress(b"".join(idat))
+    pixels = bytearray(height * stride)
+    previous = bytearray(stride)
+    for y in range(height):
+        start = y * (stride + 1)
+        filter_type = raw[start]
+        line = bytearray(raw[start + 1:start + 1 + stride])
+        if filter_type == 1:
+            for i in range(channels, stride):
+                line[i] = (line[i] + line[i - channels]) & 0xFF
+        elif filter_type == 2:
+            line = bytearray(map(lambda a, b: (a + b) & 0xFF, line, previous))
+        elif filter_type == 3:
+            for i in range(stride):
+                left = line[i - channels] if i >= channels else 0
+                line[i] = (line[i] + ((left + previous[i]) >> 1)) & 0xFF
+        elif filter_type == 4:
+            for i in range(stride):
+                a = line[i - channels] if i >= channels else 0
+                b = previous[i]
+                c = previous[i - channels] if i >= channels else 0
+                p = a + b - c
+                pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+                predictor = a if pa <= pb and pa <= pc else (b if pb <= pc else c)
+                line[i] = (line[i] + predictor) & 0xFF
+        pixels[y * stride:(y + 1) * stride] = line
+        previous = line
+
+    if channels == 3:
+        rgba = bytearray(width * height * 4)
+        for c in range(3):
+            rgba[c::4] = pixels[c::3]
+        rgba[3::4] = b"\xff" * (width * height)
+        pixels = rgba
+    return width, height, bytes(pixels)
+
+
+def encode_png(width, height, rgba):
+    """Encode RGBA bytes as a PNG (no filtering, maximum compression)"""
+    stride = width * 4
+    raw = b"".join(b"\x00" + rgba[y * stride:(y + 1) * stride] for y in range(height))
+
+    def chunk(chunk_type, body):
+        return struct.pack(">I", len(body)) + chunk_type + body + struct.pack(">I", zlib.crc32(chunk_type + body))
+
+    return (PNG_SIGNATURE
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw, 9))
+            + chunk(b"IEND", b""))
+
+
+def _box_bounds(source, target):
+    return [(i * source // target, max((i + 1) * source // target, i * source // target + 1))
+            for i in range(target)]
+
+
+def box_resize(width, height, rgba, size):
+    """Area-average RGBA to size x size using prefix sums over premultiplied alpha"""
+    x_bounds = _box_bounds(width, size)
+    y_bounds = _box_bounds(height, size)
+    alpha = rgba[3::4]
+    planes = [list(map(operator.mul, rgba[c::4], alpha)) for c in range(3)] + [list(alpha)]
+
+    # Horizontal pass: one prefix sum per row and channel
+    columns = [[] for _ in range(4)]
+    for c, plane in enumerate(planes):
+        for y in range(height):
+            prefix = [0] + list(accumulate(plane[y * width:(y + 1) * width]))
+            columns[c].append([prefix[end] - prefix[start] for start, end in x_bounds])
+
+    # Vertical pass over the narrowed rows
+    out = bytearray(size * size * 4)
+    sums = []
+    for c in range(4):
+        transposed = list(zip(*columns[c]))
+        sums.append([[prefix[end] - prefix[start] for start, end in y_bounds]
+                     for prefix in ([0] + list(accumulate(column)) for column in transposed)])
+    for oy, (y0, y1) in enumerate(y_bounds):
+        for ox, (x0, x1) in enumerate(x_bounds):
+            area = (y1 - y0) * (x1 - x0)
+            a = sums[3][ox][oy]
+            i = (oy * size + ox) * 4
+            if a:
+                out[i] = min(255, round(sums[0][ox][oy] / a))
+                out[i + 1] = min(255, round(sums[1][ox][oy] / a))
+                out[i + 2] = min(255, round(sums[2][ox][oy] / a))
+            out[i + 3] = round(a / area)
+    return bytes(out)
+
+
+def render_size(master, size, decoded=None):
+    """Render one square PNG size (runs in a worker process)"""
+    if Image is not None:
+        import io
+        with Image.open(master) as image:
+            resized = image.convert("RGBA").resize((size, size), Image.LANCZOS)
+            buffer = io.BytesIO()
+            resized.save(buffer, format="PNG", optimize=True)
+            return size, buffer.getvalue()
+    width, height, rgba = decoded
+    if size == width == height:
+        return size, encode_png(width, height, rgba)
+    return size, encode_png(size, size, box_resize(width, height, rgba, size))
+
+
+def build_ico(pngs, sizes):
+    """Multi-resolution .ico with PNG-compressed entries"""
+    header = struct.pack("<HHH", 0, 1, len(sizes))
+    offset = len(header) + 16 * len(sizes)
+    entries = b""
+    for size in sizes:
+        dimension = 0 if size >= 256 else size
+        entries += struct.pack("<BBBBHHII", dimension, dimension, 0, 0, 1, 32, len(pngs[size]), offset)
+        offset += len(pngs[size])
+    return header + entries + b"".join(pngs[size] for size in sizes)
+
+
+def build_icns(pngs):
+    """.icns with PNG payloads for every standard and @2x slot"""
+    body = b"".join(ostype + struct.pack(">I", len(pngs[size]) + 8) + pngs[size]
+                    for ostype, size in ICNS_TYPES)
+    return b"icns" + struct.pack(">I", len(body) + 8) + body
+
+
+def derive_icons(master=MASTER_ICON, jobs=None):
+    """Produce (or reuse) the derived icons; returns a dict of paths or None on failure"""
+    print("\n🎨 Deriving platform icons...")
+    master = Path(master)
+    if not master.exists():
+        print(f"❌ Master icon not found: {master}")
+        return None
+
+    key = file_sha256(master)
+    cache_dir = ICON_CACHE_DIR / f"{key[:16]}-v{ICON_PIPELINE_VERSION}"
+    icons = {
+        "master": master,
+        "ico": cache_dir / "AkademiTrack.ico",
+        "icns": cache_dir / "AkademiTrack.icns",
+        "png": cache_dir / f"{ICON_NAME}.png",
+        "hicolor": cache_dir / "hicolor",
+    }
+    marker = cache_dir / "icons.json"
+    if marker.exists():
+        print(f"✅ Icons up to date (cached for {master.name})")
+        return icons
+
+    sizes = sorted(set(ICO_SIZES) | set(LINUX_SIZES) | {size for _, size in ICNS_TYPES})
+    backend = "Pillow" if Image is not None else "built-in PNG resizer"
+    try:
+        decoded = None if Image is not None else read_png_rgba(master)
+        print(f"🖌️  Rendering {len(sizes)} sizes with {backend}...")
+        with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+            pngs = dict(pool.map(render_size, [master] * len(sizes), sizes, [decoded] * len(sizes)))
+    except Exception as e:
+        print(f"❌ Failed to render icons from {master}: {e}")
+        return None
+
+    temp_dir = cache_dir.with_name(cache_dir.name + ".tmp")
+    if temp_dir.exists():
+        shutil.rmtree(temp_dir)
+    temp_dir.mkdir(parents=True)
+    (temp_dir / icons["ico"].name).write_bytes(build_ico(pngs, ICO_SIZES))
+    (temp_dir / icons["icns"].name).write_bytes(build_icns(pngs))
+    (temp_dir / icons["png"].name).write_bytes(pngs[256])
+    for size in LINUX_SIZES:
+        app_dir = temp_dir / "hicolor" / f"{size}x{size}" / "apps"
+        app_dir.mkdir(parents=True)
+        (app_dir / f"{ICON_NAME}.png").write_bytes(pngs[size])
+    (temp_dir / marker.name).write_text(json.dumps({"master": str(master), "sha256": key,
+                                                    "backend": backend, "sizes": sizes}, indent=2))
+    if cache_dir.exists():
+        shutil.rmtree(cache_dir)
+    os.replace(temp_dir, cache_dir)
+
+    print(f"✅ Icons derived: {icons['ico'].name} ({icons['ico'].stat().st_size / 1024:.0f} KB), "
+          f"{icons['icns'].name} ({icons['icns'].stat().st_size / 1024:.0f} KB), "
+          f"{len(LINUX_SIZES)} Linux PNG sizes")
+    return icons
@@ -0,0 +1,498 @@
+"""Release job queue daemon: queued builds run on a pool of worker processes
+
+Jobs are submitted over a local HTTP endpoint:
+
+    POST /jobs                 {"version": "1.5.0", "platforms": ["linux", "windows"],
+                                "distributions": ["zip", "pkg"], "sign": true, "notarize": true,
+                                "size_budget": 5}
+    GET  /jobs                 every job, newest first
+    GET  /jobs/<id>            one job
+    GET  /jobs/<id>/log        its console output (?offset=N returns only what follows N bytes)
+    POST /jobs/<id>/cancel     cancel a queued job or stop a running one
+
+Every job is a JSON file under .buildcache/jobs/, so the queue survives a
+restart; jobs that were running when the daemon stopped are queued again
+and resume from their stage checkpoints. Each job runs in its own worker
+process with its own work directory and log, calling build_linux_release,
+build_windows_release and create_avalonia_macos_bundle directly. Two jobs
+never build the same platform at once (they would share obj/), and the
+steps that touch shared files (changelog index, icons, restore, the
+Releases/ folder) take a cross-process lock. Platform outputs are staged
+per job and copied into Releases/v<version> only when every platform of
+the job succeeded. "distributions" selects the macOS packages (Linux and
+Windows always produce all of theirs).
+"""
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import signal
+import sys
+import threading
+import time
+import traceback
+import urllib.parse
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from buildtools.common import CACHE_DIR
+from buildtools.sizes import DEFAULT_SIZE_BUDGET
+
+try:
+    import fcntl
+except ImportError:  # Windows: the daemon is meant for Linux/macOS build hosts
+    fcntl = None
+
+JOBS_DIR = CACHE_DIR / "jobs"
+SHARED_LOCK_PATH = CACHE_DIR / "release.lock"
+DEFAULT_WORKERS = 2
+PLATFORMS = {"linux": "linux-x64", "windows": "win-x64", "mac": "osx-arm64"}
+MAC_DISTRIBUTIONS = ["zip", "pkg", "velopack"]
+FINISHED_STATES = {"succeeded", "failed", "cancelled"}
+JOB_ID_PATTERN = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9a-f]{6}$")
+DISPATCH_INTERVAL = 0.5
+
+
+def validate_request(request):
+    """Normalize a submitted job; returns (job fields, error message)"""
+    if not isinstance(request, dict):
+        return None, "expected a JSON object"
+    version = request.get("version")
+    if not isinstance(version, str) or not re.match(r"^\d+\.\d+\.\d+$", version):
+        return None, "version must be X.Y.Z"
+    platforms = request.get("platforms", ["linux", "windows"])
+    if not isinstance(platforms, list) or not platforms or any(p not in PLATFORMS for p in platforms):
+        return None, f"platforms must be a non-empty list of {', '.join(PLATFORMS)}"
+    if "mac" in platforms and sys.platform != "darwin":
+        return None, "mac jobs need a daemon on a mac host (use build-release.py to stage osx-arm64)"
+    distributions = request.get("distributions", MAC_DISTRIBUTIONS)
+    if not isinstance(distributions, list) or any(d not in MAC_DISTRIBUTIONS for d in distributions):
+        return None, f"distributions must be a list of {', '.join(MAC_DISTRIBUTIONS)}"
+    size_budget = request.get("size_budget", DEFAULT_SIZE_BUDGET)
+    if size_budget is not None and (not isinstance(size_budget, (int, float)) or size_budget < 0):
+        return None, "size_budget must be a percentage, or null to allow any growth"
+    unknown = set(request) - {"version", "platforms", "distributions", "sign", "notarize", "size_budget", "label"}
+    if unknown:
+        return None, f"unknown field(s): {', '.join(sorted(unknown))}"
+    sign = bool(request.get("sign", True))
+    return {
+        "version": version,
+        "platforms": [p for p in PLATFORMS if p in platforms],
+        "distributions": [d for d in MAC_DISTRIBUTIONS if d in distributions],
+        "sign": sign,
+        "notarize": sign and bool(request.get("notarize", True)),
+        "size_budget": size_budget,
+        "label": str(request.get("label", "")),
+    }, None
+
+
+@contextmanager
+def shared_lock():
+    """Exclusive lock shared by every worker process (no-op where flock is unavailable)"""
+    SHARED_LOCK_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(SHARED_LOCK_PATH, "a") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def install_release(staged_folders, extra_files, version, releases_dir=Path("./Releases")):
+    """Copy a job's staged outputs into Releases/v<version> (swapped in with a rename)"""
+    release_folder = releases_dir / f"v{version}"
+    merging = release_folder.with_name(f".{release_folder.name}.job-merging")
+    previous = release_folder.with_name(f".{release_folder.name}.job-previous")
+    for leftover in (merging, previous):
+        if leftover.exists():
+            shutil.rmtree(leftover)
+    # Platforms this job did not build keep their files from earlier runs
+    if release_folder.exists():
+        shutil.copytree(release_folder, merging, symlinks=True)
+    else:
+        merging.mkdir(parents=True)
+    for folder in staged_folders:
+        for item in sorted(Path(folder).iterdir()):
+            if item.is_file():
+                shutil.copy2(item, merging / item.name)
+    for item in extra_files:
+        shutil.copy2(item, merging / Path(item).name)
+    if release_folder.exists():
+        os.replace(release_folder, previous)
+    os.replace(merging, release_folder)
+    if previous.exists():
+        shutil.rmtree(previous)
+    return release_folder
+
+
+def _build_platform(platform, job, scripts, job_dir, build_session, icons, resume):
+    """Build one platform of a job; returns (staged release folder, extra files) or None"""
+    from buildtools.checkpoints import StageCheckpoints
+    from buildtools.runner import set_output_prefix
+
+    version = job["version"]
+    pipeline = f"job-{job['id']}-{platform}"
+    print(f"\n{'=' * 50}\n🧱 {platform} ({PLATFORMS[platform]})\n{'=' * 50}")
+
+    if platform in ("linux", "windows"):
+        # Same staging as build-release.py: <job>/staging/<rid>/vpk, seeded from Releases/
+        stages = scripts["linux"].LINUX_STAGES if platform == "linux" else scripts["windows"].WINDOWS_STAGES
+        checkpoints = StageCheckpoints(pipeline, version, stages, resume=resume)
+        folder = scripts["release"].build_runtime(PLATFORMS[platform], version, scripts, job_dir / "staging",
+                                                  build_session, icons, checkpoints=checkpoints,
+                                                  size_budget=job.get("size_budget", DEFAULT_SIZE_BUDGET))
+        # build_runtime prefixes the commands it starts with the RID
+        set_output_prefix("")
+        return (folder, []) if folder else None
+
+    # macOS works in ./build like build-mac.py; the dispatcher runs one mac job at a time
+    module = scripts["mac"]
+    checkpoints = StageCheckpoints(pipeline, version, module.MAC_STAGES,
+                                   options={"sign": job["sign"], "notarize": job["notarize"]}, resume=resume)
+    bundle_dir = module.create_avalonia_macos_bundle(version, sign=job["sign"], notarize=job["notarize"],
+                                                     build_session=build_session, checkpoints=checkpoints,
+                                                     icons=icons)
+    if not bundle_dir:
+        return None
+    created = []
+    if "zip" in job["distributions"]:
+        created.append(module.create_portable_zip(bundle_dir, version, sign=job["sign"], notarize=job["notarize"]))
+    if "pkg" in job["distributions"]:
+        created.append(module.create_installer_pkg(bundle_dir, version, sign=job["sign"], notarize=job["notarize"]))
+    # vpk writes the macOS package straight to ./Releases, so it is not staged
+    if "velopack" in job["distributions"]:
+        created.append(module.create_velopack_release(bundle_dir, version, icons["icns"], sign=job["sign"]))
+    module.discard_notarize_archive(bundle_dir)
+    if not all(created):
+        print("❌ Not every macOS distribution was created")
+        return None
+    return None, [Path(path) for path in created if Path(path).parent.resolve() != Path("./Releases").resolve()]
+
+
+def run_job(job, job_dir, resume):
+    """Worker process entry point: build every platform of a job, exit 0 on success"""
+    from buildtools import runner
+    from buildtools.buildcache import open_build_cache
+    from buildtools.buildserver import BuildServerSession
+    from buildtools.changelogs import compile_changelogs
+    from buildtools.common import load_build_script
+    from buildtools.icons import derive_icons
+    from buildtools.preflight import build_checks, mac_checks, run_preflight
+    from buildtools.restore import ensure_restored
+
+    job_dir = Path(job_dir)
+    if hasattr(os, "setsid"):
+        # Own process group, so stopping the job also stops the tools it started
+        os.setsid()
+
+    def stop_job(signum, frame):
+        # Build steps run in sessions of their own and would outlive the group kill
+        runner.kill_active_commands()
+        os._exit(128 + signum)
+
+    signal.signal(signal.SIGTERM, stop_job)
+    # Everything, including the output of dotnet/vpk, goes to the job log
+    log_file = open(job_dir / "job.log", "a", buffering=1, encoding="utf-8")
+    os.dup2(log_file.fileno(), 1)
+    os.dup2(log_file.fileno(), 2)
+    sys.stdout = sys.stderr = log_file
+    # Per-step logs of concurrent jobs must not share a build-logs/<timestamp>/ folder
+    runner.LOG_DIR = job_dir / "build-logs"
+
+    try:
+        version = job["version"]
+        print(f"🚀 Job {job['id']}: v{version} for {', '.join(job['platforms'])}"
+              + (" (resumed)" if resume else ""))
+        scripts = {name: load_build_script(f"build-{name}.py") for name in job["platforms"] + ["release"]}
+        platforms = job["platforms"]
+        checks = build_checks([PLATFORMS[p] for p in platforms],
+                              velopack=platforms != ["mac"] or "velopack" in job["distributions"])
+        if "mac" in platforms:
+            mac = scripts["mac"]
+            checks += mac_checks(job["sign"], job["notarize"], mac.DEVELOPER_ID_APP, mac.DEVELOPER_ID_INSTALLER,
+                                 mac.ENTITLEMENTS_PATH, pkg="pkg" in job["distributions"],
+                                 zip_tool=mac.ZIP_TOOL, xcode_project=mac.XCODE_PROJECT_PATH)
+        if not run_preflight(checks):
+            return 1
+        with shared_lock():
+            if not compile_changelogs(version):
+                return 1
+            icons = derive_icons()
+            if not icons or not ensure_restored([PLATFORMS[p] for p in job["platforms"]]):
+                return 1
+
+        staged = []
+        extra_files = []
+        with BuildServerSession("default", open_build_cache()) as build_session:
+            for platform in job["platforms"]:
+                result = _build_platform(platform, job, scripts, job_dir, build_session, icons, resume)
+                if result is None:
+                    print(f"\n❌ {platform} failed; nothing was copied to Releases/")
+                    return 1
+                folder, files = result
+                if folder:
+                    staged.append(folder)
+                extra_files += [f for f in files if f.is_file()]
+
+        with shared_lock():
+            release_folder = install_release(staged, extra_files, version)
+            # Velopack packages go to the shared Releases/ folder, release lists merged
+            scripts["release"].publish_velopack_outputs(job_dir / "staging", Path("./Releases"))
+        print(f"\n🎉 Job {job['id']} finished: {release_folder}/")
+        return 0
+    except Exception:
+        traceback.print_exc()
+        return 1
+    finally:
+        log_file.flush()
+
+
+def _worker_main(job, job_dir, resume):
+    sys.exit(run_job(job, job_dir, resume))
+
+
+def _terminate(process):
+    """Stop a worker and every process it started"""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGTERM)
+        else:
+            process.terminate()
+    except ProcessLookupError:
+        # Not in its own group yet (or already gone)
+        process.terminate()
+    process.join(10)
+    if process.is_alive():
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (AttributeError, ProcessLookupError):
+            process.kill()
+        process.join()
+
+
+class JobQueue:
+    """Persistent job store plus the dispatcher that runs jobs on worker processes"""
+
+    def __init__(self, jobs_dir=JOBS_DIR, workers=DEFAULT_WORKERS):
+        self.jobs_dir = Path(jobs_dir)
+        self.workers = max(1, workers)
+        self.jobs = {}
+        self.processes = {}
+        self._lock = threading.Condition()
+        self._stopping = False
+        self._context = multiprocessing.get_context("spawn")
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        for path in sorted(self.jobs_dir.glob("*/job.json")):
+            try:
+                job = json.loads(path.read_text(encoding="utf-8"))
+            except ValueError:
+                continue
+            if job["state"] == "running":
+                # Interrupted by a daemon restart: run again, resuming from checkpoints
+                job["state"] = "queued"
+                job["resume"] = True
+                self._save(job)
+            self.jobs[job["id"]] = job
+
+    def _save(self, job):
+        job_dir = self.jobs_dir / job["id"]
+        job_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = job_dir / "job.json.tmp"
+        temp_path.write_text(json.dumps(job, indent=2), encoding="utf-8")
+        os.replace(temp_path, job_dir / "job.json")
+
+    def submit(self, request):
+        """Queue a job; returns (job, error)"""
+        fields, error = validate_request(request)
+        if error:
+            return None, error
+        job_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        job = dict(fields, id=job_id, state="queued", submitted=time.time(), started=None,
+                   finished=None, attempts=0, exit_code=None, resume=False)
+        with self._lock:
+            self.jobs[job_id] = job
+            self._save(job)
+            self._lock.notify_all()
+        return job, None
+
+    def get(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list(self):
+        with self._lock:
+            return [dict(job) for job in sorted(self.jobs.values(), key=lambda j: j["submitted"], reverse=True)]
+
+    def log_path(self, job_id):
+        return self.jobs_dir / job_id / "job.log"
+
+    def cancel(self, job_id):
+        """Cancel a queued job or terminate a running one; returns the job or None"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if not job or job["state"] in FINISHED_STATES:
+                return job
+            process = self.processes.pop(job_id, None)
+            if process:
+                _terminate(process)
+            job.update(state="cancelled", finished=time.time())
+            self._save(job)
+            self._lock.notify_all()
+            return dict(job)
+
+    def _busy_platforms(self):
+        return {p for job_id in self.processes for p in self.jobs[job_id]["platforms"]}
+
+    def _dispatch(self):
+        """Reap finished workers and start queued jobs that do not conflict with running ones"""
+        for job_id, process in list(self.processes.items()):
+            if process.is_alive():
+                continue
+            del self.processes[job_id]
+            job = self.jobs[job_id]
+            job.update(state="succeeded" if process.exitcode == 0 else "failed",
+                       exit_code=process.exitcode, finished=time.time())
+            self._save(job)
+            print(f"{'✅' if process.exitcode == 0 else '❌'} Job {job_id} {job['state']} "
+                  f"after {job['finished'] - job['started']:.0f}s")
+
+        busy = self._busy_platforms()
+        running_versions = {self.jobs[job_id]["version"] for job_id in self.processes}
+        for job in sorted(self.jobs.values(), key=lambda j: j["submitted"]):
+            if len(self.processes) >= self.workers:
+                break
+            if job["state"] != "queued":
+                continue
+            # Same platform means the same obj/ folder; same version means the same release folder
+            if busy & set(job["platforms"]) or job["version"] in running_versions:
+                continue
+            job.update(state="running", started=time.time(), attempts=job["attempts"] + 1)
+            self._save(job)
+            process = self._context.Process(target=_worker_main,
+                                            args=(job, str(self.jobs_dir / job["id"]), job["resume"]),
+                                            name=f"release-job-{job['id']}")
+            process.start()
+            self.processes[job["id"]] = process
+            busy |= set(job["platforms"])
+            running_versions.add(job["version"])
+            print(f"▶️  Job {job['id']}: v{job['version']} {', '.join(job['platforms'])} (pid {process.pid})")
+
+    def run(self):
+        """Dispatcher loop; returns when stop() is called"""
+        with self._lock:
+            while not self._stopping:
+                self._dispatch()
+                self._lock.wait(DISPATCH_INTERVAL)
+
+    def stop(self):
+        """Stop dispatching and terminate workers; their jobs run again on the next start"""
+        with self._lock:
+            self._stopping = True
+            for job_id, process in self.processes.items():
+                _terminate(process)
+                job = self.jobs[job_id]
+                job.update(state="queued", resume=True)
+                self._save(job)
+            self.processes.clear()
+            self._lock.notify_all()
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """HTTP API for a JobQueue (set as the server's `queue` attribute)"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body, content_type="application/json"):
+        data = body if isinstance(body, bytes) else json.dumps(body, indent=2).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _route(self):
+        url = urllib.parse.urlsplit(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        if not parts or parts[0] != "jobs":
+            return None, None, url
+        job_id = parts[1] if len(parts) > 1 else None
+        if job_id and not JOB_ID_PATTERN.match(job_id):
+            return "invalid", None, url
+        return job_id, parts[2] if len(parts) > 2 else None, url
+
+    def do_GET(self):
+        queue = self.server.queue
+        job_id, action, url = self._route()
+        if url.path.rstrip("/") == "/jobs":
+            self._reply(200, queue.list())
+            return
+        job = queue.get(job_id) if job_id and job_id != "invalid" else None
+        if not job:
+            self._reply(404, {"error": "no such job"})
+        elif action is None:
+            self._reply(200, job)
+        elif action == "log":
+            try:
+                offset = int(urllib.parse.parse_qs(url.query).get("offset", ["0"])[0])
+            except ValueError:
+                offset = -1
+            if offset < 0:
+                self._reply(400, {"error": "offset must be a non-negative integer"})
+                return
+            log_path = queue.log_path(job_id)
+            data = b""
+            if log_path.exists():
+                with open(log_path, "rb") as f:
+                    f.seek(offset)
+                    data = f.read()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            # Lets a follower poll with ?offset=<next offset>
+            self.send_header("X-Log-Offset", str(offset + len(data)))
+            self.send_header("X-Job-State", job["state"])
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self._reply(404, {"error": "unknown action"})
+
+    def do_POST(self):
+        queue = self.server.queue
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        job_id, action, url = self._route()
+        if url.path.rstrip("/") == "/jobs":
+            try:
+                request = json.loads(body or b"{}")
+            except ValueError:
+                self._reply(400, {"error": "body is not valid JSON"})
+                return
+            job, error = queue.submit(request)
+            if error:
+                self._reply(400, {"error": error})
+            else:
+                self._reply(201, job)
+        elif job_id and job_id != "invalid" and action == "cancel":
+            job = queue.cancel(job_id)
+            self._reply(200 if job else 404, job or {"error": "no such job"})
+        else:
+            self._reply(404, {"error": "not found"})
+
+
+def start_job_server(queue, host="127.0.0.1", port=0):
+    """Serve the HTTP API in a background thread; returns (server, url)"""
+    server = ThreadingHTTPServer((host, port), JobRequestHandler)
+    server.daemon_threads = True
+    server.queue = queue
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
@@ -0,0 +1,248 @@
+"""Toolchain preflight run before any restore or publish starts
+
+Every tool, version, signing identity, input file and the free disk space
+a build needs is probed up front, all probes at once on a thread pool, so a
+missing `vpk` or an expired Developer ID fails the build in seconds instead
+of after two publishes and a tarball. Successful tool and identity probes
+are cached in .buildcache/preflight.json for PREFLIGHT_TTL seconds, keyed
+by the tool's path and modification time, so the scripts of one release
+session (and the job queue workers) do not run `xcodebuild -version` or
+`security find-identity` again. Failures are never cached, and files and
+disk space are always checked fresh.
+"""
+import json
+import os
+import re
+import shutil
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from buildtools.common import CACHE_DIR, PROJECT_PATH
+from buildtools.icons import MASTER_ICON
+
+PREFLIGHT_CACHE_PATH = CACHE_DIR / "preflight.json"
+PREFLIGHT_TTL = 30 * 60
+PROBE_TIMEOUT = 15
+# Publish output, archives, packages and obj/ of one runtime, with headroom
+DISK_PER_RUNTIME_GB = 2
+
+VERSION_RE = re.compile(r"(\d+)\.(\d+)\.(\d+)")
+
+
+def _run_probe(cmd):
+    """(returncode, output) of a short probe command; (None, reason) when it cannot run"""
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=PROBE_TIMEOUT,
+                                stdin=subprocess.DEVNULL)
+    except FileNotFoundError:
+        return None, "not found on PATH"
+    except subprocess.TimeoutExpired:
+        return None, f"no answer within {PROBE_TIMEOUT}s"
+    except OSError as e:
+        return None, str(e)
+    return result.returncode, (result.stdout + result.stderr).strip()
+
+
+def _tool_key(tool, *extra):
+    """Cache key that changes when the tool is upgraded or moved; None when it is not installed"""
+    path = shutil.which(tool)
+    if not path:
+        return None
+    return "|".join([tool, path, str(os.stat(path).st_mtime_ns)] + [str(part) for part in extra])
+
+
+def _project_value(pattern):
+    try:
+        match = re.search(pattern, Path(PROJECT_PATH).read_text(encoding="utf-8-sig"))
+    except OSError:
+        return None
+    return match.group(1) if match else None
+
+
+def _probe_dotnet(required_major):
+    code, output = _run_probe(["dotnet", "--version"])
+    if code is None:
+        return "fail", output
+    match = VERSION_RE.search(output)
+    if code != 0 or not match:
+        return "fail", f"`dotnet --version` failed: {output.splitlines()[-1] if output else code}"
+    if required_major and int(match.group(1)) < required_major:
+        return "fail", f"SDK {match.group(0)} cannot build net{required_major}.0"
+    return "ok", f"SDK {match.group(0)}"
+
+
+def _probe_vpk(library_version):
+    code, output = _run_probe(["vpk", "--help"])
+    if code is None:
+        return "fail", output
+    match = VERSION_RE.search(output)
+    if code != 0:
+        return "fail", f"`vpk --help` failed: {output.splitlines()[-1] if output else code}"
+    if not match:
+        return "ok", "installed"
+    # Packages built by a vpk from another release line than the Velopack library may not update
+    if library_version and match.group(0).split(".")[:2] != library_version.split(".")[:2]:
+        return "warn", f"vpk {match.group(0)}, but the project references Velopack {library_version}"
+    return "ok", f"vpk {match.group(0)}"
+
+
+def _probe_tool(tool, version_cmd=None):
+    if not shutil.which(tool):
+        return "fail", "not found on PATH"
+    if not version_cmd:
+        return "ok", shutil.which(tool)
+    code, output = _run_probe(version_cmd)
+    if code != 0:
+        return "fail", f"`{' '.join(version_cmd)}` failed: {output.splitlines()[-1] if output else code}"
+    return "ok", output.splitlines()[0] if output else shutil.which(tool)
+
+
+def _probe_identity(identity, policy):
+    code, output = _run_probe(["security", "find-identity", "-v", "-p", policy])
+    if code != 0:
+        return "fail", f"`security find-identity` failed: {output}"
+    for line in output.splitlines():
+        if identity in line:
+            name = line.split('"')[1] if line.count('"') >= 2 else identity
+            return "ok", name
+    return "fail", f"no valid {policy} identity matching '{identity}' in the keychain"
+
+
+def _probe_file(path):
+    path = Path(path)
+    if not path.exists():
+        return "fail", f"{path} is missing"
+    return "ok", str(path)
+
+
+def _probe_disk(path, needed_gb):
+    free_gb = shutil.disk_usage(path).free / 1024 ** 3
+    if free_gb < needed_gb:
+        return "fail", f"{free_gb:.1f} GB free, {needed_gb:.1f} GB needed"
+    return "ok", f"{free_gb:.1f} GB free"
+
+
+def _check(name, probe, hint, required=True, cache_key=None):
+    return {"name": name, "probe": probe, "hint": hint, "required": required, "cache_key": cache_key}
+
+
+def build_checks(rids, velopack=True, dotnet=True, disk_path="."):
+    """Checks every build needs: the SDK, vpk, the project, the master icon and disk space"""
+    framework = _project_value(r"<TargetFramework>net(\d+)\.")
+    required_major = int(framework) if framework else None
+    library_version = _project_value(r'<PackageReference Include="Velopack" Version="([^"]+)"')
+    needed_gb = DISK_PER_RUNTIME_GB * max(1, len(rids))
+    checks = [
+        _check("project", lambda: _probe_file(PROJECT_PATH), "Run the build scripts from the repository root"),
+        _check("master icon", lambda: _probe_file(MASTER_ICON), "Every platform icon is rendered from it"),
+        _check("disk space", lambda: _probe_disk(disk_path, needed_gb),
+               "Free some space or clean build/ and Releases/"),
+    ]
+    if dotnet:
+        checks.append(_check("dotnet", lambda: _probe_dotnet(required_major),
+                             "Install the .NET SDK: https://dotnet.microsoft.com/download",
+                             cache_key=_tool_key("dotnet", required_major)))
+    if velopack:
+        checks.append(_check("vpk", lambda: _probe_vpk(library_version),
+                             "dotnet tool install -g vpk (or dotnet tool update -g vpk)",
+                             cache_key=_tool_key("vpk", library_version)))
+    return checks
+
+
+def mac_checks(sign, notarize, app_identity, installer_identity=None, entitlements=None,
+               pkg=True, zip_tool="auto", xcode_project=None):
+    """Checks for the macOS bundle, signing, notarization and packaging tools"""
+    checks = []
+    if xcode_project and Path(xcode_project).exists():
+        checks.append(_check("xcodebuild", lambda: _probe_tool("xcodebuild", ["xcodebuild", "-version"]),
+                             "Install Xcode; the widget extension is skipped without it", required=False,
+                             cache_key=_tool_key("xcodebuild")))
+    if zip_tool == "ditto":
+        checks.append(_check("ditto", lambda: _probe_tool("ditto"), "Use --zip-tool python off macOS"))
+    if pkg:
+        checks.append(_check("pkgbuild", lambda: _probe_tool("pkgbuild"), "pkgbuild ships with macOS"))
+    if sign:
+        checks += [
+            _check("codesign", lambda: _probe_tool("codesign"), "Install the Xcode command line tools"),
+            _check("app identity", lambda: _probe_identity(app_identity, "codesigning"),
+                   "Import the Developer ID Application certificate or fix DEVELOPER_ID_APP",
+                   cache_key=_tool_key("security", "codesigning", app_identity)),
+        ]
+        if entitlements:
+            checks.append(_check("entitlements", lambda: _probe_file(entitlements),
+                                 "The hardened runtime needs the JIT entitlements"))
+        if pkg and installer_identity:
+            checks.append(_check("installer identity", lambda: _probe_identity(installer_identity, "basic"),
+                                 "Import the Developer ID Installer certificate or fix DEVELOPER_ID_INSTALLER",
+                                 cache_key=_tool_key("security", "basic", installer_identity)))
+    if notarize:
+        checks += [
+            _check("notarytool", lambda: _probe_tool("xcrun", ["xcrun", "--find", "notarytool"]),
+                   "Install Xcode 13 or newer", cache_key=_tool_key("xcrun", "notarytool")),
+            _check("stapler", lambda: _probe_tool("xcrun", ["xcrun", "--find", "stapler"]),
+                   "Install the Xcode command line tools", cache_key=_tool_key("xcrun", "stapler")),
+        ]
+    return checks
+
+
+def _load_cache():
+    try:
+        return json.loads(PREFLIGHT_CACHE_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache):
+    # Concurrent job workers may race here; losing an entry only means probing again
+    PREFLIGHT_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = PREFLIGHT_CACHE_PATH.with_name(f"{PREFLIGHT_CACHE_PATH.name}.{os.getpid()}.tmp")
+    temp_path.write_text(json.dumps(cache, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    os.replace(temp_path, PREFLIGHT_CACHE_PATH)
+
+
+def run_preflight(checks):
+    """Run every check in parallel and print the results; True when no required check failed"""
+    print(f"\n🛫 Preflight: {len(checks)} check(s)...")
+    started = time.time()
+    cache = {key: entry for key, entry in _load_cache().items()
+             if started - entry.get("checked", 0) < PREFLIGHT_TTL}
+
+    def run(check):
+        key = check["cache_key"]
+        if key and key in cache:
+            return cache[key]["status"], cache[key]["detail"], True
+        try:
+            status, detail = check["probe"]()
+        except Exception as e:
+            status, detail = "fail", f"probe crashed: {e}"
+        return status, detail, False
+
+    with ThreadPoolExecutor(max_workers=max(1, len(checks))) as pool:
+        results = list(pool.map(run, checks))
+
+    failed = 0
+    cached = 0
+    for check, (status, detail, from_cache) in zip(checks, results):
+        if check["cache_key"] and status != "fail" and not from_cache:
+            cache[check["cache_key"]] = {"status": status, "detail": detail, "checked": started}
+        if status == "fail" and not check["required"]:
+            status = "warn"
+        icon = {"ok": "✅", "warn": "⚠️ ", "fail": "❌"}[status]
+        print(f"  {icon} {check['name']}: {detail}{' (cached)' if from_cache else ''}")
+        if status != "ok":
+            print(f"     💡 {check['hint']}")
+        failed += status == "fail"
+        cached += from_cache
+
+    try:
+        _save_cache(cache)
+    except OSError:
+        pass
+    elapsed = time.time() - started
+    if failed:
+        print(f"❌ Preflight failed: {failed} problem(s) found in {elapsed:.1f}s, nothing was built")
+        return False
+    print(f"✅ Preflight passed in {elapsed:.1f}s" + (f" ({cached} cached)" if cached else ""))
+    return True
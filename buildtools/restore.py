@@ -0,0 +1,108 @@
+"""Single `dotnet restore` shared by every publish in a build session
+
+Each `dotnet publish` normally runs its own implicit restore. Instead we
+restore once for every runtime identifier the session needs and publish
+with `--no-restore`. The result is cached by a hash of the .csproj, the
+NuGet lock file and the SDK version, so a rerun with unchanged inputs
+skips restore entirely.
+"""
+import hashlib
+import json
+import subprocess
+import time
+from pathlib import Path
+
+from .common import CACHE_DIR, PROJECT_PATH
+from .runner import run_streaming
+
+LOCK_FILE = Path("./packages.lock.json")
+ASSETS_FILE = Path("./obj/project.assets.json")
+RESTORE_STATE_FILE = CACHE_DIR / "restore.json"
+
+
+def get_sdk_version():
+    """Return the active .NET SDK version, or None if dotnet is missing"""
+    try:
+        result = subprocess.run(["dotnet", "--version"], capture_output=True, text=True)
+    except FileNotFoundError:
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def compute_restore_key(properties=None):
+    """Hash everything that decides what restore produces"""
+    digest = hashlib.sha256()
+    for path in (Path(PROJECT_PATH), LOCK_FILE):
+        digest.update(path.name.encode())
+        if path.exists():
+            digest.update(path.read_bytes())
+    digest.update(f"sdk={get_sdk_version()}".encode())
+    for name, value in sorted((properties or {}).items()):
+        digest.update(f"{name}={value}".encode())
+    return digest.hexdigest()
+
+
+def load_restore_state():
+    """Read the cached restore state, if any"""
+    try:
+        with open(RESTORE_STATE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_restore_state(state):
+    """Persist the restore state for later publishes and sessions"""
+    RESTORE_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(RESTORE_STATE_FILE, "w") as f:
+        json.dump(state, f, indent=2)
+
+
+def build_restore_command(runtimes, properties=None):
+    """Build the `dotnet restore` command for a set of runtime identifiers"""
+    # MSBuild splits -p values on ';', so the RID list has to be escaped
+    cmd = [
+        "dotnet", "restore", PROJECT_PATH,
+        f"-p:RuntimeIdentifiers={'%3B'.join(sorted(runtimes))}",
+        "-p:SelfContained=true"
+    ]
+    for name, value in sorted((properties or {}).items()):
+        cmd.append(f"-p:{name}={value}")
+    return cmd
+
+
+def ensure_restored(runtimes, properties=None, force=False):
+    """Restore once for all requested runtimes; returns True when publishes may use --no-restore"""
+    key = compute_restore_key(properties)
+    state = load_restore_state()
+    cached_runtimes = set(state.get("runtimes", [])) if state.get("key") == key else set()
+
+    assets_mtime = ASSETS_FILE.stat().st_mtime if ASSETS_FILE.exists() else None
+    if (not force and assets_mtime is not None
+            and set(runtimes) <= cached_runtimes
+            and state.get("assets_mtime") == assets_mtime):
+        print(f"♻️  Restore cache hit for {', '.join(sorted(runtimes))} - skipping restore")
+        return True
+
+    # Keep what the assets file already covers so other scripts stay restored too
+    restore_runtimes = sorted(set(runtimes) | cached_runtimes)
+    cmd = build_restore_command(restore_runtimes, properties)
+
+    print(f"\n📥 Restoring packages for {', '.join(restore_runtimes)}...")
+    print(f"Running: {' '.join(cmd)}")
+    result = run_streaming(cmd, log_name="restore", echo=True)
+    if result.returncode != 0:
+        print(f"❌ Restore failed: {result.error_summary()}")
+        return False
+
+    duration = result.duration
+    save_restore_state({
+        "key": key,
+        "runtimes": restore_runtimes,
+        "properties": properties or {},
+        "assets_mtime": ASSETS_FILE.stat().st_mtime if ASSETS_FILE.exists() else None,
+        "duration": round(duration, 2),
+        "restored_at": time.strftime("%Y-%m-%d %H:%M:%S")
+    })
+    print(f"✅ Restore completed in {duration:.1f}s")
+    return True
@@ -0,0 +1,247 @@
+"""Streaming subprocess runner for long build steps
+
+Output of `dotnet publish`, `xcodebuild`, `vpk` and friends is streamed
+line by line into a per-step log file under build-logs/ instead of being
+buffered in memory. Only a bounded tail of each stream is kept for error
+reports. Commands can be given a timeout, and several commands can run
+concurrently with their console output prefixed per command.
+"""
+import itertools
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+LOG_DIR = Path("./build-logs")
+DEFAULT_TAIL_LINES = 200
+
+# Values following these flags never end up in log files
+SECRET_FLAGS = {"--password", "--keychain-password"}
+
+_console_lock = threading.RLock()
+_log_counter = itertools.count(1)
+_session_log_dir = None
+_thread_state = threading.local()
+# Commands started by run_streaming that have not exited yet
+_active_processes = set()
+
+
+def get_session_log_dir():
+    """Return the log directory for this build session, creating it on first use"""
+    global _session_log_dir
+    with _console_lock:
+        if _session_log_dir is None:
+            _session_log_dir = LOG_DIR / time.strftime("%Y%m%d-%H%M%S")
+            _session_log_dir.mkdir(parents=True, exist_ok=True)
+        return _session_log_dir
+
+
+def _log_path_for(log_name):
+    """Build a unique, ordered log file path for a step"""
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", log_name).strip("-").lower() or "command"
+    return get_session_log_dir() / f"{next(_log_counter):02d}-{slug[:60]}.log"
+
+
+def format_command(cmd):
+    """Render a command for logging with secret values masked"""
+    parts = []
+    mask_next = False
+    for part in cmd:
+        parts.append("********" if mask_next else str(part))
+        mask_next = str(part) in SECRET_FLAGS
+    return " ".join(parts)
+
+
+def set_output_prefix(prefix):
+    """Set the console prefix used by commands started from the current thread"""
+    _thread_state.prefix = prefix
+
+
+def get_output_prefix():
+    """Return the console prefix for the current thread"""
+    return getattr(_thread_state, "prefix", "")
+
+
+class CommandResult:
+    """Outcome of a streamed command; only the tail of its output is kept in memory"""
+
+    def __init__(self, args, log_path, tail_lines):
+        self.args = args
+        self.log_path = log_path
+        self.returncode = None
+        self.timed_out = False
+        self.duration = 0.0
+        self.stdout_tail = deque(maxlen=tail_lines)
+        self.stderr_tail = deque(maxlen=tail_lines)
+
+    @property
+    def stdout(self):
+        return "\n".join(self.stdout_tail)
+
+    @property
+    def stderr(self):
+        return "\n".join(self.stderr_tail)
+
+    def error_summary(self):
+        """Tail of the most useful stream plus a pointer to the full log"""
+        # dotnet and vpk report most errors on stdout
+        output = self.stderr.strip() or self.stdout.strip()
+        if self.timed_out:
+            output = f"Timed out after {self.duration:.0f}s\n{output}"
+        return f"{output}\n📄 Full log: {self.log_path}"
+
+
+def _pump(stream, tail, log_file, log_lock, echo, prefix):
+    """Copy one output stream line by line to the log, the tail and optionally the console"""
+    for line in iter(stream.readline, ""):
+        line = line.rstrip("\r\n")
+        with log_lock:
+            log_file.write(line + "\n")
+        tail.append(line)
+        if echo:
+            with _console_lock:
+                sys.stdout.write(f"{prefix}{line}\n")
+                sys.stdout.flush()
+    stream.close()
+
+
+def _kill(process):
+    """Kill a command and everything it spawned"""
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def kill_active_commands():
+    """Kill every command run_streaming is still waiting for (they run in their own sessions)"""
+    with _console_lock:
+        processes = list(_active_processes)
+    for process in processes:
+        _kill(process)
+
+
+def run_streaming(cmd, log_name=None, timeout=None, echo=False, prefix=None,
+                  tail_lines=DEFAULT_TAIL_LINES, env=None, cwd=None):
+    """Run a command, streaming its output to a log file; returns a CommandResult"""
+    if prefix is None:
+        prefix = get_output_prefix()
+    log_path = _log_path_for(log_name or Path(str(cmd[0])).name)
+    result = CommandResult(cmd, log_path, tail_lines)
+
+    started = time.time()
+    with open(log_path, "w", encoding="utf-8") as log_file:
+        log_file.write(f"$ {format_command(cmd)}\n")
+        log_file.flush()
+        try:
+            process = subprocess.Popen(
+                [str(part) for part in cmd], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                text=True, encoding="utf-8", errors="replace", bufsize=1, env=env, cwd=cwd,
+                start_new_session=(os.name == "posix")
+            )
+        except OSError as e:
+            log_file.write(f"Failed to start: {e}\n")
+            result.returncode = 127
+            result.stderr_tail.append(str(e))
+            return result
+        with _console_lock:
+            _active_processes.add(process)
+
+        log_lock = threading.Lock()
+        pumps = [
+            threading.Thread(target=_pump, args=(process.stdout, result.stdout_tail,
+                                                 log_file, log_lock, echo, prefix), daemon=True),
+            threading.Thread(target=_pump, args=(process.stderr, result.stderr_tail,
+                                                 log_file, log_lock, echo, prefix), daemon=True)
+        ]
+        for pump in pumps:
+            pump.start()
+
+        try:
+            result.returncode = process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            _kill(process)
+            result.returncode = process.wait()
+            result.timed_out = True
+        finally:
+            with _console_lock:
+                _active_processes.discard(process)
+        for pump in pumps:
+            pump.join()
+
+        result.duration = time.time() - started
+        log_file.write(f"# exit code {result.returncode} after {result.duration:.1f}s\n")
+    return result
+
+
+def run_parallel(commands, timeout=None, echo=True):
+    """Run several commands at once with prefixed output
+
+    commands is a list of (prefix, cmd) tuples; results come back in the same order.
+    """
+    results = [None] * len(commands)
+
+    def worker(index, name, cmd):
+        results[index] = run_streaming(cmd, log_name=name, timeout=timeout,
+                                       echo=echo, prefix=f"[{name}] ")
+
+    threads = [threading.Thread(target=worker, args=(i, name, cmd))
+               for i, (name, cmd) in enumerate(commands)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class _PrefixedConsole:
+    """sys.stdout replacement that prefixes each line with the writing thread's prefix"""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._pending = {}
+
+    def write(self, text):
+        key = threading.get_ident()
+        buffered = self._pending.get(key, "") + text
+        *lines, rest = buffered.split("\n")
+        self._pending[key] = rest
+        if lines:
+            prefix = get_output_prefix()
+            with _console_lock:
+                for line in lines:
+                    self._stream.write(f"{prefix}{line}\n")
+                self._stream.flush()
+        return len(text)
+
+    def flush(self):
+        key = threading.get_ident()
+        rest = self._pending.pop(key, "")
+        with _console_lock:
+            if rest:
+                self._stream.write(f"{get_output_prefix()}{rest}\n")
+            self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+@contextmanager
+def prefixed_console():
+    """Prefix everything printed by worker threads with their set_output_prefix() value"""
+    original = sys.stdout
+    sys.stdout = _PrefixedConsole(original)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        sys.stdout = original
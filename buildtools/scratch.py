@@ -0,0 +1,123 @@
+"""RAM-backed scratch space for transient staging directories
+
+With --ram-scratch, short-lived build output (the single-file publish, the
+.pkg staging root, the notarization zip) goes to a tmpfs such as /dev/shm
+instead of the working directory. Each request is checked against the free
+tmpfs space and available memory first and quietly falls back to the disk
+path when it does not fit. Scratch paths are stable per work directory, so
+--resume finds a previous run's output as long as the tmpfs still holds it.
+"""
+import hashlib
+import os
+import shutil
+from pathlib import Path
+
+SCRATCH_CANDIDATES = [Path("/dev/shm"), Path("/run/shm")]
+RAM_FILESYSTEMS = {"tmpfs", "ramfs"}
+# Left free for the rest of the system (and the compilers) on top of each request
+SCRATCH_RESERVE = 512 * 1024 * 1024
+SCRATCH_DIR_NAME = f"akademitrack-scratch-{os.getuid() if hasattr(os, 'getuid') else 'user'}"
+
+_scratch_root = None
+
+
+def _mount_types():
+    """Mount point -> filesystem type from /proc/mounts (empty where unavailable)"""
+    try:
+        with open("/proc/mounts", encoding="utf-8") as f:
+            return {fields[1]: fields[2] for fields in (line.split() for line in f) if len(fields) > 2}
+    except OSError:
+        return {}
+
+
+def find_ram_scratch():
+    """First tmpfs candidate that exists and is writable, or None"""
+    mounts = _mount_types()
+    for candidate in SCRATCH_CANDIDATES:
+        if not candidate.is_dir() or not os.access(candidate, os.W_OK):
+            continue
+        if mounts and mounts.get(str(candidate.resolve())) not in RAM_FILESYSTEMS:
+            continue
+        return candidate
+    return None
+
+
+def configure_scratch(option):
+    """Enable scratch space: None disables, "auto" picks a tmpfs, anything else is a directory"""
+    global _scratch_root
+    _scratch_root = None
+    if not option:
+        return None
+    base = find_ram_scratch() if option == "auto" else Path(option)
+    if base is None:
+        print("⚠️  No tmpfs found for --ram-scratch, staging stays on disk")
+        return None
+    if not base.is_dir():
+        print(f"⚠️  Scratch directory {base} does not exist, staging stays on disk")
+        return None
+    _scratch_root = base / SCRATCH_DIR_NAME
+    _scratch_root.mkdir(mode=0o700, exist_ok=True)
+    free = shutil.disk_usage(_scratch_root).free
+    print(f"🧠 RAM scratch enabled: {_scratch_root} ({free / 1024 / 1024 / 1024:.1f} GB free)")
+    return _scratch_root
+
+
+def scratch_root():
+    """The configured scratch directory as a string (for checkpoint options), or None"""
+    return str(_scratch_root) if _scratch_root is not None else None
+
+
+def _available_memory():
+    """MemAvailable in bytes, or None when the platform does not report it"""
+    try:
+        with open("/proc/meminfo", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def tree_size(path):
+    """Total size of the files under path (or of path itself)"""
+    path = Path(path)
+    if path.is_file():
+        return path.stat().st_size
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file() and not f.is_symlink())
+
+
+def scratch_path(fallback, needed_bytes):
+    """Where to stage fallback: a scratch location if needed_bytes fits, otherwise fallback itself"""
+    if _scratch_root is None:
+        return Path(fallback)
+    fallback = Path(fallback)
+    required = needed_bytes + SCRATCH_RESERVE
+    free = shutil.disk_usage(_scratch_root).free
+    memory = _available_memory()
+    if free < required or (memory is not None and memory < required):
+        limit = min(free, memory) if memory is not None else free
+        print(f"⚠️  Not enough RAM scratch for {fallback.name} (needs {needed_bytes / 1024 / 1024:.0f} MB, "
+              f"{limit / 1024 / 1024:.0f} MB usable), using disk")
+        return fallback
+    # Keyed by the disk location so parallel builds in other work dirs never collide
+    key = hashlib.sha1(str(fallback.absolute().parent).encode()).hexdigest()[:12]
+    parent = _scratch_root / key
+    parent.mkdir(exist_ok=True)
+    return parent / fallback.name
+
+
+def is_scratch(path):
+    """True if path was handed out by scratch_path"""
+    return _scratch_root is not None and Path(path).absolute().is_relative_to(_scratch_root.absolute())
+
+
+def discard_scratch(path):
+    """Free a scratch location once the build no longer needs it (disk paths are left alone)"""
+    path = Path(path)
+    if not is_scratch(path) or not path.exists():
+        return
+    if path.is_dir():
+        shutil.rmtree(path)
+    else:
+        path.unlink()
@@ -0,0 +1,213 @@
+"""Publish output size breakdown with a per-release growth budget
+
+Every file in a publish directory is attributed to a category (managed
+assemblies split into app/Avalonia/framework/other, native libraries split
+into Skia/HarfBuzz/runtime/other, satellite resources, Assets, changelogs,
+symbols). The breakdown and the sizes of the shipped archives are stored
+as size-report-<rid>.json in the release folder, diffed against the newest
+earlier release that has a report for the same runtime, and the build
+fails when the growth is over budget.
+"""
+import json
+import struct
+import time
+from pathlib import Path
+
+from buildtools.feed import scan_releases, version_key
+
+SIZE_REPORT_PREFIX = "size-report-"
+DEFAULT_SIZE_BUDGET = 5.0  # percent growth allowed per release
+# Category growth below this is noise and never reported as over budget
+MIN_CATEGORY_GROWTH = 1024 * 1024
+
+NATIVE_SUFFIXES = {".so", ".dylib", ".dll"}
+RUNTIME_NATIVE_PREFIXES = ("libcoreclr", "libclrjit", "libhostfxr", "libhostpolicy", "libSystem.",
+                           "coreclr", "clrjit", "hostfxr", "hostpolicy", "System.", "libmscordaccore",
+                           "mscordaccore", "mscordbi", "libmscordbi", "createdump", "Microsoft.DiaSymReader")
+FRAMEWORK_PREFIXES = ("System.", "Microsoft.", "mscorlib", "netstandard", "WindowsBase")
+
+
+def is_managed_assembly(path):
+    """True if a PE file has a CLR runtime header (a .NET assembly)"""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(4096)
+        if header[:2] != b"MZ":
+            return False
+        pe_offset = struct.unpack_from("<I", header, 0x3C)[0]
+        if header[pe_offset:pe_offset + 4] != b"PE\0\0":
+            return False
+        optional = pe_offset + 24
+        magic = struct.unpack_from("<H", header, optional)[0]
+        # Data directory 14 (CLR runtime header) in PE32 / PE32+ optional headers
+        clr_entry = optional + (208 if magic == 0x10B else 224)
+        rva, size = struct.unpack_from("<II", header, clr_entry)
+        return rva != 0 and size != 0
+    except (OSError, struct.error):
+        return False
+
+
+def categorize(path, rel_path):
+    """Category name for one file of the publish output"""
+    parts = Path(rel_path).parts
+    name = parts[-1]
+    suffix = Path(name).suffix.lower()
+    # Checked anywhere in the path so .app bundles (Contents/MacOS/Assets) match too
+    if "Assets" in parts[:-1]:
+        return "assets"
+    if "Changelogs" in parts[:-1]:
+        return "changelogs"
+    if suffix == ".pdb" or suffix == ".dbg" or name.endswith(".dSYM"):
+        return "symbols"
+    if name.endswith(".resources.dll"):
+        return "resources"
+
+    managed = suffix in (".dll", ".exe") and is_managed_assembly(path)
+    if managed:
+        if name.startswith("AkademiTrack"):
+            return "assemblies:app"
+        if name.startswith("Avalonia"):
+            return "assemblies:avalonia"
+        if name.startswith(FRAMEWORK_PREFIXES):
+            return "assemblies:framework"
+        return "assemblies:other"
+
+    lowered = name.lower()
+    if suffix in NATIVE_SUFFIXES or ".so." in lowered:
+        if "skia" in lowered:
+            return "native:skia"
+        if "harfbuzz" in lowered:
+            return "native:harfbuzz"
+        if name.startswith(RUNTIME_NATIVE_PREFIXES):
+            return "native:runtime"
+        return "native:other"
+    if name in ("AkademiTrack", "AkademiTrack.exe"):
+        return "executable"
+    return "other"
+
+
+def analyze_publish(publish_dir):
+    """Size per category and per file for a publish directory (or .app bundle)"""
+    publish_dir = Path(publish_dir)
+    categories = {}
+    files = {}
+    for path in sorted(publish_dir.rglob("*")):
+        if not path.is_file() or path.is_symlink():
+            continue
+        rel_path = path.relative_to(publish_dir).as_posix()
+        size = path.stat().st_size
+        category = categorize(path, rel_path)
+        entry = categories.setdefault(category, {"bytes": 0, "files": 0})
+        entry["bytes"] += size
+        entry["files"] += 1
+        files[rel_path] = size
+    return {
+        "total": sum(files.values()),
+        "file_count": len(files),
+        "categories": dict(sorted(categories.items(), key=lambda item: -item[1]["bytes"])),
+        "files": files,
+    }
+
+
+def find_previous_report(releases_dir, rid, version):
+    """Newest report for rid from a release older than version, as (version, report)"""
+    name = f"{SIZE_REPORT_PREFIX}{rid}.json"
+    for other_version, folder in reversed(list(scan_releases(releases_dir).items())):
+        if version_key(other_version) >= version_key(version):
+            continue
+        report_path = folder / name
+        if report_path.exists():
+            try:
+                return other_version, json.loads(report_path.read_text(encoding="utf-8"))
+            except ValueError:
+                continue
+    return None, None
+
+
+def _mb(size):
+    return size / 1024 / 1024
+
+
+def _change(new, old):
+    if old is None:
+        return "new"
+    delta = new - old
+    percent = f" ({delta / old * 100:+.1f}%)" if old else ""
+    return f"{_mb(delta):+.2f} MB{percent}"
+
+
+def check_size_budget(publish_dir, release_folder, rid, version, archives=(),
+                      budget=DEFAULT_SIZE_BUDGET, releases_dir=Path("./Releases")):
+    """Write the size report, print the diff vs the previous release and enforce the budget
+
+    budget is the allowed growth in percent; None only reports. Returns
+    False when the publish output or an archive grew past the budget.
+    """
+    print(f"\n📊 Analyzing publish size ({rid})...")
+    report = analyze_publish(publish_dir)
+    report.update({
+        "version": version,
+        "rid": rid,
+        "generated": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        # Keyed without the version so archives of different releases line up
+        "archives": {Path(a).name.replace(version, "{version}"): Path(a).stat().st_size
+                     for a in archives if a and Path(a).exists()},
+    })
+    report_path = Path(release_folder) / f"{SIZE_REPORT_PREFIX}{rid}.json"
+    report_path.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+    previous_version, previous = find_previous_report(releases_dir, rid, version)
+    old_categories = previous["categories"] if previous else {}
+    header = f"vs v{previous_version}" if previous else "(no earlier report)"
+    print(f"  {'category':<22} {'size':>10} {'files':>6}   {header}")
+    for category, entry in report["categories"].items():
+        old = old_categories.get(category, {}).get("bytes") if previous else None
+        change = _change(entry["bytes"], old) if previous else ""
+        print(f"  {category:<22} {_mb(entry['bytes']):>7.2f} MB {entry['files']:>6}   {change}")
+    for category in old_categories:
+        if category not in report["categories"]:
+            print(f"  {category:<22} {'-':>10} {'-':>6}   removed ({_mb(-old_categories[category]['bytes']):+.2f} MB)")
+    total_change = _change(report["total"], previous["total"]) if previous else ""
+    print(f"  {'TOTAL':<22} {_mb(report['total']):>7.2f} MB {report['file_count']:>6}   {total_change}")
+    for name, size in report["archives"].items():
+        old = previous.get("archives", {}).get(name) if previous else None
+        change = _change(size, old) if previous else ""
+        print(f"  📦 {name}: {_mb(size):.2f} MB {change}")
+
+    if not previous:
+        print(f"💡 Size report saved to {report_path}; the next release is compared against it")
+        return True
+
+    old_files = previous.get("files", {})
+    growth = sorted(((size - old_files.get(path, 0), path) for path, size in report["files"].items()),
+                    reverse=True)
+    biggest = [(delta, path) for delta, path in growth[:5] if delta > 0]
+    if biggest:
+        print("  Largest growth:")
+        for delta, path in biggest:
+            marker = " (new)" if path not in old_files else ""
+            print(f"    +{delta / 1024:.0f} KB  {path}{marker}")
+
+    if budget is None:
+        return True
+    over = []
+    limit = 1 + budget / 100
+    if report["total"] > previous["total"] * limit:
+        over.append(f"publish output {_change(report['total'], previous['total'])}")
+    for name, size in report["archives"].items():
+        old = previous.get("archives", {}).get(name)
+        if old and size > old * limit:
+            over.append(f"{name} {_change(size, old)}")
+    for category, entry in report["categories"].items():
+        old = old_categories.get(category, {}).get("bytes", 0)
+        if entry["bytes"] - old > MIN_CATEGORY_GROWTH and entry["bytes"] > old * limit:
+            print(f"⚠️  {category} grew {_change(entry['bytes'], old or None)}")
+
+    if over:
+        print(f"❌ Size budget of {budget:g}% exceeded vs v{previous_version}:")
+        for item in over:
+            print(f"  • {item}")
+        print("💡 Raise --size-budget or pass --allow-size-growth if this growth is intended")
+        return False
+    print(f"✅ Within the {budget:g}% size budget vs v{previous_version}")
+    return True
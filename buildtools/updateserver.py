@@ -0,0 +1,442 @@
+"""Local update server and download load generator
+
+A small asyncio HTTP/1.1 server for a release folder (or the whole
+Releases/ tree) that behaves like a download mirror: single byte ranges,
+ETags taken from the manifest.json hashes written by the feed stage,
+gzip/zstd encoding for text files such as feed.json and RELEASES, and
+optional latency plus per-connection and total bandwidth shaping. The load
+generator simulates many clients fetching full or delta packages at once
+and reports latency percentiles and throughput.
+"""
+import asyncio
+import email.utils
+import gzip
+import json
+import mimetypes
+import re
+import time
+import urllib.parse
+from pathlib import Path
+
+from buildtools.chunks import CHUNK_STORE_NAME, OBJECTS_DIR_NAME
+from buildtools.feed import FEED_INDEX_NAME, RELEASE_MANIFEST_NAME
+
+try:
+    import zstandard
+except ImportError:  # optional: pip install zstandard
+    zstandard = None
+
+CHUNK_SIZE = 64 * 1024
+# Packages are already compressed; only these are worth encoding on the fly
+COMPRESSIBLE_SUFFIXES = {".json", ".sh", ".txt", ".xml"}
+# Velopack's legacy release lists (RELEASES, RELEASES-<channel>) have no suffix
+COMPRESSIBLE_NAME_RE = re.compile(r"^RELEASES(-\w+)?$")
+# Anything bigger is sent as-is rather than compressed and kept in memory
+MAX_ENCODED_BYTES = 1024 * 1024
+MAX_HEADER_BYTES = 16 * 1024
+# Only files whose name or folder pins their content may be cached for good
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+VERSION_DIR_RE = re.compile(r"^v\d+\.\d+\.\d+")
+
+
+class TokenBucket:
+    """Async token bucket limiting bytes per second"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def consume(self, amount):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+def is_compressible(path, size):
+    """True for text files small enough to encode on the fly"""
+    if size > MAX_ENCODED_BYTES:
+        return False
+    return path.suffix.lower() in COMPRESSIBLE_SUFFIXES or bool(COMPRESSIBLE_NAME_RE.match(path.name))
+
+
+def cache_control(root, path):
+    """immutable for versioned packages and chunks, no-cache for everything rewritten in place
+
+    RELEASES, releases.*.json, feed.json and manifest.json change with every
+    release, as do the unversioned Setup/Portable files vpk writes next to
+    them, so proxies have to revalidate those against their ETag.
+    """
+    if path.suffix.lower() == ".json" or COMPRESSIBLE_NAME_RE.match(path.name):
+        return "no-cache"
+    folders = (root.name, *path.relative_to(root).parts[:-1])
+    if path.suffix.lower() == ".nupkg" or any(VERSION_DIR_RE.match(folder) for folder in folders):
+        return IMMUTABLE_CACHE_CONTROL
+    # Chunk objects are named by their hash: chunks/objects/<xx>/<sha256>
+    if folders[-3:-1] == (CHUNK_STORE_NAME, OBJECTS_DIR_NAME):
+        return IMMUTABLE_CACHE_CONTROL
+    return "no-cache"
+
+
+def encode_file(path, encoding):
+    """gzip or zstd copy of a file (runs on the default executor)"""
+    data = Path(path).read_bytes()
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=19).compress(data)
+    return gzip.compress(data, compresslevel=9)
+
+
+def load_manifest_etags(root):
+    """Map path (relative to root) -> sha256 from every manifest.json under root"""
+    root = Path(root)
+    etags = {}
+    for manifest_path in root.rglob(RELEASE_MANIFEST_NAME):
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        prefix = manifest_path.parent.relative_to(root).as_posix()
+        for name, entry in manifest.get("files", {}).items():
+            path = name if prefix == "." else f"{prefix}/{name}"
+            etags[path] = entry["sha256"]
+    return etags
+
+
+def parse_range(header, size):
+    """Parse a single 'bytes=' range; returns (start, end) inclusive, None for the whole file
+
+    Raises ValueError when the range cannot be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    if first:
+        start = int(first)
+        end = int(last) if last else size - 1
+    else:
+        if not last:
+            return None
+        start = max(0, size - int(last))
+        end = size - 1
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+class UpdateServer:
+    """asyncio HTTP server for a release folder"""
+
+    def __init__(self, root, latency_ms=0, bandwidth_kbps=0, total_bandwidth_kbps=0):
+        self.root = Path(root).resolve()
+        self.latency = latency_ms / 1000
+        self.bandwidth = bandwidth_kbps * 1024
+        self.total_bucket = TokenBucket(total_bandwidth_kbps * 1024) if total_bandwidth_kbps else None
+        self.etags = load_manifest_etags(self.root)
+        self.encoded_cache = {}
+        self.stats = {"requests": 0, "bytes": 0, "status": {}}
+        self.connections = set()
+        self.server = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        self.server = await asyncio.start_server(self.handle_connection, host, port,
+                                                 limit=MAX_HEADER_BYTES, backlog=1024)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            for task in list(self.connections):
+                task.cancel()
+            await asyncio.gather(*self.connections, return_exceptions=True)
+            await self.server.wait_closed()
+
+    def resolve(self, target):
+        """Map a request path to a file under root, or None"""
+        rel_path = urllib.parse.unquote(urllib.parse.urlsplit(target).path).lstrip("/")
+        path = (self.root / rel_path).resolve()
+        if path != self.root and self.root not in path.parents:
+            return None, rel_path
+        if path.is_dir():
+            path = path / FEED_INDEX_NAME
+        return (path if path.is_file() else None), rel_path
+
+    def etag_for(self, path, rel_path):
+        digest = self.etags.get(rel_path)
+        if digest:
+            return f'"{digest}"'
+        stat = path.stat()
+        return f'W/"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+    async def encoded_body(self, path, etag, encoding):
+        """Compressed copy of a small text file, cached per ETag
+
+        Compression runs off the event loop so other downloads keep
+        flowing; concurrent requests for the same file share one future.
+        """
+        key = (str(path), etag, encoding)
+        if key not in self.encoded_cache:
+            loop = asyncio.get_running_loop()
+            self.encoded_cache[key] = loop.run_in_executor(None, encode_file, path, encoding)
+        try:
+            return await self.encoded_cache[key]
+        except OSError:
+            # Do not cache a failed read
+            self.encoded_cache.pop(key, None)
+            raise
+
+    async def handle_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                parts = request_line.decode("latin-1").split()
+                if len(parts) != 3:
+                    await self.send(writer, 400, {}, b"Bad request\n")
+                    break
+                method, target, version = parts
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                await self.handle_request(writer, method, target, headers)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError,
+                asyncio.CancelledError):
+            pass
+        finally:
+            self.connections.discard(task)
+            writer.close()
+
+    async def handle_request(self, writer, method, target, headers):
+        if method not in ("GET", "HEAD"):
+            await self.send(writer, 405, {"Allow": "GET, HEAD"}, b"Method not allowed\n")
+            return
+        path, rel_path = self.resolve(target)
+        if path is None:
+            await self.send(writer, 404, {}, b"Not found\n")
+            return
+
+        size = path.stat().st_size
+        etag = self.etag_for(path, rel_path)
+        response_headers = {
+            "ETag": etag,
+            "Accept-Ranges": "bytes",
+            "Last-Modified": email.utils.formatdate(path.stat().st_mtime, usegmt=True),
+            "Content-Type": mimetypes.guess_type(path.name)[0] or "application/octet-stream",
+            "Cache-Control": cache_control(self.root, path),
+        }
+        # Encoded representations carry a -gzip/-zstd suffix on the same validator
+        client_tags = [re.sub(r'-(gzip|zstd)"$', '"', tag.strip())
+                       for tag in headers.get("if-none-match", "").split(",")]
+        if etag in client_tags:
+            await self.send(writer, 304, response_headers, b"", head=True)
+            return
+
+        range_header = headers.get("range")
+        if range_header and headers.get("if-range") not in (None, etag):
+            range_header = None
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response_headers["Content-Range"] = f"bytes */{size}"
+            await self.send(writer, 416, response_headers, b"")
+            return
+
+        if byte_range:
+            start, end = byte_range
+            response_headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            await self.send_file(writer, 206, response_headers, path, start, end - start + 1, method == "HEAD")
+            return
+
+        accepted = [token.split(";")[0].strip() for token in headers.get("accept-encoding", "").split(",")]
+        encoding = None
+        if is_compressible(path, size):
+            if "zstd" in accepted and zstandard is not None:
+                encoding = "zstd"
+            elif "gzip" in accepted:
+                encoding = "gzip"
+        if encoding:
+            response_headers["Content-Encoding"] = encoding
+            response_headers["Vary"] = "Accept-Encoding"
+            # Distinct validator for each representation
+            response_headers["ETag"] = etag[:-1] + f'-{encoding}"'
+            await self.send(writer, 200, response_headers, await self.encoded_body(path, etag, encoding),
+                            head=method == "HEAD")
+            return
+        await self.send_file(writer, 200, response_headers, path, 0, size, method == "HEAD")
+
+    def write_head(self, writer, status, headers, length):
+        reason = {200: "OK", 206: "Partial Content", 304: "Not Modified", 400: "Bad Request",
+                  404: "Not Found", 405: "Method Not Allowed", 416: "Range Not Satisfiable"}[status]
+        lines = [f"HTTP/1.1 {status} {reason}", f"Content-Length: {length}",
+                 f"Date: {email.utils.formatdate(usegmt=True)}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        self.stats["requests"] += 1
+        self.stats["status"][status] = self.stats["status"].get(status, 0) + 1
+
+    async def write_shaped(self, writer, data):
+        """Write data in chunks, respecting the bandwidth limits"""
+        for offset in range(0, len(data), CHUNK_SIZE):
+            chunk = data[offset:offset + CHUNK_SIZE]
+            if self.total_bucket:
+                await self.total_bucket.consume(len(chunk))
+            writer.write(chunk)
+            await writer.drain()
+            if self.bandwidth:
+                await asyncio.sleep(len(chunk) / self.bandwidth)
+            self.stats["bytes"] += len(chunk)
+
+    async def send(self, writer, status, headers, body, head=False):
+        self.write_head(writer, status, headers, len(body))
+        if not head and body:
+            await self.write_shaped(writer, body)
+        else:
+            await writer.drain()
+
+    async def send_file(self, writer, status, headers, path, offset, length, head):
+        self.write_head(writer, status, headers, length)
+        if head:
+            await writer.drain()
+            return
+        with open(path, "rb") as f:
+            f.seek(offset)
+            remaining = length
+            while remaining:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await self.write_shaped(writer, chunk)
+
+
+async def fetch(host, port, path, range_chunk=0, accept_encoding=None):
+    """Download one file over a keep-alive connection; returns bytes received"""
+    reader, writer = await asyncio.open_connection(host, port, limit=MAX_HEADER_BYTES)
+    received = 0
+    offset = 0
+    total = None
+    try:
+        while total is None or offset < total:
+            request = [f"GET {urllib.parse.quote(path)} HTTP/1.1", f"Host: {host}:{port}"]
+            if range_chunk:
+                request.append(f"Range: bytes={offset}-{offset + range_chunk - 1}")
+            if accept_encoding:
+                request.append(f"Accept-Encoding: {accept_encoding}")
+            writer.write(("\r\n".join(request) + "\r\n\r\n").encode("latin-1"))
+            await writer.drain()
+
+            status = int((await reader.readline()).split()[1])
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+            body_read = 0
+            while body_read < length:
+                chunk = await reader.read(min(CHUNK_SIZE, length - body_read))
+                if not chunk:
+                    raise ConnectionError("connection closed mid-body")
+                body_read += len(chunk)
+            received += body_read
+
+            if status == 206:
+                total = int(headers["content-range"].rsplit("/", 1)[1])
+                offset += length
+            elif status == 200:
+                break
+            else:
+                raise ConnectionError(f"HTTP {status} for {path}")
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+    return received
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0
+
+
+async def run_load(host, port, paths, clients, concurrency, range_chunk=0):
+    """Simulate clients downloading paths (round robin); returns a stats dict"""
+    semaphore = asyncio.Semaphore(concurrency)
+    durations = []
+    failures = []
+    total_bytes = 0
+
+    async def client(index):
+        nonlocal total_bytes
+        path = paths[index % len(paths)]
+        async with semaphore:
+            started = time.monotonic()
+            try:
+                received = await fetch(host, port, path, range_chunk)
+                total_bytes += received
+                durations.append(time.monotonic() - started)
+            except (OSError, ConnectionError, ValueError, IndexError) as e:
+                failures.append(f"{path}: {e}")
+
+    started = time.monotonic()
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    elapsed = time.monotonic() - started
+    return {
+        "clients": clients,
+        "failed": len(failures),
+        "errors": failures[:5],
+        "bytes": total_bytes,
+        "seconds": elapsed,
+        "p50": percentile(durations, 0.50),
+        "p95": percentile(durations, 0.95),
+        "max": max(durations, default=0),
+    }
+
+
+def artifact_paths(root, kind):
+    """Paths of the newest full or delta packages in the feed under root"""
+    feed_path = Path(root) / FEED_INDEX_NAME
+    if not feed_path.exists():
+        raise FileNotFoundError(f"{feed_path} not found (run build-feed.py first)")
+    feed = json.loads(feed_path.read_text(encoding="utf-8"))
+    paths = []
+    for channel_feed in feed["channels"].values():
+        latest = channel_feed["releases"][0]
+        if kind == "full":
+            paths.append("/" + latest["full"]["path"])
+        else:
+            paths += ["/" + delta["path"] for delta in latest["deltas"]]
+    return paths
+
+
+def print_load_report(kind, result):
+    mb = result["bytes"] / 1024 / 1024
+    throughput = mb / result["seconds"] if result["seconds"] else 0
+    print(f"  {kind:<6} {result['clients'] - result['failed']:>5}/{result['clients']:<5} "
+          f"{mb:>9.1f} MB {result['seconds']:>7.1f}s {throughput:>8.1f} MB/s "
+          f"{result['p50']:>7.2f}s {result['p95']:>7.2f}s {result['max']:>7.2f}s")
+    for error in result["errors"]:
+        print(f"    ❌ {error}")
@@ -0,0 +1,240 @@
+"""Publish variant matrix: artifact size and startup time per publish setting
+
+Publishes the single-file Linux binary once per combination of
+ReadyToRun, trimming, single-file compression and native self-extract,
+then starts each binary repeatedly with --startup-probe (Program.cs
+initializes the Avalonia platform and App, creates the main window
+without showing it, and exits) on a private Xvfb display:
+
+- cold runs drop the binary from the page cache (posix_fadvise) and start
+  from an empty self-extract directory;
+- warm runs reuse both.
+
+The medians go into a comparison table next to the size of what ships,
+with the current release settings marked as the baseline.
+"""
+import itertools
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from buildtools.common import PROJECT_PATH
+from buildtools.restore import ensure_restored
+from buildtools.runner import get_session_log_dir
+
+# Short name -> MSBuild property
+VARIANT_PROPERTIES = {
+    "r2r": "PublishReadyToRun",
+    "trim": "PublishTrimmed",
+    "compress": "EnableCompressionInSingleFile",
+    "selfextract": "IncludeNativeLibrariesForSelfExtract",
+}
+# What build-linux.py / build-windows.py ship today
+RELEASE_SETTINGS = {"r2r": False, "trim": False, "compress": True, "selfextract": True}
+PROBE_ARG = "--startup-probe"
+DEFAULT_RUNS = 10
+PROBE_TIMEOUT = 60
+
+
+def variant_matrix(dimensions):
+    """Every combination of the given dimensions; the others keep their release value"""
+    unknown = [name for name in dimensions if name not in VARIANT_PROPERTIES]
+    if unknown:
+        raise ValueError(f"Unknown variant dimension(s): {', '.join(unknown)} "
+                         f"(choose from {', '.join(VARIANT_PROPERTIES)})")
+    variants = []
+    for values in itertools.product([False, True], repeat=len(dimensions)):
+        settings = dict(RELEASE_SETTINGS)
+        settings.update(zip(dimensions, values))
+        variants.append(settings)
+    return variants
+
+
+def variant_name(settings):
+    enabled = [name for name in VARIANT_PROPERTIES if settings[name]]
+    return "+".join(enabled) if enabled else "plain"
+
+
+def publish_variant(settings, rid, output_dir, build_session):
+    """Single-file publish with the given settings; returns the binary path or None"""
+    cmd = [
+        "dotnet", "publish", PROJECT_PATH,
+        "--no-restore",
+        "-c", "Release",
+        "--self-contained",
+        "-r", rid,
+        "-o", str(output_dir),
+        "-p:PublishSingleFile=true",
+    ] + [f"-p:{VARIANT_PROPERTIES[name]}={str(settings[name]).lower()}" for name in VARIANT_PROPERTIES]
+    result = build_session.run_publish(cmd, f"{rid} {variant_name(settings)}")
+    if result.returncode != 0:
+        print(f"❌ Publish failed: {result.error_summary()}")
+        return None
+    binary = Path(output_dir) / ("AkademiTrack.exe" if rid.startswith("win") else "AkademiTrack")
+    if not binary.exists():
+        print(f"❌ Binary not found: {binary}")
+        return None
+    binary.chmod(0o755)
+    return binary
+
+
+def drop_from_page_cache(paths):
+    """Ask the kernel to forget cached pages of these files (Linux; no root needed)"""
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.fdatasync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    return True
+
+
+def start_virtual_display():
+    """(Xvfb process, DISPLAY) for the startup probes; (None, None) when Xvfb is not available"""
+    if not shutil.which("Xvfb"):
+        return None, None
+    process = subprocess.Popen(["Xvfb", "-displayfd", "1", "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    # Xvfb picks a free display and writes its number once it accepts clients
+    number = process.stdout.readline().decode().strip()
+    if not number.isdigit():
+        process.kill()
+        process.wait()
+        return None, None
+    return process, f":{number}"
+
+
+def time_startup(binary, extract_dir, cold, display):
+    """Seconds until the probe exits, or None if it failed"""
+    if cold:
+        shutil.rmtree(extract_dir, ignore_errors=True)
+        drop_from_page_cache([p for p in Path(binary).parent.rglob("*") if p.is_file()])
+    extract_dir.mkdir(parents=True, exist_ok=True)
+    env = dict(os.environ, DOTNET_BUNDLE_EXTRACT_BASE_DIR=str(extract_dir), DISPLAY=display)
+    started = time.perf_counter()
+    try:
+        result = subprocess.run([str(binary), PROBE_ARG], env=env, capture_output=True, timeout=PROBE_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    elapsed = time.perf_counter() - started
+    return elapsed if result.returncode == 0 else None
+
+
+def measure_startup(binary, runs, work_dir, display):
+    """Median/p90 cold and warm start times in ms ({} when the binary does not start)"""
+    extract_dir = Path(work_dir) / "extract"
+    cold = [time_startup(binary, extract_dir, True, display) for _ in range(runs)]
+    time_startup(binary, extract_dir, False, display)  # prime the caches for the warm runs
+    warm = [time_startup(binary, extract_dir, False, display) for _ in range(runs)]
+    if None in cold or None in warm:
+        return {}
+
+    def summary(samples):
+        samples = sorted(s * 1000 for s in samples)
+        return {"median": statistics.median(samples), "p90": samples[min(len(samples) - 1, int(len(samples) * 0.9))]}
+
+    return {"cold": summary(cold), "warm": summary(warm),
+            "extracted_bytes": sum(p.stat().st_size for p in extract_dir.rglob("*") if p.is_file())}
+
+
+def run_variant_matrix(dimensions, build_session, rid="linux-x64", runs=DEFAULT_RUNS, work_dir=None):
+    """Publish and measure every variant; returns the result rows"""
+    variants = variant_matrix(dimensions)
+    can_run = sys.platform.startswith("linux") and rid.startswith("linux")
+    print(f"\n🧪 Publish variant matrix: {len(variants)} variant(s) of {rid}, "
+          f"{runs} cold + {runs} warm start(s) each")
+    print("=" * 50)
+    if not can_run:
+        print(f"⚠️  Startup is measured on Linux for linux-* only; recording sizes")
+    # One restore that covers the ReadyToRun compiler and the trimmer for every variant
+    if not ensure_restored([rid], properties={"PublishReadyToRun": "true", "PublishTrimmed": "true"}):
+        return []
+
+    xvfb = display = None
+    if can_run:
+        xvfb, display = start_virtual_display()
+        if not display:
+            print("⚠️  Xvfb not found (apt install xvfb); startup needs a display, recording sizes")
+    try:
+        return _run_variants(variants, rid, runs, work_dir, build_session, display)
+    finally:
+        if xvfb:
+            xvfb.terminate()
+            xvfb.wait()
+
+
+def _run_variants(variants, rid, runs, work_dir, build_session, display):
+    """Publish every variant, timing its startup on `display` when one is given"""
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="akademitrack-matrix-", dir=work_dir) as temp:
+        for index, settings in enumerate(variants, 1):
+            name = variant_name(settings)
+            print(f"\n[{index}/{len(variants)}] {name}")
+            output_dir = Path(temp) / name / "publish"
+            binary = publish_variant(settings, rid, output_dir, build_session)
+            row = {"name": name, "settings": settings, "release": settings == RELEASE_SETTINGS,
+                   "published": binary is not None}
+            if binary:
+                row["binary_bytes"] = binary.stat().st_size
+                row["total_bytes"] = sum(p.stat().st_size for p in output_dir.rglob("*") if p.is_file())
+                row["files"] = sum(1 for p in output_dir.rglob("*") if p.is_file())
+                if display:
+                    row["startup"] = measure_startup(binary, runs, Path(temp) / name, display)
+                    if not row["startup"]:
+                        print(f"❌ {binary.name} {PROBE_ARG} did not exit cleanly")
+                    else:
+                        print(f"⏱️  cold {row['startup']['cold']['median']:.0f} ms, "
+                              f"warm {row['startup']['warm']['median']:.0f} ms")
+            rows.append(row)
+    return rows
+
+
+def print_matrix_report(rows):
+    """Comparison table, with deltas against the release settings"""
+    baseline = next((row for row in rows if row["release"] and row.get("published")), None)
+    print("\n📊 Publish variants")
+    print("=" * 50)
+    header = "".join(f"{name:>12}" for name in VARIANT_PROPERTIES)
+    print(f"  {header}  {'binary':>9} {'total':>9} {'cold ms':>9} {'warm ms':>9}  vs release")
+    for row in sorted(rows, key=lambda r: (not r.get("published"), r.get("total_bytes", 0))):
+        flags = "".join(f"{'✓' if row['settings'][name] else '·':>12}" for name in VARIANT_PROPERTIES)
+        marker = " ◀ release" if row["release"] else ""
+        if not row.get("published"):
+            print(f"  {flags}  {'publish failed':>39}{marker}")
+            continue
+        startup = row.get("startup")
+        cold = f"{startup['cold']['median']:.0f}" if startup else ("-" if startup is None else "failed")
+        warm = f"{startup['warm']['median']:.0f}" if startup else ("-" if startup is None else "failed")
+        delta = ""
+        if baseline and row is not baseline:
+            size_change = (row["total_bytes"] - baseline["total_bytes"]) / baseline["total_bytes"] * 100
+            delta = f"size {size_change:+.0f}%"
+            if startup and baseline.get("startup"):
+                cold_change = startup["cold"]["median"] - baseline["startup"]["cold"]["median"]
+                warm_change = startup["warm"]["median"] - baseline["startup"]["warm"]["median"]
+                delta += f", cold {cold_change:+.0f} ms, warm {warm_change:+.0f} ms"
+        print(f"  {flags}  {row['binary_bytes'] / 1024 / 1024:>7.1f}MB {row['total_bytes'] / 1024 / 1024:>7.1f}MB "
+              f"{cold:>9} {warm:>9}  {delta}{marker}")
+
+    measured = [row for row in rows if row.get("startup")]
+    if measured:
+        fastest = min(measured, key=lambda r: r["startup"]["cold"]["median"])
+        smallest = min((r for r in rows if r.get("published")), key=lambda r: r["total_bytes"])
+        print(f"\n  🏁 Fastest cold start: {fastest['name']} ({fastest['startup']['cold']['median']:.0f} ms)")
+        print(f"  📦 Smallest: {smallest['name']} ({smallest['total_bytes'] / 1024 / 1024:.1f} MB)")
+
+    report_path = get_session_log_dir() / "publish-matrix.json"
+    report_path.write_text(json.dumps(rows, indent=2), encoding="utf-8")
+    print(f"  📄 Full results: {report_path}")
@@ -0,0 +1,130 @@
+"""Post-build verification of the portable archives against the publish tree
+
+Each archive is read back and every member is decompressed and hashed, then
+compared (size and SHA-256) with the file it was made from. Zip members are
+independent, so they are checked on a thread pool with one ZipFile handle
+per thread (zlib and hashlib release the GIL); a tarball is a single
+compressed stream and is checked in one pass, with hardlink members
+resolved to the member they point at. Missing, unexpected, altered or
+unreadable members fail the build.
+"""
+import hashlib
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from buildtools.archives import open_tar_reader
+from buildtools.common import file_sha256
+
+CHUNK_SIZE = 1024 * 1024
+MAX_PROBLEMS_SHOWN = 10
+
+
+def _hash_stream(stream):
+    """(size, sha256) of everything left in a file object"""
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+        digest.update(chunk)
+        size += len(chunk)
+    return size, digest.hexdigest()
+
+
+def expected_entries(members, jobs=None):
+    """Hash the source files in parallel: {arcname: (size, sha256)} for [(path, arcname)]"""
+    members = list(members)
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        digests = list(pool.map(lambda member: file_sha256(member[0]), members))
+    return {arc_name: (Path(path).stat().st_size, digest)
+            for (path, arc_name), digest in zip(members, digests)}
+
+
+def _zip_entries(archive, jobs):
+    """{member: (size, sha256)} of a zip, decompressing members in parallel"""
+    local = threading.local()
+    handles = []
+    lock = threading.Lock()
+
+    def check(name):
+        if not hasattr(local, "zip"):
+            local.zip = zipfile.ZipFile(archive)
+            with lock:
+                handles.append(local.zip)
+        # ZipExtFile checks the CRC at the end of the member and raises on a mismatch
+        with local.zip.open(name) as member:
+            return _hash_stream(member)
+
+    with zipfile.ZipFile(archive) as zf:
+        # Largest first so one big member does not finish last on its own
+        infos = sorted((info for info in zf.infolist() if not info.is_dir()), key=lambda info: -info.file_size)
+    names = [info.filename for info in infos]
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            return dict(zip(names, pool.map(check, names)))
+    finally:
+        for handle in handles:
+            handle.close()
+
+
+def _tar_entries(archive):
+    """{member: (size, sha256)} of a tarball in one streaming pass"""
+    entries = {}
+    with open_tar_reader(archive) as tar:
+        for member in tar:
+            if member.isfile():
+                entries[member.name] = _hash_stream(tar.extractfile(member))
+            elif member.islnk():
+                # Hardlinks always follow their target in the stream
+                entries[member.name] = entries.get(member.linkname, (None, f"broken link to {member.linkname}"))
+    return entries
+
+
+def verify_archive(archive, expected, generated=(), jobs=None):
+    """Check an archive against {arcname: (size, sha256)}; returns True when everything matches
+
+    Members listed in `generated` (written from memory, e.g. an install
+    manifest) only have to be present.
+    """
+    archive = Path(archive)
+    jobs = jobs or os.cpu_count()
+    is_zip = zipfile.is_zipfile(archive)
+    print(f"\n🔍 Verifying {archive.name} against the publish tree "
+          f"({f'{jobs} thread(s)' if is_zip else 'streaming'})...")
+    started = time.time()
+    try:
+        actual = _zip_entries(archive, jobs) if is_zip else _tar_entries(archive)
+    except Exception as e:
+        print(f"❌ {archive.name} could not be read back: {e}")
+        return False
+    elapsed = max(time.time() - started, 1e-6)
+
+    problems = []
+    for name in sorted(expected.keys() - actual.keys()):
+        problems.append(f"missing: {name}")
+    for name in sorted(actual.keys() - expected.keys() - set(generated)):
+        problems.append(f"unexpected: {name}")
+    for name in sorted(set(generated) - actual.keys()):
+        problems.append(f"missing: {name}")
+    for name in sorted(expected.keys() & actual.keys()):
+        (size, digest), (actual_size, actual_digest) = expected[name], actual[name]
+        if actual_size != size:
+            problems.append(f"size differs: {name} ({actual_size} bytes, source has {size})")
+        elif actual_digest != digest:
+            problems.append(f"content differs: {name}")
+
+    if problems:
+        print(f"❌ {archive.name} does not match the publish tree ({len(problems)} problem(s)):")
+        for problem in problems[:MAX_PROBLEMS_SHOWN]:
+            print(f"  • {problem}")
+        if len(problems) > MAX_PROBLEMS_SHOWN:
+            print(f"  • ... and {len(problems) - MAX_PROBLEMS_SHOWN} more")
+        return False
+
+    total = sum(size for size, _ in actual.values() if size)
+    print(f"✅ {archive.name}: {len(actual)} members verified, {total / 1024 / 1024:.1f} MB in "
+          f"{elapsed:.2f}s ({total / 1024 / 1024 / elapsed:.0f} MB/s uncompressed, "
+          f"{archive.stat().st_size / 1024 / 1024 / elapsed:.0f} MB/s archive)")
+    return True
@@ -0,0 +1,197 @@
+"""Watch the project tree and report changes in debounced batches
+
+build-linux.py --watch rebuilds after every batch. On Linux the watcher
+uses inotify (through ctypes, one watch per directory); elsewhere, or when
+inotify is unavailable or out of watches, it polls file sizes and mtimes.
+The watched files are the ones that feed `dotnet publish` (the same rules
+as the build cache's source digest) plus any extra files the caller names,
+such as the build script that holds the packaging templates.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+
+from buildtools.buildcache import SOURCE_SKIP_DIRS, SOURCE_SKIP_SUFFIXES
+from buildtools.changelogs import CHANGELOG_DIR, CHANGELOG_INDEX_NAME
+
+DEBOUNCE_SECONDS = 0.3
+POLL_INTERVAL = 1.0
+# Written by the build itself; watching it would rebuild forever
+GENERATED_FILES = {(CHANGELOG_DIR / CHANGELOG_INDEX_NAME).as_posix()}
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def _skip_dir(name):
+    return name in SOURCE_SKIP_DIRS or name.startswith((".", "publish"))
+
+
+class PollingWatcher:
+    """Detects changes by comparing size and mtime snapshots"""
+
+    mode = f"polling every {POLL_INTERVAL:g}s"
+
+    def __init__(self, root=".", extra_files=()):
+        self.root = Path(root).resolve()
+        self.extra_files = set(extra_files)
+        self.snapshot = self.scan()
+
+    def accepts(self, rel_path):
+        """True for paths whose changes matter to the build"""
+        if rel_path in self.extra_files:
+            return True
+        if rel_path in GENERATED_FILES:
+            return False
+        parts = rel_path.split("/")
+        if any(_skip_dir(part) for part in parts[:-1]):
+            return False
+        return Path(rel_path).suffix not in SOURCE_SKIP_SUFFIXES
+
+    def scan(self, rel_dir=""):
+        """{rel_path: (size, mtime_ns)} for every watched file under rel_dir"""
+        files = {}
+        for dirpath, dirnames, filenames in os.walk(self.root / rel_dir):
+            dirnames[:] = [d for d in dirnames if not _skip_dir(d)]
+            for name in filenames:
+                path = Path(dirpath) / name
+                rel_path = path.relative_to(self.root).as_posix()
+                if not self.accepts(rel_path):
+                    continue
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                files[rel_path] = (stat.st_size, stat.st_mtime_ns)
+        return files
+
+    def _next_changes(self, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = POLL_INTERVAL if deadline is None else max(0, min(POLL_INTERVAL, deadline - time.monotonic()))
+            time.sleep(wait)
+            current = self.scan()
+            changed = {path for path in current.keys() | self.snapshot.keys()
+                       if current.get(path) != self.snapshot.get(path)}
+            self.snapshot = current
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def wait(self, debounce=DEBOUNCE_SECONDS):
+        """Block until something changes, then until it has been quiet for `debounce` seconds"""
+        changes = set(self._next_changes(None))
+        while True:
+            more = self._next_changes(debounce)
+            if not more:
+                return changes
+            changes |= more
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher(PollingWatcher):
+    """Linux inotify, one watch per directory (new directories are added as they appear)"""
+
+    mode = "inotify"
+
+    def __init__(self, root=".", extra_files=()):
+        self.root = Path(root).resolve()
+        self.extra_files = set(extra_files)
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"inotify_init1: {os.strerror(error)}")
+        self.watches = {}
+        try:
+            self._add_tree("")
+        except OSError:
+            self.close()
+            raise
+
+    def _add_tree(self, rel_dir):
+        """Watch rel_dir and its subdirectories; returns the files already in them"""
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(self.root / rel_dir), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"inotify_add_watch {rel_dir or '.'}: {os.strerror(error)}")
+        self.watches[wd] = rel_dir
+        files = set()
+        with os.scandir(self.root / rel_dir) as entries:
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if not _skip_dir(entry.name):
+                        files |= self._add_tree(rel_path)
+                elif self.accepts(rel_path):
+                    files.add(rel_path)
+        return files
+
+    def _next_changes(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changes = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = os.fsdecode(data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0"))
+            offset += EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped; report everything so the caller rebuilds from the start
+                changes |= set(self.scan())
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            parent = self.watches.get(wd)
+            if parent is None:
+                continue
+            rel_path = f"{parent}/{name}" if parent else name
+            if mask & IN_ISDIR:
+                if _skip_dir(name):
+                    continue
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    try:
+                        changes |= self._add_tree(rel_path)
+                    except OSError:
+                        pass  # gone again already
+                changes.add(rel_path)
+            elif self.accepts(rel_path):
+                changes.add(rel_path)
+        return changes
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def open_watcher(root=".", extra_files=()):
+    """inotify on Linux, polling everywhere else (or when inotify fails)"""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root, extra_files)
+        except (OSError, AttributeError) as e:
+            print(f"⚠️  inotify unavailable ({e}); falling back to polling")
+    return PollingWatcher(root, extra_files)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Zip an .app bundle like `ditto -c -k --keepParent`, on any OS
+
+    python3 bundle-zip.py build/AkademiTrack.app AkademiTrack.zip
+    python3 bundle-zip.py build/AkademiTrack.app signed.zip --sequester-rsrc
+    python3 bundle-zip.py --compare reference.zip AkademiTrack.zip
+    python3 bundle-zip.py --selftest
+
+--compare checks an archive (or an extracted folder) against a reference
+made by ditto on the mac: same entries, symlinks, modes, contents and
+extended attributes, ignoring timestamps and entry order.
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+from buildtools.bundlezip import compare_descriptions, describe, ditto_zip, print_comparison, run_selftest
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="ditto-compatible .app archiver")
+    parser.add_argument("source", nargs="?", help="Bundle to archive (or reference for --compare)")
+    parser.add_argument("destination", nargs="?", help="Zip to write (or archive to check for --compare)")
+    parser.add_argument("--no-keep-parent", action="store_true",
+                        help="Archive the bundle's contents without the .app folder itself")
+    parser.add_argument("--sequester-rsrc", action="store_true",
+                        help="Put AppleDouble xattr entries under __MACOSX/ like ditto --sequesterRsrc")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(),
+                        help="Compression threads (default: one per CPU)")
+    parser.add_argument("--compare", action="store_true",
+                        help="Compare DESTINATION against the reference SOURCE instead of archiving")
+    parser.add_argument("--selftest", action="store_true", help="Check the archiver on a synthetic bundle")
+    args = parser.parse_args()
+    if not args.selftest and not (args.source and args.destination):
+        parser.error("SOURCE and DESTINATION are required")
+    return args
+
+
+def main():
+    args = parse_args()
+    print("🗜️  AkademiTrack Bundle Archiver")
+    print("=" * 50)
+    if args.selftest:
+        return run_selftest(args.jobs)
+
+    keep_parent = not args.no_keep_parent
+    if args.compare:
+        for path in (args.source, args.destination):
+            if not Path(path).exists():
+                print(f"❌ Not found: {path}")
+                return False
+        differences = compare_descriptions(describe(args.source, keep_parent), describe(args.destination, keep_parent))
+        return print_comparison(differences, args.source, args.destination)
+
+    source = Path(args.source)
+    if not source.is_dir():
+        print(f"❌ Not a bundle folder: {source}")
+        return False
+    stats = ditto_zip(source, args.destination, keep_parent, args.sequester_rsrc, args.jobs)
+    print(f"✅ {args.destination}: {stats['entries']} entries ({stats['files']} files, {stats['links']} symlinks, "
+          f"{stats['xattr_entries']} with xattrs)")
+    print(f"📊 {stats['bytes_in'] / 1024 / 1024:.1f} MB -> {stats['bytes_out'] / 1024 / 1024:.1f} MB "
+          f"in {stats['seconds']:.1f}s ({stats['bytes_in'] / 1024 / 1024 / max(stats['seconds'], 0.001):.0f} MB/s, "
+          f"{args.jobs} threads)")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        if not main():
+            sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Stopped by user")
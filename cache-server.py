@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Run the shared build cache server, or self-test it
+
+    python3 cache-server.py --root /srv/akademitrack-cache --host 0.0.0.0 --max-size 50
+    python3 cache-server.py --selftest
+
+Builders point at it with --cache http://host:8090 (or the
+AKADEMITRACK_BUILD_CACHE environment variable) and pull publish outputs,
+signed bundles and archives that another builder already produced.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from buildtools.cacheserver import run_selftest, start_cache_server
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="AkademiTrack shared build cache server")
+    parser.add_argument("--root", default="./.buildcache/server", help="Store directory (default: ./.buildcache/server)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--max-size", type=float, default=20, help="Store size limit in GB (default: 20)")
+    parser.add_argument("--selftest", action="store_true",
+                        help="Run concurrency, integrity and eviction checks against a throwaway server")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    print("🗄️  AkademiTrack Build Cache Server")
+    print("=" * 50)
+    if args.selftest:
+        return run_selftest()
+
+    server, url = start_cache_server(args.root, args.host, args.port, int(args.max_size * 1024 ** 3))
+    stats = server.store.snapshot()
+    print(f"🌐 Serving {Path(args.root).resolve()} at {url}")
+    print(f"📦 {stats['objects']} objects, {stats['bytes'] / 1024 / 1024:.1f} MB of {args.max_size:g} GB")
+    print("💡 Press Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    try:
+        if main() is False:
+            sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Stopped by user")
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Content-defined chunk store for the releases in Releases/
+
+    python3 chunk-store.py index [--version 1.5.0]
+    python3 chunk-store.py report [--version 1.5.0]
+    python3 chunk-store.py rebuild 1.5.0 out/ --store http://host/Releases/chunks \\
+        --have /opt/akademitrack-1.4.0 --have-version 1.4.0
+
+`index` splits the release folders into Releases/chunks/ (build-release.py
+does this after every release), `report` shows the dedupe ratio and what
+each older version has to download, and `rebuild` is the client side: it
+reconstructs a release from the files it already has plus the missing
+chunks, fetched from a store folder or URL. See buildtools/chunks.py.
+"""
+import argparse
+import os
+import sys
+import time
+import urllib.error
+from pathlib import Path
+
+from buildtools.chunks import CHUNK_STORE_NAME, chunk_releases, print_chunk_report, rebuild_release
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="AkademiTrack release chunk store")
+    parser.add_argument("--releases-dir", default="./Releases", help="Folder holding the v* release folders")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="Files chunked at the same time")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    index = commands.add_parser("index", help="Chunk release folders into the store")
+    index.add_argument("--version", action="append", help="Only this release (repeatable; default: all)")
+
+    report = commands.add_parser("report", help="Dedupe ratio and bytes to fetch per older version")
+    report.add_argument("--version", help="Release to update to (default: newest indexed)")
+
+    rebuild = commands.add_parser("rebuild", help="Rebuild a release from local files plus fetched chunks")
+    rebuild.add_argument("version")
+    rebuild.add_argument("output", help="Folder to write the release files into")
+    rebuild.add_argument("--store", help="Chunk store folder or URL (default: <releases-dir>/chunks)")
+    rebuild.add_argument("--have", action="append", default=[], metavar="DIR",
+                         help="Folder with files already on this machine (repeatable)")
+    rebuild.add_argument("--have-version", action="append", default=[], metavar="VERSION",
+                         help="Version(s) those files belong to, so they are matched by hash instead of chunked")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    print("🧩 AkademiTrack Chunk Store")
+    print("=" * 50)
+    releases_dir = Path(args.releases_dir)
+
+    if args.command == "index":
+        if chunk_releases(releases_dir, args.version, args.jobs) is None:
+            return False
+        return print_chunk_report(releases_dir / CHUNK_STORE_NAME, (args.version or [None])[-1]) is not None
+
+    if args.command == "report":
+        return print_chunk_report(releases_dir / CHUNK_STORE_NAME, args.version) is not None
+
+    store = args.store or releases_dir / CHUNK_STORE_NAME
+    started = time.time()
+    try:
+        stats = rebuild_release(store, args.version, args.output, args.have, args.have_version, args.jobs)
+    except (OSError, ValueError, KeyError, urllib.error.URLError) as e:
+        print(f"❌ Rebuild failed: {e}")
+        return False
+    total = stats["reused"] + stats["fetched"]
+    share = stats["fetched"] / total * 100 if total else 0
+    print(f"\n✅ Rebuilt v{args.version} ({stats['files']} files) in {time.time() - started:.1f}s: "
+          f"{stats['reused'] / 1024 / 1024:.1f} MB reused, {stats['fetched'] / 1024 / 1024:.1f} MB "
+          f"fetched ({share:.0f}%)")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        if not main():
+            sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Interrupted by user")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Inspect and prune the Velopack packages in Releases/
+
+    python3 release-artifacts.py list [--version 1.5.0] [--rid linux-x64]
+    python3 release-artifacts.py gc --keep 2 [--dry-run]
+    python3 release-artifacts.py verify
+
+The build scripts record every file vpk writes in Releases/artifacts.json
+(see buildtools/artifacts.py); packages from before the index existed are
+picked up by `gc`. build-release.py runs the same retention pass after
+every release (--keep-packages).
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from buildtools.artifacts import (DEFAULT_KEEP_FULL, load_artifact_index, prune_artifacts,
+                                  verify_artifacts)
+from buildtools.feed import version_key
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="AkademiTrack release artifact store")
+    parser.add_argument("--releases-dir", default="./Releases", help="Velopack output folder")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    listing = commands.add_parser("list", help="Show the indexed artifacts")
+    listing.add_argument("--version")
+    listing.add_argument("--rid")
+    listing.add_argument("--kind", help="full, delta, installer, portable or metadata")
+
+    gc = commands.add_parser("gc", help="Delete old full and delta packages")
+    gc.add_argument("--keep", type=int, default=DEFAULT_KEEP_FULL,
+                    help=f"Full packages kept per RID (default: {DEFAULT_KEEP_FULL})")
+    gc.add_argument("--dry-run", action="store_true", help="Only list what would be deleted")
+
+    commands.add_parser("verify", help="Re-hash every indexed file")
+    return parser.parse_args()
+
+
+def list_artifacts(args):
+    artifacts = load_artifact_index(args.releases_dir)["artifacts"]
+    rows = [(name, entry) for name, entry in artifacts.items()
+            if (args.version is None or entry["version"] == args.version)
+            and (args.rid is None or entry["rid"] == args.rid)
+            and (args.kind is None or entry["kind"] == args.kind)]
+    if not rows:
+        print("📋 No matching artifacts")
+        return True
+    rows.sort(key=lambda row: (version_key(row[1]["version"]) if row[1]["version"] else (), row[1]["rid"] or "",
+                               row[1]["kind"], row[0]))
+    print(f"  {'version':<9} {'rid':<10} {'kind':<9} {'size':>9}  {'sha256':<12}  name")
+    for name, entry in rows:
+        print(f"  {entry['version'] or '-':<9} {entry['rid'] or '-':<10} {entry['kind']:<9} "
+              f"{entry['size'] / 1024 / 1024:>7.1f}MB  {entry['sha256'][:12]}  {name}")
+    total = sum(entry["size"] for _, entry in rows)
+    print(f"\n📦 {len(rows)} artifact(s), {total / 1024 / 1024:.1f} MB")
+    return True
+
+
+def main():
+    args = parse_args()
+    print("📦 AkademiTrack Release Artifacts")
+    print("=" * 50)
+    if not Path(args.releases_dir).is_dir():
+        print(f"❌ Folder not found: {args.releases_dir}")
+        return False
+
+    if args.command == "list":
+        return list_artifacts(args)
+    if args.command == "gc":
+        prune_artifacts(args.releases_dir, args.keep, args.dry_run)
+        return True
+
+    changed = verify_artifacts(args.releases_dir)
+    for name in changed:
+        print(f"  ❌ {name}: missing or changed since it was recorded")
+    if changed:
+        return False
+    print("✅ Every indexed artifact matches its recorded hash")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        if not main():
+            sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Interrupted by user")
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""Queue release builds on a long-running daemon
+
+    python3 release-daemon.py serve --workers 2
+    python3 release-daemon.py submit --version 1.5.0 --platforms linux,windows
+    python3 release-daemon.py submit --version 1.5.0 --platforms mac --distributions zip,pkg
+    python3 release-daemon.py status [JOB]
+    python3 release-daemon.py logs JOB --follow
+    python3 release-daemon.py cancel JOB
+
+The daemon keeps its queue in .buildcache/jobs/, runs jobs on a pool of
+worker processes (one platform build at a time per platform) and copies
+each finished job into Releases/v<version>. See buildtools/jobqueue.py for
+the HTTP API the subcommands use.
+"""
+import argparse
+import json
+import signal
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+from buildtools.jobqueue import DEFAULT_WORKERS, MAC_DISTRIBUTIONS, PLATFORMS, JobQueue, start_job_server
+from buildtools.sizes import DEFAULT_SIZE_BUDGET
+
+DEFAULT_PORT = 8095
+STATE_ICONS = {"queued": "⏳", "running": "🔨", "succeeded": "✅", "failed": "❌", "cancelled": "🚫"}
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="AkademiTrack release job queue")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="Run the daemon")
+    serve.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                       help=f"Jobs built at the same time (default: {DEFAULT_WORKERS})")
+
+    submit = commands.add_parser("submit", help="Queue a release build")
+    submit.add_argument("--version", required=True, help="Version to build (X.Y.Z)")
+    submit.add_argument("--platforms", default="linux,windows",
+                        help=f"Comma-separated: {','.join(PLATFORMS)} (default: linux,windows)")
+    submit.add_argument("--distributions", default=",".join(MAC_DISTRIBUTIONS),
+                        help=f"macOS packages, comma-separated: {','.join(MAC_DISTRIBUTIONS)} (default: all)")
+    submit.add_argument("--no-sign", action="store_true", help="Skip macOS code signing (and notarization)")
+    submit.add_argument("--no-notarize", action="store_true", help="Sign but do not notarize on macOS")
+    submit.add_argument("--size-budget", type=float, default=DEFAULT_SIZE_BUDGET,
+                        help=f"Allowed size growth in percent vs the previous release "
+                             f"(default: {DEFAULT_SIZE_BUDGET:g})")
+    submit.add_argument("--allow-size-growth", action="store_true",
+                        help="Report size growth without failing the job")
+    submit.add_argument("--label", default="", help="Free-form note shown in the status list")
+
+    status = commands.add_parser("status", help="List jobs, or show one")
+    status.add_argument("job", nargs="?")
+
+    logs = commands.add_parser("logs", help="Print a job's log")
+    logs.add_argument("job")
+    logs.add_argument("--follow", "-f", action="store_true", help="Keep printing until the job finishes")
+
+    cancel = commands.add_parser("cancel", help="Cancel a queued or running job")
+    cancel.add_argument("job")
+    return parser.parse_args()
+
+
+def request(args, method, path, body=None):
+    """Call the daemon; returns (status, parsed JSON or raw bytes, headers)"""
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(f"http://{args.host}:{args.port}{path}", data=data, method=method,
+                                 headers={"Content-Type": "application/json"} if data else {})
+    try:
+        with urllib.request.urlopen(req, timeout=30) as response:
+            status, payload, headers = response.status, response.read(), response.headers
+    except urllib.error.HTTPError as e:
+        status, payload, headers = e.code, e.read(), e.headers
+    if headers.get("Content-Type", "").startswith("application/json"):
+        payload = json.loads(payload)
+    return status, payload, headers
+
+
+def format_time(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S") if timestamp else "-"
+
+
+def print_job(job):
+    """Show one job in detail"""
+    print(f"{STATE_ICONS.get(job['state'], '•')} Job {job['id']}: {job['state']}")
+    print(f"  Version:       {job['version']}")
+    print(f"  Platforms:     {', '.join(job['platforms'])}")
+    if "mac" in job["platforms"]:
+        print(f"  Distributions: {', '.join(job['distributions'])} "
+              f"(sign: {'yes' if job['sign'] else 'no'}, notarize: {'yes' if job['notarize'] else 'no'})")
+    if job.get("label"):
+        print(f"  Label:         {job['label']}")
+    budget = job.get("size_budget")
+    print(f"  Size budget:   {'any growth allowed' if budget is None else f'{budget:g}%'}")
+    print(f"  Submitted:     {format_time(job['submitted'])}")
+    print(f"  Started:       {format_time(job['started'])} (attempt {job['attempts']})")
+    print(f"  Finished:      {format_time(job['finished'])}")
+    if job["exit_code"] is not None:
+        print(f"  Exit code:     {job['exit_code']}")
+
+
+def serve(args):
+    queue = JobQueue(workers=args.workers)
+    server, url = start_job_server(queue, args.host, args.port)
+    queued = sum(1 for job in queue.list() if job["state"] == "queued")
+    print(f"🌐 Accepting jobs at {url}/jobs ({args.workers} worker(s))")
+    print(f"📋 {len(queue.jobs)} job(s) on record, {queued} queued")
+    print("💡 Press Ctrl+C to stop (running jobs are queued again on the next start)")
+    # SIGTERM (systemd, docker stop) stops as cleanly as Ctrl+C
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=queue.stop).start())
+    try:
+        queue.run()
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Stopping, running jobs will resume on the next start...")
+        queue.stop()
+    finally:
+        server.shutdown()
+        server.server_close()
+    return True
+
+
+def submit(args):
+    body = {
+        "version": args.version,
+        "platforms": [p.strip() for p in args.platforms.split(",") if p.strip()],
+        "distributions": [d.strip() for d in args.distributions.split(",") if d.strip()],
+        "sign": not args.no_sign,
+        "notarize": not args.no_notarize,
+        "size_budget": None if args.allow_size_growth else args.size_budget,
+        "label": args.label,
+    }
+    status, job, _ = request(args, "POST", "/jobs", body)
+    if status != 201:
+        print(f"❌ Rejected: {job['error']}")
+        return False
+    print(f"✅ Queued job {job['id']} (v{job['version']}: {', '.join(job['platforms'])})")
+    print(f"💡 Follow it with: python3 release-daemon.py logs {job['id']} --follow")
+    return True
+
+
+def status(args):
+    if args.job:
+        code, job, _ = request(args, "GET", f"/jobs/{args.job}")
+        if code != 200:
+            print(f"❌ {job['error']}")
+            return False
+        print_job(job)
+        return True
+    _, jobs, _ = request(args, "GET", "/jobs")
+    if not jobs:
+        print("📋 No jobs")
+        return True
+    print(f"  {'job':<22} {'state':<12} {'version':<9} {'platforms':<20} {'submitted':<19}")
+    for job in jobs:
+        print(f"  {job['id']:<22} {STATE_ICONS.get(job['state'], '•')} {job['state']:<10} {job['version']:<9} "
+              f"{','.join(job['platforms']):<20} {format_time(job['submitted'])}")
+    return True
+
+
+def logs(args):
+    offset = 0
+    while True:
+        code, data, headers = request(args, "GET", f"/jobs/{args.job}/log?offset={offset}")
+        if code != 200:
+            print(f"❌ {data['error']}")
+            return False
+        sys.stdout.write(data.decode("utf-8", errors="replace"))
+        sys.stdout.flush()
+        offset = int(headers["X-Log-Offset"])
+        state = headers["X-Job-State"]
+        if not args.follow or (state not in ("queued", "running") and not data):
+            return state != "failed"
+        time.sleep(1)
+
+
+def cancel(args):
+    code, job, _ = request(args, "POST", f"/jobs/{args.job}/cancel")
+    if code != 200:
+        print(f"❌ {job['error']}")
+        return False
+    print(f"{STATE_ICONS.get(job['state'], '•')} Job {job['id']}: {job['state']}")
+    return True
+
+
+def main():
+    args = parse_args()
+    if args.command == "serve":
+        print("🏭 AkademiTrack Release Daemon")
+        print("=" * 50)
+        return serve(args)
+    commands = {"submit": submit, "status": status, "logs": logs, "cancel": cancel}
+    try:
+        return commands[args.command](args)
+    except urllib.error.URLError as e:
+        print(f"❌ Release daemon not reachable at {args.host}:{args.port} ({e.reason})")
+        print("💡 Start it with: python3 release-daemon.py serve")
+        return False
+
+
+if __name__ == "__main__":
+    try:
+        if not main():
+            sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Stopped by user")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Serve Releases/ like a download mirror, or load-test it
+
+    python3 update-server.py --port 8080 --latency 40 --bandwidth 2048
+    python3 update-server.py --bench --clients 500 --concurrency 200 --total-bandwidth 102400
+
+Serving honours HTTP ranges, uses the manifest.json hashes as ETags and
+gzip/zstd-encodes text files such as feed.json. --bench starts the server
+on a free port and simulates clients downloading the newest full packages
+and then the newest deltas, so the mirror can be sized before a release.
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+from buildtools.updateserver import UpdateServer, artifact_paths, print_load_report, run_load
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Local AkademiTrack update server")
+    parser.add_argument("--root", default="./Releases", help="Folder to serve (default: ./Releases)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=int, default=0, help="Added latency per request in ms")
+    parser.add_argument("--bandwidth", type=int, default=0, help="Per-connection limit in KB/s (0: unlimited)")
+    parser.add_argument("--total-bandwidth", type=int, default=0,
+                        help="Limit for the whole server in KB/s, e.g. the mirror uplink (0: unlimited)")
+    parser.add_argument("--bench", action="store_true", help="Run the load generator against a local server")
+    parser.add_argument("--kinds", default="full,delta", help="Artifacts to benchmark (default: full,delta)")
+    parser.add_argument("--clients", type=int, default=200, help="Simulated clients per artifact kind")
+    parser.add_argument("--concurrency", type=int, default=100, help="Clients downloading at the same time")
+    parser.add_argument("--range-chunk", type=int, default=0,
+                        help="Download in ranged chunks of this many KB, like a resuming client")
+    return parser.parse_args()
+
+
+async def serve(args):
+    server = UpdateServer(args.root, args.latency, args.bandwidth, args.total_bandwidth)
+    port = await server.start(args.host, args.port)
+    print(f"🌐 Serving {Path(args.root).resolve()} at http://{args.host}:{port}/")
+    print(f"🔑 {len(server.etags)} ETags from release manifests")
+    print("💡 Press Ctrl+C to stop")
+    await server.server.serve_forever()
+
+
+async def bench(args):
+    server = UpdateServer(args.root, args.latency, args.bandwidth, args.total_bandwidth)
+    port = await server.start(args.host, 0)
+    print(f"🌐 Test server on port {port} (latency {args.latency}ms, "
+          f"per-connection {args.bandwidth or '∞'} KB/s, total {args.total_bandwidth or '∞'} KB/s)")
+    print(f"👥 {args.clients} clients per kind, {args.concurrency} concurrent\n")
+    print(f"  {'kind':<6} {'ok':>11} {'received':>12} {'wall':>8} {'rate':>13} {'p50':>8} {'p95':>8} {'max':>8}")
+
+    ok = True
+    try:
+        for kind in [k.strip() for k in args.kinds.split(",") if k.strip()]:
+            paths = artifact_paths(args.root, kind)
+            if not paths:
+                print(f"  {kind:<6} ⚠️  nothing to fetch")
+                continue
+            result = await run_load(args.host, port, paths, args.clients, args.concurrency,
+                                    args.range_chunk * 1024)
+            print_load_report(kind, result)
+            ok = ok and not result["failed"]
+    finally:
+        await server.stop()
+    print(f"\n📊 Server: {server.stats['requests']} responses, "
+          f"{server.stats['bytes'] / 1024 / 1024:.1f} MB sent, status {server.stats['status']}")
+    return ok
+
+
+def main():
+    args = parse_args()
+    print("🚚 AkademiTrack Update Server")
+    print("=" * 50)
+    if not Path(args.root).is_dir():
+        print(f"❌ Folder not found: {args.root}")
+        return False
+    try:
+        if args.bench:
+            return asyncio.run(bench(args))
+        asyncio.run(serve(args))
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        if not main():
+            sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Stopped by user")